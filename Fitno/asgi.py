@@ -9,15 +9,18 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 from channels.routing import ProtocolTypeRouter, URLRouter
-from channels.auth import AuthMiddlewareStack
 from django.core.asgi import get_asgi_application
-import Fitno.routing  # مسیریابی WebSocket
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Fitno.settings')
+django_asgi_app = get_asgi_application()
+
+from accounts.channels_auth import JWTAuthMiddleware  # noqa: E402
+import Fitno.routing  # noqa: E402  مسیریابی WebSocket
 
 application = ProtocolTypeRouter({
-    "http": get_asgi_application(),
-    "websocket": AuthMiddlewareStack(
+    "http": django_asgi_app,
+    # همان JWT (کوکی/توکن) و API Key ای که HTTP استفاده می‌کنه
+    "websocket": JWTAuthMiddleware(
         URLRouter(
             Fitno.routing.websocket_urlpatterns
         )
@@ -41,6 +41,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     # local apps
     'accounts',
@@ -233,6 +234,77 @@ SECURE_HSTS_INCLUDE_SUBDOMAINS = False
 SECURE_HSTS_PRELOAD = False
 RATELIMIT_CACHE_BACKEND = 'default'
 
+# API Key cache (per-process LRU + shared Redis cache)
+API_KEY_CACHE_LOCAL_TTL = 30  # ثانیه
+API_KEY_CACHE_LOCAL_MAXSIZE = 1024
+API_KEY_CACHE_SHARED_TTL = 300  # ثانیه
+
+# حذف کلید از LRU همه پروسس‌ها با Redis pub/sub (accounts.cache)؛ accounts.cache.LocalInvalidationBackend بدون Redis
+LOCAL_CACHE_INVALIDATION_BACKEND = 'accounts.cache.RedisInvalidationBackend'
+
+# Principal cache for JWT auth (user row + role ids)
+PRINCIPAL_CACHE_LOCAL_TTL = 10  # ثانیه
+PRINCIPAL_CACHE_LOCAL_MAXSIZE = 4096
+PRINCIPAL_CACHE_SHARED_TTL = 300  # ثانیه
+
+# Auth tracing (accounts.tracing) — off by default, no I/O on the hot path
+AUTH_TRACE_ENABLED = os.getenv("AUTH_TRACE_ENABLED", "False") == "True"
+AUTH_TRACE_SAMPLE_RATE = float(os.getenv("AUTH_TRACE_SAMPLE_RATE", "0.01"))
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'accounts.trace': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
+# Global rate limit (accounts.ratelimit) — limit per window (seconds) for each route group
+RATE_LIMIT_BACKEND = 'accounts.ratelimit.RedisRateLimitBackend'
+RATE_LIMIT_GROUPS = {
+    'otp': {'match': ['/request-otp/', '/verify-otp/'], 'limit': 60, 'window': 3600},
+    'admin_panel': {'match': ['/admin-panel/'], 'limit': 2000, 'window': 3600},
+    'gym_panel': {'match': ['/gym-panel/'], 'limit': 2000, 'window': 3600},
+    'customer': {'match': ['/customer/'], 'limit': 1000, 'window': 3600},
+    'default': {'match': [], 'limit': 1000, 'window': 3600},
+}
+
+# Ticket threads (communications.threads) — guards for the recursive reply loader
+TICKET_THREAD_MAX_DEPTH = 20
+TICKET_THREAD_MAX_NODES = 500  # حداکثر تعداد ریپلای برای هر صفحه
+
+# Notification fan-out (communications.notifications)
+NOTIFICATION_BULK_BATCH_SIZE = 1000
+NOTIFICATION_PUSH_CONCURRENCY = 100  # تعداد group_send همزمان
+NOTIFICATION_UNREAD_BACKEND = 'communications.unread.RedisUnreadBackend'
+NOTIFICATION_UNREAD_TTL = 86400  # ثانیه
+NOTIFICATION_UNREAD_SEED_TTL = 30  # ثانیه؛ عمر کلید موقت در حین شمارش از دیتابیس
+
 # FARAZ SMS Configuration
 FARAZ_URL = os.getenv("FARAZ_URL")
 FARAZ_API_KEY = os.getenv("FARAZ_API_KEY")
+
+# OTP SMS dispatch (accounts.sms) — background worker pool with retry/backoff
+SMS_GATEWAY = os.getenv("SMS_GATEWAY", "accounts.sms.IPPanelGateway")  # accounts.sms.FakeSMSGateway برای تست/بنچمارک
+SMS_GATEWAY_TIMEOUT = 5  # ثانیه
+SMS_DISPATCH_WORKERS = 4  # 0 → ارسال همزمان در همان thread
+SMS_DISPATCH_MAX_ATTEMPTS = 3
+SMS_DISPATCH_BACKOFF = 0.5  # ثانیه، دو برابر در هر تلاش
+SMS_FAKE_LATENCY = 0
+
+# Nearby gym search (gyms.geo)
+GYM_NEARBY_DEFAULT_RADIUS_KM = 5
+GYM_NEARBY_MAX_RADIUS_KM = 50
+
+# Live gym occupancy (gyms.occupancy) — Redis counters pushed to gym_{id}_staff groups
+GYM_OCCUPANCY_BACKEND = 'gyms.occupancy.RedisOccupancyBackend'
+GYM_OCCUPANCY_TTL = 86400  # ثانیه؛ reconcile_occupancy دوباره مقداردهی می‌کنه
+
+# OTP store (accounts.otp) — Redis with hashed codes; the OTP table is the fallback
+OTP_BACKEND = 'accounts.otp.RedisOTPBackend'  # accounts.otp.DatabaseOTPBackend / LocalOTPBackend
+OTP_TTL = 120  # ثانیه
+OTP_RESEND_COOLDOWN = 60  # ثانیه بین دو درخواست کد برای یک شماره
+OTP_MAX_ATTEMPTS = 5  # تلاش اشتباه برای هر شماره در پنجره قفل
+OTP_LOCKOUT_WINDOW = 900  # ثانیه؛ شمارنده تلاش اشتباه هر شماره (با درخواست کد جدید صفر نمیشه)
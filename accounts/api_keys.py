@@ -0,0 +1,84 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from accounts.cache import LocalTTLCache, HitCounter, invalidation
+from accounts.models import APIKey
+
+
+class APIKeyStore:
+    """
+    کش دو سطحی برای API Key ها:
+    سطح اول یک LRU داخل پروسس با TTL کوتاه، سطح دوم کش Redis تعریف شده در CACHES.
+    فقط در صورت miss در هر دو سطح به دیتابیس میریم.
+    """
+    CACHE_PREFIX = "api_key"
+
+    def __init__(self, local_ttl=None, local_maxsize=None, shared_ttl=None):
+        self.local = LocalTTLCache(
+            ttl=local_ttl if local_ttl is not None else getattr(settings, 'API_KEY_CACHE_LOCAL_TTL', 30),
+            maxsize=local_maxsize or getattr(settings, 'API_KEY_CACHE_LOCAL_MAXSIZE', 1024),
+        )
+        self.shared_ttl = shared_ttl if shared_ttl is not None else getattr(settings, 'API_KEY_CACHE_SHARED_TTL', 300)
+        self.counter = HitCounter("local_hits", "shared_hits", "db_lookups")
+        invalidation.register(self.CACHE_PREFIX, self.local)
+
+    def _cache_key(self, key):
+        return f"{self.CACHE_PREFIX}:{key}"
+
+    def is_valid(self, key):
+        """آیا کلید وجود دارد و فعال است؟ نتیجه منفی هم کش میشه تا کلیدهای جعلی به دیتابیس نرسن."""
+        if not key:
+            return False
+
+        invalidation.ensure_listening()
+        is_valid = self.local.get(key)
+        if is_valid is not LocalTTLCache.MISSING:
+            self.counter.incr("local_hits")
+            return is_valid
+
+        try:
+            is_valid = cache.get(self._cache_key(key))
+        except Exception:
+            # اگر Redis در دسترس نبود، مستقیم سراغ دیتابیس میریم
+            is_valid = None
+
+        if is_valid is not None:
+            self.counter.incr("shared_hits")
+        else:
+            self.counter.incr("db_lookups")
+            is_valid = APIKey.objects.filter(key=key, is_active=True).exists()
+            try:
+                cache.set(self._cache_key(key), is_valid, timeout=self.shared_ttl)
+            except Exception:
+                pass
+
+        self.local.set(key, is_valid)
+        return is_valid
+
+    def invalidate(self, key):
+        """
+        حذف کلید از هر دو سطح کش (بعد از ذخیره/غیرفعال‌سازی/حذف APIKey صدا زده میشه).
+        کش Redis و LRU بقیه پروسس‌ها (با pub/sub) بعد از commit پاک میشن تا مقدار قدیمی دوباره کش نشه.
+        """
+        if not key:
+            return
+        self.local.delete(key)
+        transaction.on_commit(lambda: self._invalidate_shared(key))
+
+    def _invalidate_shared(self, key):
+        try:
+            cache.delete(self._cache_key(key))
+        except Exception:
+            pass
+        invalidation.publish(self.CACHE_PREFIX, key)
+
+    def clear_local(self):
+        self.local.clear()
+
+    def stats(self):
+        """شمارنده‌های hit/miss برای اطمینان از حذف کوئری‌های دیتابیس."""
+        return self.counter.snapshot()
+
+
+api_key_store = APIKeyStore()
@@ -1,25 +1,54 @@
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
 from django.conf import settings
 
+from accounts.principal import principal_store
+from accounts.tracing import start_trace
+
 
 class CustomJWTAuthentication(JWTAuthentication):
     def authenticate(self, request):
-        print(f"Request headers: {request.headers}")
+        trace = start_trace('jwt_authenticate')
         access_token = request.COOKIES.get(settings.SIMPLE_JWT['AUTH_COOKIE'])
-        print(f"Access token from cookie: {access_token}")
+        source = 'cookie'
+
+        if not access_token:
+            # کوکی نبود، سراغ هدر Bearer میریم
+            header = self.get_header(request)
+            if header is None:
+                trace.finish(source='none')
+                return None
+            access_token = self.get_raw_token(header)
+            if access_token is None:
+                trace.finish(source='none')
+                return None
+            source = 'bearer'
 
-        if access_token:
-            try:
+        try:
+            with trace.span('decode'):
                 validated_token = self.get_validated_token(access_token)
+            with trace.span('get_user'):
                 user = self.get_user(validated_token)
-                print(f"Valid token for user: {user.id}")
-                return (user, validated_token)
-            except (InvalidToken, AuthenticationFailed) as e:
-                print(f"Token validation error: {str(e)}")
+        except (InvalidToken, AuthenticationFailed) as e:
+            trace.finish(source=source, error=type(e).__name__)
+            if source == 'cookie':
                 return None
+            raise
+
+        trace.finish(source=source, user_id=user.id)
+        return (user, validated_token)
+
+    def get_user(self, validated_token):
+        """یوزر از principal کش شده ساخته میشه، نه با SELECT در هر درخواست"""
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
 
-        print("No cookie found, trying Bearer token...")
-        result = super().authenticate(request)
-        print(f"Bearer token result: {result}")
-        return result
+        principal = principal_store.get(user_id)
+        if principal is None:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+        if not principal.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        return principal.build_user()
@@ -0,0 +1,274 @@
+"""
+ابزارهای بنچمارک: ساخت دیتای واقعی‌نما (هزاران باشگاه، مشتری، ممبرشیپ، ورود/خروج و تراکنش)
+و پیدا کردن همه مسیرهای Fitno.urls برای اندازه‌گیری تعداد کوئری و latency.
+بودجه کوئری مسیرهای هر اپ در ماژول budgets همان اپ تعریف و در تست‌های همان اپ بررسی میشه؛
+دستور benchmark_endpoints فقط گزارش میده.
+"""
+import random
+from datetime import timedelta
+from functools import cache
+from importlib import import_module
+
+from django.apps import apps
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.test import Client
+from django.urls import URLPattern, URLResolver, get_resolver
+from django.utils import timezone
+from django.utils.module_loading import module_has_submodule
+
+from accounts.cache import LocalInvalidationBackend, invalidation
+from accounts.models import User, Customer, GymManager, PlatformManager, PlatformSettings, APIKey
+from accounts.otp import otp_store, LocalOTPBackend
+from accounts.ratelimit import rate_limiter, LocalRateLimitBackend
+from accounts.tokens import RoleRefreshToken
+from communications.models import Ticket, Notification, Announcement
+from communications.unread import unread_counter, LocalUnreadBackend
+from gyms.models import Gym, GymBanner, GymFacility, MemberShipType, MemberShip, InOut, Closet, Rate
+from gyms.occupancy import occupancy, LocalOccupancyBackend
+from gyms.search import build_search_text, normalize_persian, parse_facility_tags, update_search_vectors
+from gyms.stats import refresh_gym_stats
+from payments.models import Transaction
+from payments.parties import PLATFORM_NAME, DIRECTION_IN, DIRECTION_OUT, DIRECTION_COMMISSION
+
+EXCLUDED_PREFIXES = ('admin/', 'schema/', 'swagger/')
+FACILITIES = ['استخر', 'سونا', 'پارکینگ', 'جکوزی', 'کافه', 'بدنسازی', 'کراسفیت', 'یوگا']
+CITIES = ['تهران', 'کرج', 'اصفهان', 'شیراز', 'مشهد']
+
+DEFAULT_QUERY_BUDGET = 10
+DEFAULT_P95_BUDGET_MS = 300
+
+# جدول‌های هر اپ در ماژول budgets همان اپ (مثل accounts.budgets)
+ROUTE_TABLES = ('ENDPOINT_BUDGETS', 'PK_RESOLVERS', 'ROUTE_QUERIES', 'EXPECTED_STATUS')
+
+
+def seed_benchmark_data(gyms=1000, customers=5000, gyms_per_manager=10, memberships_per_customer=2,
+                        inouts_per_customer=4, notifications_per_customer=5, seed=0):
+    """
+    دیتای بنچمارک رو با bulk_create می‌سازه (سیگنال‌ها اجرا نمیشن).
+    خروجی: dict شامل کاربران نمونه برای هر پنل و API Key.
+    """
+    rnd = random.Random(seed)
+    today = timezone.now().date()
+    now = timezone.now()
+    password = make_password('benchmark')
+    phone_seq = iter(range(10 ** 8, 10 ** 9))
+
+    def new_users(count, prefix):
+        return User.objects.bulk_create([
+            User(phone=f"09{next(phone_seq)}"[:11], full_name=f"{prefix} {i}", password=password)
+            for i in range(count)
+        ])
+
+    # مدیرها و باشگاه‌ها
+    manager_count = max(1, gyms // gyms_per_manager)
+    managers = GymManager.objects.bulk_create([GymManager(user=u) for u in new_users(manager_count, 'manager')])
+    coordinates = [(round(35.6 + rnd.uniform(-0.3, 0.3), 6), round(51.4 + rnd.uniform(-0.3, 0.3), 6))
+                   for _ in range(gyms)]
+    cities = [rnd.choice(CITIES) for _ in range(gyms)]
+    gym_objs = Gym.objects.bulk_create([
+        Gym(
+            title=f"Gym {i}", manager=managers[i % manager_count], address=f"Street {i}",
+            location=f"{coordinates[i][0]},{coordinates[i][1]}",
+            latitude=coordinates[i][0], longitude=coordinates[i][1],
+            main_img='gym_img/main_imgs/download_1.png', phone='021000000', headline_phone='021000000',
+            gender=rnd.choice(['both', 'male', 'female']), commission_type='gym',
+            facilities=','.join(rnd.sample(FACILITIES, 3)), description='benchmark gym',
+            city=cities[i], city_search=normalize_persian(cities[i]),
+            search_text=build_search_text(f"Gym {i}", f"Street {i}", 'benchmark gym'),
+            work_hours_per_day='8-22', work_days_per_week='6', is_active=True,
+        )
+        for i in range(gyms)
+    ])
+    GymFacility.objects.bulk_create([
+        GymFacility(gym=gym, tag=tag) for gym in gym_objs for tag in parse_facility_tags(gym.facilities)
+    ])
+    update_search_vectors(Gym.objects.filter(id__in=[gym.id for gym in gym_objs]))
+    types = MemberShipType.objects.bulk_create([
+        MemberShipType(title=f"Monthly {gym.id}", gyms=gym, days=30, price=rnd.randint(5, 50) * 100000)
+        for gym in gym_objs
+    ])
+    Closet.objects.bulk_create([Closet(gym=gym, number=str(n)) for gym in gym_objs for n in range(5)])
+    GymBanner.objects.bulk_create([
+        GymBanner(gym=gym, banner='gym_img/banner_img/benchmark.jpg', is_main=True, title=gym.title)
+        for gym in gym_objs
+    ])
+
+    # مشتری‌ها
+    customer_objs = Customer.objects.bulk_create([
+        Customer(user=u, city='Tehran', gender=rnd.choice(['male', 'female']))
+        for u in new_users(customers, 'customer')
+    ])
+
+    platform_settings = PlatformSettings.objects.first() or PlatformSettings.objects.create()
+    user_ct = ContentType.objects.get_for_model(User)
+    platform_ct = ContentType.objects.get_for_model(PlatformSettings)
+
+    # تراکنش و ممبرشیپ
+    membership_pairs = []
+    for customer in customer_objs:
+        for index in rnd.sample(range(gyms), min(memberships_per_customer, gyms)):
+            membership_pairs.append((customer, index))
+    transactions = Transaction.objects.bulk_create([
+        Transaction(payer_content_type=user_ct, payer_object_id=customer.user_id,
+                    receiver_content_type=platform_ct, receiver_object_id=platform_settings.id,
+                    payer_name=customer.user.full_name, receiver_name=PLATFORM_NAME, direction=DIRECTION_IN,
+                    price=types[index].price)
+        for customer, index in membership_pairs
+    ])
+    Transaction.objects.bulk_create([
+        Transaction(payer_content_type=platform_ct, payer_object_id=platform_settings.id,
+                    receiver_content_type=user_ct, receiver_object_id=manager.user_id,
+                    payer_name=PLATFORM_NAME, receiver_name=manager.user.full_name, price=1000000,
+                    is_commission=i % 2 == 0, direction=DIRECTION_COMMISSION if i % 2 == 0 else DIRECTION_OUT)
+        for i, manager in enumerate(managers)
+    ])
+    memberships = []
+    for (customer, index), transaction in zip(membership_pairs, transactions):
+        validity_date = today + timedelta(days=rnd.randint(-15, 30))
+        session_left = rnd.randint(0, 12)
+        memberships.append(MemberShip(
+            customer=customer, gym=gym_objs[index], type=types[index], transaction=transaction,
+            start_date=today - timedelta(days=10), validity_date=validity_date, session_left=session_left,
+            active_until=MemberShip.compute_active_until(validity_date, session_left),
+            price=types[index].price, days=30, is_active=True,
+        ))
+    memberships = MemberShip.objects.bulk_create(memberships)
+
+    # ورود و خروج‌ها (آخرین ورود هر مشتری ممکنه هنوز باز یا در انتظار تایید باشه)
+    inouts = []
+    for membership in memberships[::max(1, memberships_per_customer)]:
+        for n in range(inouts_per_customer):
+            enter = now - timedelta(days=n, hours=rnd.randint(0, 8))
+            state = rnd.random() if n == 0 else 1
+            is_open, is_pending = state < 0.1, 0.1 <= state < 0.15
+            inouts.append(InOut(
+                customer=membership.customer, gym=membership.gym, subscription=membership,
+                enter_time=None if is_pending else enter,
+                out_time=None if is_open or is_pending else enter + timedelta(hours=1),
+                confirm_in=not is_pending,
+            ))
+    InOut.objects.bulk_create(inouts)
+
+    Rate.objects.bulk_create([
+        Rate(customer=membership.customer, gym=membership.gym, rate=rnd.randint(1, 5))
+        for membership in memberships[::3]
+    ])
+
+    # ارتباطات
+    Notification.objects.bulk_create([
+        Notification(user_id=customer.user_id, action='info', message=f"Notification {n}", is_read=n > 1)
+        for customer in customer_objs for n in range(notifications_per_customer)
+    ])
+    Announcement.objects.bulk_create(
+        [Announcement(type='gym', gym=gym, sender_id=gym.manager.user_id, message='gym news') for gym in gym_objs]
+        + [Announcement(type='platform', message=f"platform news {n}") for n in range(20)]
+    )
+    for customer in customer_objs[:500]:
+        parent = Ticket.objects.create(sender_id=customer.user_id, message='help')
+        for depth in range(3):
+            parent = Ticket.objects.create(sender_id=customer.user_id, message=f"reply {depth}", replied_to=parent)
+
+    # کاربران نمونه برای هر پنل: پرکارترین مشتری و مدیر
+    heavy_customer = customer_objs[0]
+    heavy_manager = managers[0]
+    MemberShip.objects.bulk_create([
+        MemberShip(customer=heavy_customer, gym=gym_objs[i], type=types[i], start_date=today,
+                   validity_date=today + timedelta(days=30), session_left=10,
+                   active_until=today + timedelta(days=30), price=types[i].price, days=30, is_active=True)
+        for i in range(0, min(gyms, 50))
+    ])
+    # bulk_create سیگنال نداره؛ آمار باشگاه‌ها یک بار دسته‌ای حساب میشه
+    refresh_gym_stats([gym.id for gym in gym_objs])
+
+    admin_user = new_users(1, 'admin')[0]
+    PlatformManager.objects.create(user=admin_user, access_code='bench', password='bench')
+    api_key = APIKey.objects.create(client_name='benchmark')
+
+    return {
+        'customer_user': heavy_customer.user,
+        'manager_user': heavy_manager.user,
+        'admin_user': admin_user,
+        'api_key': api_key.key,
+        'counts': {
+            'gyms': gyms,
+            'customers': customers,
+            'memberships': MemberShip.objects.count(),
+            'inouts': InOut.objects.count(),
+            'transactions': Transaction.objects.count(),
+            'notifications': Notification.objects.count(),
+        },
+    }
+
+
+def iter_routes(patterns=None, prefix=''):
+    """همه مسیرهای GET پروژه (به جز ادمین جنگو و اسکیما) به صورت (مسیر، نام)"""
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    for pattern in patterns:
+        route = prefix + str(pattern.pattern)
+        if route.startswith(EXCLUDED_PREFIXES):
+            continue
+        if isinstance(pattern, URLResolver):
+            yield from iter_routes(pattern.url_patterns, route)
+        elif isinstance(pattern, URLPattern):
+            view_class = getattr(pattern.callback, 'view_class', None)
+            if view_class is None or hasattr(view_class, 'get'):
+                yield route, pattern.name
+
+
+def use_local_backends():
+    """شمارنده‌ها و محدودیت نرخ داخل حافظه (بدون Redis)؛ محدودیت نرخ نباید روی اندازه‌گیری اثر بذاره"""
+    rate_limiter.backend = LocalRateLimitBackend()
+    rate_limiter.groups = {'default': {'match': [], 'limit': 10 ** 9, 'window': 3600}}
+    unread_counter.backend = LocalUnreadBackend()
+    occupancy.backend = LocalOccupancyBackend()
+    otp_store.backend = LocalOTPBackend()
+    invalidation.backend = LocalInvalidationBackend()
+
+
+@cache
+def route_tables():
+    """جدول‌های ROUTE_TABLES همه اپ‌ها که ماژول budgets دارن، ادغام شده"""
+    tables = {name: {} for name in ROUTE_TABLES}
+    for app_config in apps.get_app_configs():
+        if module_has_submodule(app_config.module, 'budgets'):
+            module = import_module(f"{app_config.name}.budgets")
+            for name in ROUTE_TABLES:
+                tables[name].update(getattr(module, name, {}))
+    return tables
+
+
+def query_budget(route):
+    return route_tables()['ENDPOINT_BUDGETS'].get(route, (DEFAULT_QUERY_BUDGET, DEFAULT_P95_BUDGET_MS))
+
+
+def expected_status(route):
+    return route_tables()['EXPECTED_STATUS'].get(route, 200)
+
+
+def endpoint_path(ctx, route):
+    """مسیر قابل درخواست: <int:pk> با شناسه معتبر از دید کاربر و query string اجباری"""
+    tables = route_tables()
+    path = route
+    if route in tables['PK_RESOLVERS']:
+        pk = tables['PK_RESOLVERS'][route](ctx)
+        path = route.replace('<int:pk>', str(pk or 0))
+    path = '/' + path
+    if route in tables['ROUTE_QUERIES']:
+        path = f"{path}?{tables['ROUTE_QUERIES'][route]}"
+    return path
+
+
+def endpoint_client(ctx, route, **extra):
+    """Client با توکن کاربر نمونه پنل همان مسیر (مشتری، مدیر باشگاه یا ادمین) و API Key"""
+    if '/gym-panel/' in f"/{route}":
+        user = ctx['manager_user']
+    elif '/admin-panel/' in f"/{route}":
+        user = ctx['admin_user']
+    else:
+        user = ctx['customer_user']
+    user.refresh_from_db()
+    token = str(RoleRefreshToken.for_user(user).access_token)
+    return Client(HTTP_X_API_KEY=ctx['api_key'], HTTP_AUTHORIZATION=f"Bearer {token}",
+                  **extra)
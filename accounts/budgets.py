@@ -0,0 +1,31 @@
+"""
+بودجه کوئری مسیرهای GET اپ accounts؛ در accounts.tests بررسی و در گزارش benchmark_endpoints نوشته میشه.
+مسیر جدید وقتی بودجه پیش‌فرض (accounts.benchmark.DEFAULT_QUERY_BUDGET) کافی نیست به ENDPOINT_BUDGETS اضافه میشه؛
+مسیر <int:pk> یک resolver در PK_RESOLVERS، پارامتر اجباری در ROUTE_QUERIES و پاسخ غیر 200 عمدی در EXPECTED_STATUS لازم داره.
+"""
+from accounts.benchmark import DEFAULT_P95_BUDGET_MS
+from gyms.models import MemberShip
+
+# (حداکثر کوئری، حداکثر p95 به میلی‌ثانیه)
+ENDPOINT_BUDGETS = {
+    # صفحه‌بندی keyset (بدون COUNT): صفحه مشتری‌ها با is_active به صورت Exists
+    'accounts/gym-panel/customers/': (1, DEFAULT_P95_BUDGET_MS),
+    'accounts/admin-panel/customers/': (1, DEFAULT_P95_BUDGET_MS),
+}
+
+# شناسه معتبر از دید کاربر نمونه همان پنل (ctx خروجی seed_benchmark_data)
+PK_RESOLVERS = {
+    'accounts/gym-panel/customers/<int:pk>':
+        lambda ctx: MemberShip.objects.filter(gym__manager__user=ctx['manager_user']).values_list(
+            'customer_id', flat=True).first(),
+    'accounts/admin-panel/customers/<int:pk>/': lambda ctx: ctx['customer_user'].customer.id,
+}
+
+ROUTE_QUERIES = {
+    'accounts/otp-status/': 'phone=09120000000',
+}
+
+EXPECTED_STATUS = {
+    # برای این شماره کد OTP صادر نشده
+    'accounts/otp-status/': 404,
+}
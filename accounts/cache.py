@@ -0,0 +1,161 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class LocalTTLCache:
+    """کش LRU داخل پروسس با TTL؛ thread-safe و بدون هیچ I/O."""
+    MISSING = object()
+
+    def __init__(self, ttl, maxsize):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """مقدار ذخیره شده یا LocalTTLCache.MISSING"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return self.MISSING
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return self.MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class HitCounter:
+    """شمارنده‌های hit/miss برای کش‌ها"""
+
+    def __init__(self, *names):
+        self._counts = dict.fromkeys(names, 0)
+        self._lock = threading.Lock()
+
+    def incr(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counts)
+
+
+class RedisInvalidationBackend:
+    """ارسال و دریافت پیام‌های حذف کلید روی یک کانال pub/sub مشترک بین همه پروسس‌ها"""
+    CHANNEL = "local-cache:invalidate"
+
+    def __init__(self):
+        from django_redis import get_redis_connection
+        self.client = get_redis_connection(getattr(settings, 'LOCAL_CACHE_INVALIDATION_CACHE_ALIAS', 'default'))
+
+    def publish(self, message):
+        self.client.publish(self.CHANNEL, message)
+
+    def listen(self, on_message, on_subscribe):
+        """در thread جدا اجرا میشه و بعد از قطع اتصال دوباره subscribe می‌کنه"""
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.CHANNEL)
+                on_subscribe()
+                for message in pubsub.listen():
+                    on_message(message['data'].decode())
+            except Exception as e:
+                logger.warning("local cache invalidation channel unavailable: %s", e)
+                time.sleep(1)
+
+
+class LocalInvalidationBackend:
+    """بدون Redis (تست‌ها و اجرای لوکال): فقط کش‌های همین پروسس پاک میشن"""
+
+    def publish(self, message):
+        pass
+
+    def listen(self, on_message, on_subscribe):
+        pass
+
+
+class CacheInvalidation:
+    """
+    حذف یک کلید از LRU داخل پروسس همه worker ها (gunicorn/daphne).
+    هر پروسس در اولین استفاده یک thread برای گوش دادن به کانال باز می‌کنه؛ بعد از هر (دوباره) subscribe
+    کل کش‌های محلی پاک میشن چون پیام‌های زمان قطعی از دست رفتن.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self._caches = {}
+        self._listener_pid = None
+        self._lock = threading.Lock()
+
+    def get_backend(self):
+        if self.backend is None:
+            backend_path = getattr(settings, 'LOCAL_CACHE_INVALIDATION_BACKEND',
+                                   'accounts.cache.RedisInvalidationBackend')
+            try:
+                self.backend = import_string(backend_path)()
+            except Exception as e:
+                logger.warning("local cache invalidation backend unavailable: %s", e)
+                self.backend = LocalInvalidationBackend()
+        return self.backend
+
+    def register(self, name, local_cache):
+        self._caches[name] = local_cache
+
+    def ensure_listening(self):
+        # بعد از fork (gunicorn --preload) پروسس فرزند thread خودش رو لازم داره
+        if self._listener_pid == os.getpid():
+            return
+        with self._lock:
+            if self._listener_pid == os.getpid():
+                return
+            self._listener_pid = os.getpid()
+            threading.Thread(
+                target=self.get_backend().listen, args=(self._on_message, self.clear_all),
+                name="local-cache-invalidation", daemon=True,
+            ).start()
+
+    def publish(self, name, key):
+        self._on_message(f"{name}:{key}")
+        try:
+            self.get_backend().publish(f"{name}:{key}")
+        except Exception as e:
+            logger.warning("local cache invalidation channel unavailable: %s", e)
+
+    def _on_message(self, message):
+        name, _, key = message.partition(':')
+        local_cache = self._caches.get(name)
+        if local_cache is not None:
+            local_cache.delete(key)
+
+    def clear_all(self):
+        for local_cache in self._caches.values():
+            local_cache.clear()
+
+
+invalidation = CacheInvalidation()
@@ -0,0 +1,97 @@
+"""
+احراز هویت WebSocket با همان JWT و API Key ای که HTTP استفاده می‌کنه.
+توکن از کوکی access_token، پارامتر token در query string یا subprotocol (["access_token", "<jwt>"]) خونده میشه.
+API Key از هدر x-api-key یا پارامتر api_key (مرورگر برای WebSocket هدر دلخواه نمی‌فرسته).
+"""
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from channels.security.websocket import WebsocketDenier
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.http.cookie import parse_cookie
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.api_keys import api_key_store
+from accounts.principal import principal_store
+
+TOKEN_SUBPROTOCOL = "access_token"
+
+
+def _header(scope, name):
+    for key, value in scope.get("headers", []):
+        if key.decode("latin1").lower() == name:
+            return value.decode("latin1")
+    return None
+
+
+def get_scope_token(scope):
+    """(توکن، subprotocol ای که باید در accept برگردونده بشه)"""
+    cookies = parse_cookie(_header(scope, "cookie") or "")
+    token = cookies.get(settings.SIMPLE_JWT['AUTH_COOKIE'])
+    if token:
+        return token, None
+
+    query = parse_qs(scope.get("query_string", b"").decode())
+    if query.get("token"):
+        return query["token"][0], None
+
+    subprotocols = scope.get("subprotocols") or []
+    if TOKEN_SUBPROTOCOL in subprotocols:
+        index = subprotocols.index(TOKEN_SUBPROTOCOL)
+        if index + 1 < len(subprotocols):
+            return subprotocols[index + 1], TOKEN_SUBPROTOCOL
+    return None, None
+
+
+def get_scope_api_key(scope):
+    api_key = _header(scope, "x-api-key")
+    if api_key:
+        return api_key
+    query = parse_qs(scope.get("query_string", b"").decode())
+    return query.get("api_key", [None])[0]
+
+
+@database_sync_to_async
+def _is_valid_api_key(api_key):
+    return api_key_store.is_valid(api_key)
+
+
+@database_sync_to_async
+def _get_principal(user_id):
+    return principal_store.get(user_id)
+
+
+async def get_scope_user(raw_token):
+    """یوزر از principal کش شده؛ توکن نامعتبر یا کاربر غیرفعال → AnonymousUser"""
+    if not raw_token:
+        return AnonymousUser()
+    try:
+        user_id = AccessToken(raw_token).get(api_settings.USER_ID_CLAIM)
+    except TokenError:
+        return AnonymousUser()
+    if user_id is None:
+        return AnonymousUser()
+
+    principal = await _get_principal(user_id)
+    if principal is None or not principal.is_active:
+        return AnonymousUser()
+    return principal.build_user()
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """معادل APIKeyMiddleware + CustomJWTAuthentication برای کانکشن‌های WebSocket"""
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "websocket":
+            return await super().__call__(scope, receive, send)
+
+        if not await _is_valid_api_key(get_scope_api_key(scope)):
+            return await WebsocketDenier()(scope, receive, send)
+
+        raw_token, subprotocol = get_scope_token(scope)
+        scope = dict(scope, user=await get_scope_user(raw_token), auth_subprotocol=subprotocol)
+        return await super().__call__(scope, receive, send)
@@ -0,0 +1,83 @@
+import time
+import uuid
+
+from django.db import connection, transaction
+from django.core.management.base import BaseCommand
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import User
+from accounts.otp import DatabaseOTPBackend, LocalOTPBackend, RedisOTPBackend, VERIFY_LOCKED, VERIFY_OK, \
+    generate_code
+
+WRITE_PREFIXES = ('INSERT', 'UPDATE', 'DELETE')
+
+
+def count_writes(queries):
+    return sum(1 for query in queries if query['sql'].lstrip().upper().startswith(WRITE_PREFIXES))
+
+
+class Command(BaseCommand):
+    help = "login storm: صدور و تایید OTP برای n کاربر روی بک‌اند Redis و جدول OTP و شمارش نوشتن‌های دیتابیس"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--backend', choices=['redis', 'local'], default='redis',
+                            help="local یعنی بک‌اند داخل حافظه با رفتار Redis (بدون سرور Redis)")
+        parser.add_argument('--wrong-attempts', type=int, default=3, help="تعداد کد اشتباه قبل از کد درست برای هر کاربر")
+        parser.add_argument('--max-attempts', type=int, default=5)
+
+    def run(self, label, backend, users, wrong_attempts, max_attempts):
+        codes = {}
+        with CaptureQueriesContext(connection) as issue_ctx:
+            started = time.perf_counter()
+            for user in users:
+                codes[user.phone] = generate_code()
+                backend.issue(user, user.phone, codes[user.phone], ttl=120, cooldown=0)
+            issue_elapsed = time.perf_counter() - started
+
+        ok = 0
+        with CaptureQueriesContext(connection) as verify_ctx:
+            started = time.perf_counter()
+            for user in users:
+                wrong = str((int(codes[user.phone]) + 1) % 100000).zfill(5)
+                for _ in range(wrong_attempts):
+                    backend.verify(user.phone, wrong, max_attempts)
+                ok += backend.verify(user.phone, codes[user.phone], max_attempts) == VERIFY_OK
+            verify_elapsed = time.perf_counter() - started
+
+        n = len(users)
+        self.stdout.write(
+            f"{label:<10} issue: {issue_elapsed * 1000 / n:7.3f}ms/user  "
+            f"{len(issue_ctx.captured_queries) / n:5.2f} queries  {count_writes(issue_ctx.captured_queries) / n:5.2f} writes"
+        )
+        self.stdout.write(
+            f"{'':<10} verify: {verify_elapsed * 1000 / n:6.3f}ms/user  "
+            f"{len(verify_ctx.captured_queries) / n:5.2f} queries  {count_writes(verify_ctx.captured_queries) / n:5.2f} writes"
+            f"  (ok {ok}/{n}, {wrong_attempts} wrong attempts each)"
+        )
+
+    def check_lockout(self, label, backend, user, max_attempts):
+        code = generate_code()
+        backend.issue(user, user.phone, code, ttl=120, cooldown=0)
+        wrong = str((int(code) + 1) % 100000).zfill(5)
+        for _ in range(max_attempts):
+            backend.verify(user.phone, wrong, max_attempts)
+        locked = backend.verify(user.phone, code, max_attempts) == VERIFY_LOCKED
+        # درخواست کد جدید نباید شمارنده تلاش‌ها رو صفر کنه
+        code = generate_code()
+        backend.issue(user, user.phone, code, ttl=120, cooldown=0)
+        still_locked = backend.verify(user.phone, code, max_attempts) == VERIFY_LOCKED
+        self.stdout.write(f"{label:<10} correct code after {max_attempts} wrong attempts locked: {locked}, "
+                          f"after resend: {still_locked}")
+
+    def handle(self, *args, **options):
+        primary = RedisOTPBackend() if options['backend'] == 'redis' else LocalOTPBackend()
+        prefix = uuid.uuid4().hex[:4]
+        with transaction.atomic():
+            users = User.objects.bulk_create([
+                User(phone=f"09{prefix}{i:05d}", full_name=f"bench {i}") for i in range(options['users'])
+            ])
+            for label, backend in ((options['backend'], primary), ('database', DatabaseOTPBackend())):
+                self.run(label, backend, users, options['wrong_attempts'], options['max_attempts'])
+                self.check_lockout(label, backend, users[0], options['max_attempts'])
+            transaction.set_rollback(True)
@@ -0,0 +1,52 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from accounts.ratelimit import SlidingWindowRateLimiter, RedisRateLimitBackend, LocalRateLimitBackend
+
+
+def legacy_hit(cache_key, limit=10 ** 9, window=3600):
+    """الگوریتم قبلی GlobalRateLimitMiddleware: cache.get و بعد cache.set روی یک dict"""
+    data = cache.get(cache_key, {"count": 0, "start_time": time.time()})
+    if time.time() - data["start_time"] > window:
+        data = {"count": 0, "start_time": time.time()}
+    data["count"] += 1
+    cache.set(cache_key, data, timeout=window)
+    return data["count"] <= limit
+
+
+class Command(BaseCommand):
+    help = "مقایسه محدودکننده نرخ قبلی (get/set) با sliding window اتمیک در 1k و 10k درخواست"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, nargs='+', default=[1000, 10000])
+        parser.add_argument('--workers', type=int, default=16)
+        parser.add_argument('--backend', choices=['redis', 'local'], default='redis')
+
+    def run(self, label, func, total, workers):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(lambda _: func(), range(total)))
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"{label:<10} n={total:<6} {elapsed:8.3f}s  {total / elapsed:10.0f} req/s")
+
+    def handle(self, *args, **options):
+        backend = RedisRateLimitBackend() if options['backend'] == 'redis' else LocalRateLimitBackend()
+        groups = {'default': {'match': [], 'limit': 10 ** 9, 'window': 3600}}
+        limiter = SlidingWindowRateLimiter(backend=backend, groups=groups)
+
+        for total in options['requests']:
+            ident = uuid.uuid4().hex
+            legacy_key = f"rate_limit_bench_{ident}"
+            self.run('legacy', lambda: legacy_hit(legacy_key), total, options['workers'])
+            counted = cache.get(legacy_key)["count"]
+            self.stdout.write(f"{'':<10} counted {counted}/{total} (lost increments: {total - counted})")
+            cache.delete(legacy_key)
+
+            self.run('sliding', lambda: limiter.check('/bench/', ident), total, options['workers'])
+            _, remaining, _ = limiter.check('/bench/', ident)
+            counted = 10 ** 9 - remaining - 1
+            self.stdout.write(f"{'':<10} counted {counted}/{total} (lost increments: {total - counted})")
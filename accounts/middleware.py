@@ -1,9 +1,11 @@
-from django.utils.deprecation import MiddlewareMixin
-import time
-from django.core.cache import cache
+from django.conf import settings
 from django.http import JsonResponse
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
 
-from accounts.models import APIKey
+from accounts.api_keys import api_key_store
+from accounts.ratelimit import rate_limiter
 
 
 class APIKeyMiddleware:
@@ -27,53 +29,57 @@ class APIKeyMiddleware:
         if not api_key:
             return JsonResponse({"detail": "API Key missing."}, status=403)
 
-        # بررسی اعتبار کلید
-        try:
-            key_obj = APIKey.objects.get(key=api_key, is_active=True)
-        except APIKey.DoesNotExist:
+        # بررسی اعتبار کلید (از کش دو سطحی، نه هر بار از دیتابیس)
+        if not api_key_store.is_valid(api_key):
             return JsonResponse({"detail": "Invalid or inactive API Key."}, status=403)
 
         return self.get_response(request)
 
 
 class GlobalRateLimitMiddleware:
-    RATE_LIMIT = 1000  # حداکثر ریکوئست
-    TIME_WINDOW = 3600  # بازه زمانی (ثانیه = یک ساعت)
+    """
+    محدودیت نرخ سراسری با یک رفت و برگشت اتمیک به Redis (accounts.ratelimit).
+    چون این میدلور قبل از احراز هویت DRF اجرا میشه، شناسه کاربر مستقیما از JWT خونده میشه.
+    """
 
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
-        # کلید یکتا برای هر کاربر (ترجیحا بر اساس IP یا user.id)
-        if hasattr(request, 'user') and request.user.is_authenticated:
-            ident = f"user_{request.user.id}"
+        # کلید یکتا برای هر کاربر (ترجیحا بر اساس user.id یا IP)
+        user_id = self.get_token_user_id(request)
+        if user_id is not None:
+            ident = f"user_{user_id}"
         else:
             ident = f"ip_{self.get_client_ip(request)}"
 
-        # گرفتن تعداد درخواست‌ها از کش
-        cache_key = f"rate_limit_{ident}"
-        data = cache.get(cache_key, {"count": 0, "start_time": time.time()})
-
-        # بررسی اینکه آیا بازه یک ساعته گذشته یا نه
-        elapsed = time.time() - data["start_time"]
-        if elapsed > self.TIME_WINDOW:
-            data = {"count": 0, "start_time": time.time()}
-
-        # افزایش شمارش
-        data["count"] += 1
+        allowed, remaining, retry_after = rate_limiter.check(request.path, ident)
 
         # اگر بیشتر از حد مجاز → خطای 429
-        if data["count"] > self.RATE_LIMIT:
-            return JsonResponse(
+        if not allowed:
+            response = JsonResponse(
                 {"detail": "Rate limit exceeded. Try again later."},
                 status=429
             )
-
-        # ذخیره دوباره در کش
-        cache.set(cache_key, data, timeout=self.TIME_WINDOW)
+            response["Retry-After"] = str(retry_after)
+            return response
 
         return self.get_response(request)
 
+    def get_token_user_id(self, request):
+        """استخراج user_id از توکن (کوکی یا هدر Bearer) بدون کوئری دیتابیس."""
+        raw_token = request.COOKIES.get(settings.SIMPLE_JWT['AUTH_COOKIE'])
+        if not raw_token:
+            header = request.headers.get("Authorization", "")
+            if header.startswith("Bearer "):
+                raw_token = header[len("Bearer "):].strip()
+        if not raw_token:
+            return None
+        try:
+            return AccessToken(raw_token).get(api_settings.USER_ID_CLAIM)
+        except TokenError:
+            return None
+
     def get_client_ip(self, request):
         """استخراج IP کلاینت (در صورت عدم لاگین)."""
         x_forwarded_for = request.META.get("HTTP_X_FORWARDED_FOR")
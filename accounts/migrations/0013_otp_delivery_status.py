@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-17 17:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0012_user_role_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='otp',
+            name='delivery_attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='otp',
+            name='delivery_error',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='otp',
+            name='delivery_status',
+            field=models.CharField(choices=[('pending', 'در صف ارسال'), ('sent', 'ارسال شده'), ('failed', 'ناموفق')], default='pending', max_length=20),
+        ),
+    ]
@@ -0,0 +1,22 @@
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+
+
+class NotFoundOnEmptyListMixin:
+    """
+    لیست بدون کوئری exists() جداگانه: صفحه یک بار ارزیابی میشه و اگر خالی بود
+    و empty_list_message تعریف شده باشه 404 برمی‌گرده، وگرنه payload خالی.
+    """
+    empty_list_message = None
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        objects = list(page) if page is not None else list(queryset)
+        if not objects and self.empty_list_message is not None:
+            raise NotFound(self.empty_list_message)
+
+        serializer = self.get_serializer(objects, many=True)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
@@ -1,10 +1,8 @@
 import secrets
-import requests
 from django.contrib.auth.base_user import AbstractBaseUser
 from django.contrib.auth.models import AbstractUser, PermissionsMixin
 from django.db import models
 from django.utils import timezone
-from Fitno import settings
 from accounts.managers import CustomUserManager
 
 
@@ -49,6 +47,7 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_deleted = models.BooleanField(default=False)
     is_staff = models.BooleanField(default=False)
     is_superuser = models.BooleanField(default=False)
+    role_version = models.PositiveIntegerField(default=0)  # با هر تغییر نقش زیاد میشه تا claim های توکن باطل بشن
 
     objects = CustomUserManager()
 
@@ -58,62 +57,35 @@ class User(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return self.phone
 
+    def save(self, *args, **kwargs):
+        # یوزر درخواست از کش principal ساخته میشه و ممکنه قدیمی باشه؛ ذخیره‌اش مقادیر قدیمی رو برمی‌گردونه
+        if getattr(self, 'from_principal_cache', False):
+            raise RuntimeError("User was built from the principal cache; reload it from the database before saving.")
+        super().save(*args, **kwargs)
+
 
 class OTP(models.Model):
+    DELIVERY_PENDING = 'pending'
+    DELIVERY_SENT = 'sent'
+    DELIVERY_FAILED = 'failed'
+    DELIVERY_CHOICES = (
+        (DELIVERY_PENDING, 'در صف ارسال'),
+        (DELIVERY_SENT, 'ارسال شده'),
+        (DELIVERY_FAILED, 'ناموفق'),
+    )
+
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='otps')
     code = models.CharField(max_length=5)
     created_at = models.DateTimeField(auto_now_add=True)
     expires_at = models.DateTimeField()
+    delivery_status = models.CharField(max_length=20, choices=DELIVERY_CHOICES, default=DELIVERY_PENDING)
+    delivery_attempts = models.PositiveSmallIntegerField(default=0)
+    delivery_error = models.CharField(max_length=255, null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)  # تلاش‌های اشتباه (از کد قبلی داخل پنجره قفل به ارث می‌رسه)
 
     def is_valid(self):
         return timezone.now() <= self.expires_at
 
-    def send_otp(self, phone, otp_code):
-        url = "https://edge.ippanel.com/v1/api/send"
-        api_key = settings.FARAZ_API_KEY
-        phone = '+98' + phone[1:]  # فرمت شماره تلفن
-        headers = {
-            "Authorization": api_key,
-            "Content-Type": "application/json"
-        }
-        print(phone)
-        print(otp_code)
-        message = f"به فیتنو خوش آمدید\nبزرگترین پلتفرم مدیریت باشگاه های ورزشی در ایران\nـــــــ\nکد شما: {otp_code}"
-        print(message)
-        payload = {
-            "sending_type": "webservice",
-            "from_number": "+983000505",  # شماره فرستنده
-            "message": message,
-            "params": {
-                "recipients": [phone, ]
-            }
-        }
-        try:
-            response = requests.post(url, json=payload, headers=headers, timeout=10)
-            print(f"Status Code: {response.status_code}")
-            print(f"Response Headers: {response.headers}")
-            print(f"Response Body: {response.text}")
-
-            try:
-                response_json = response.json()
-                print(f"Response JSON: {response_json}")
-
-                # گرفتن status از داخل meta
-                meta = response_json.get("meta", {})
-                status_ok = meta.get("status") is True
-
-                if status_ok:
-                    print(f"OTP for {phone}: {otp_code}")
-                    return True, "پیامک با موفقیت ارسال شد"
-                else:
-                    return False, f"خطا در ارسال پیامک: {meta.get('message', 'نامشخص')}"
-            except ValueError:
-                print("Response is not valid JSON")
-                return False, "خطا در ارسال پیامک: پاسخ API معتبر نیست"
-        except requests.exceptions.RequestException as e:
-            print(f"Request Error: {str(e)}")
-            return False, f"خطا در ارتباط با سرویس پیامک: {str(e)}"
-
 
 class Customer(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='customer')
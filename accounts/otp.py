@@ -0,0 +1,280 @@
+"""
+ذخیره و بررسی کدهای OTP.
+بک‌اند اصلی Redis است: کد به صورت هش (HMAC با SECRET_KEY) با TTL خود Redis نگه داشته میشه،
+تعداد تلاش‌های اشتباه برای هر شماره در کلید جدا (otp:fail:{phone}) شمرده میشه و با درخواست کد جدید
+صفر نمیشه؛ قفل تا پایان پنجره OTP_LOCKOUT_WINDOW (بلندتر از عمر کد) می‌مونه. بین دو درخواست کد فاصله (cooldown) لازمه.
+جدول OTP فقط به عنوان fallback (قطعی Redis یا OTP_BACKEND دیتابیسی) استفاده میشه.
+"""
+import hashlib
+import hmac
+import logging
+import secrets
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from accounts.sms import DELIVERY_PENDING
+
+logger = logging.getLogger(__name__)
+
+VERIFY_OK = 'ok'
+VERIFY_INVALID = 'invalid'
+VERIFY_MISSING = 'missing'
+VERIFY_LOCKED = 'locked'
+
+# بررسی و مصرف کد در یک رفت و برگشت؛ کد درست حذف میشه و شمارنده خطا پاک میشه، کد اشتباه شمارنده خطای
+# شماره رو زیاد می‌کنه (پنجره قفل از اولین خطا شروع میشه و با کد جدید ریست نمیشه)
+VERIFY_LUA = """
+local failures = tonumber(redis.call('GET', KEYS[2]) or '0')
+if failures >= tonumber(ARGV[2]) then
+    return 'locked'
+end
+local stored = redis.call('HGET', KEYS[1], 'hash')
+if not stored then
+    return 'missing'
+end
+if stored == ARGV[1] then
+    redis.call('DEL', KEYS[1], KEYS[2])
+    return 'ok'
+end
+if redis.call('INCR', KEYS[2]) == 1 then
+    redis.call('EXPIRE', KEYS[2], ARGV[3])
+end
+return 'invalid'
+"""
+
+# وضعیت ارسال فقط روی کدی که هنوز منقضی/مصرف نشده ثبت میشه
+RECORD_DELIVERY_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('HSET', KEYS[1], 'delivery_status', ARGV[1], 'delivery_attempts', ARGV[2])
+end
+return 1
+"""
+
+
+def lockout_window():
+    """ثانیه‌هایی که شمارنده تلاش اشتباه یک شماره نگه داشته میشه؛ حداقل به اندازه عمر کد"""
+    return max(getattr(settings, 'OTP_LOCKOUT_WINDOW', 900), getattr(settings, 'OTP_TTL', 120))
+
+
+def generate_code():
+    return str(secrets.randbelow(100000)).zfill(5)
+
+
+def hash_code(phone, code):
+    return hmac.new(settings.SECRET_KEY.encode(), f"{phone}:{code}".encode(), hashlib.sha256).hexdigest()
+
+
+class RedisOTPBackend:
+    KEY_PREFIX = "otp"
+
+    def __init__(self):
+        from django_redis import get_redis_connection
+        self.client = get_redis_connection(getattr(settings, 'OTP_CACHE_ALIAS', 'default'))
+        self.verify_script = self.client.register_script(VERIFY_LUA)
+        self.delivery_script = self.client.register_script(RECORD_DELIVERY_LUA)
+
+    def key(self, phone):
+        return f"{self.KEY_PREFIX}:{phone}"
+
+    def cooldown_key(self, phone):
+        return f"{self.KEY_PREFIX}:cooldown:{phone}"
+
+    def failures_key(self, phone):
+        return f"{self.KEY_PREFIX}:fail:{phone}"
+
+    def issue(self, user, phone, code, ttl, cooldown, lockout=None):
+        """خروجی: (شناسه برای ثبت وضعیت ارسال، ثانیه باقی‌مانده از cooldown)"""
+        # cooldown صفر (بنچمارک) یعنی بدون فاصله؛ Redis انقضای صفر رو قبول نمی‌کنه
+        if cooldown and not self.client.set(self.cooldown_key(phone), 1, ex=cooldown, nx=True):
+            return None, max(self.client.ttl(self.cooldown_key(phone)), 1)
+        pipe = self.client.pipeline()
+        pipe.delete(self.key(phone))
+        pipe.hset(self.key(phone), mapping={'hash': hash_code(phone, code), 'delivery_status': DELIVERY_PENDING})
+        pipe.expire(self.key(phone), ttl)
+        pipe.execute()
+        return phone, 0
+
+    def verify(self, phone, code, max_attempts, lockout=None):
+        result = self.verify_script(keys=[self.key(phone), self.failures_key(phone)],
+                                    args=[hash_code(phone, code), max_attempts, lockout or lockout_window()])
+        return result.decode() if isinstance(result, bytes) else result
+
+    def record_delivery(self, phone, status, attempts, error=None):
+        self.delivery_script(keys=[self.key(phone)], args=[status, attempts])
+
+    def delivery_status(self, phone):
+        value = self.client.hget(self.key(phone), 'delivery_status')
+        return value.decode() if isinstance(value, bytes) else value
+
+
+class LocalOTPBackend:
+    """بک‌اند داخل حافظه با همان رفتار Redis برای تست‌ها و اجرای لوکال بدون Redis"""
+
+    def __init__(self):
+        self._codes = {}
+        self._cooldowns = {}
+        self._failures = {}
+        self._lock = threading.Lock()
+
+    def _get(self, phone):
+        entry = self._codes.get(phone)
+        if entry is None or entry['expires_at'] < time.monotonic():
+            self._codes.pop(phone, None)
+            return None
+        return entry
+
+    def issue(self, user, phone, code, ttl, cooldown, lockout=None):
+        now = time.monotonic()
+        with self._lock:
+            cooldown_until = self._cooldowns.get(phone, 0)
+            if cooldown_until > now:
+                return None, max(int(cooldown_until - now), 1)
+            self._cooldowns[phone] = now + cooldown
+            self._codes[phone] = {'hash': hash_code(phone, code), 'expires_at': now + ttl,
+                                  'delivery_status': DELIVERY_PENDING}
+        return phone, 0
+
+    def verify(self, phone, code, max_attempts, lockout=None):
+        now = time.monotonic()
+        with self._lock:
+            failures, locked_until = self._failures.get(phone, (0, 0))
+            if locked_until < now:
+                failures = 0
+            if failures >= max_attempts:
+                return VERIFY_LOCKED
+            entry = self._get(phone)
+            if entry is None:
+                return VERIFY_MISSING
+            if hmac.compare_digest(entry['hash'], hash_code(phone, code)):
+                del self._codes[phone]
+                self._failures.pop(phone, None)
+                return VERIFY_OK
+            if failures == 0:
+                locked_until = now + (lockout or lockout_window())
+            self._failures[phone] = (failures + 1, locked_until)
+            return VERIFY_INVALID
+
+    def record_delivery(self, phone, status, attempts, error=None):
+        with self._lock:
+            entry = self._get(phone)
+            if entry is not None:
+                entry.update(delivery_status=status, delivery_attempts=attempts)
+
+    def delivery_status(self, phone):
+        with self._lock:
+            entry = self._get(phone)
+            return entry['delivery_status'] if entry is not None else None
+
+    def reset(self):
+        with self._lock:
+            self._codes.clear()
+            self._cooldowns.clear()
+            self._failures.clear()
+
+
+class DatabaseOTPBackend:
+    """
+    رفتار قبلی روی جدول OTP به همراه محدودیت تلاش و cooldown.
+    تلاش‌های اشتباه روی ردیف کد ثبت میشن و کد جدیدی که داخل پنجره قفل صادر بشه اون‌ها رو از کد قبلی به ارث می‌بره.
+    """
+
+    def issue(self, user, phone, code, ttl, cooldown, lockout=None):
+        from accounts.models import OTP
+        last = OTP.objects.filter(user=user).order_by('-created_at').values('created_at', 'attempts').first()
+        attempts = 0
+        if last is not None:
+            retry_after = (last['created_at'] + timedelta(seconds=cooldown) - timezone.now()).total_seconds()
+            if retry_after > 0:
+                return None, max(int(retry_after), 1)
+            if last['created_at'] + timedelta(seconds=lockout or lockout_window()) > timezone.now():
+                attempts = last['attempts']
+        OTP.objects.filter(user=user).delete()
+        otp = OTP.objects.create(user=user, code=code, expires_at=timezone.now() + timedelta(seconds=ttl),
+                                 attempts=attempts)
+        return otp.pk, 0
+
+    def verify(self, phone, code, max_attempts, lockout=None):
+        from accounts.models import OTP
+        otp = OTP.objects.filter(user__phone=phone).order_by('-created_at').first()
+        if otp is None or not otp.is_valid():
+            return VERIFY_MISSING
+        if otp.attempts >= max_attempts:
+            return VERIFY_LOCKED
+        if not hmac.compare_digest(otp.code, code):
+            OTP.objects.filter(pk=otp.pk).update(attempts=F('attempts') + 1)
+            return VERIFY_INVALID
+        otp.delete()
+        return VERIFY_OK
+
+    def record_delivery(self, otp_id, status, attempts, error=None):
+        from accounts.models import OTP
+        OTP.objects.filter(pk=otp_id).update(
+            delivery_status=status, delivery_attempts=attempts, delivery_error=str(error)[:255] if error else None)
+
+    def delivery_status(self, phone):
+        from accounts.models import OTP
+        return OTP.objects.filter(user__phone=phone, expires_at__gte=timezone.now()).order_by(
+            '-created_at').values_list('delivery_status', flat=True).first()
+
+
+class OTPStore:
+    """
+    صدور و بررسی OTP روی بک‌اند تنظیم شده (OTP_BACKEND).
+    اگر بک‌اند اصلی در دسترس نباشه، عملیات روی DatabaseOTPBackend انجام میشه.
+    """
+
+    def __init__(self, backend=None, fallback=None, ttl=None, cooldown=None, max_attempts=None, lockout=None):
+        self.backend = backend
+        self.fallback = fallback or DatabaseOTPBackend()
+        self.ttl = ttl or getattr(settings, 'OTP_TTL', 120)
+        self.cooldown = cooldown or getattr(settings, 'OTP_RESEND_COOLDOWN', 60)
+        self.max_attempts = max_attempts or getattr(settings, 'OTP_MAX_ATTEMPTS', 5)
+        self.lockout = lockout or lockout_window()
+
+    def get_backend(self):
+        if self.backend is None:
+            self.backend = import_string(getattr(settings, 'OTP_BACKEND', 'accounts.otp.RedisOTPBackend'))()
+        return self.backend
+
+    def _call(self, method, *args):
+        try:
+            backend = self.get_backend()
+            return backend, getattr(backend, method)(*args)
+        except Exception as e:
+            if isinstance(self.backend, type(self.fallback)):
+                raise
+            logger.warning("OTP backend unavailable, falling back to database: %s", e)
+            return self.fallback, getattr(self.fallback, method)(*args)
+
+    def issue(self, user, phone):
+        """
+        کد جدید می‌سازه و بعد از commit برای ارسال در صف می‌گذاره.
+        خروجی: ثانیه باقی‌مانده تا امکان درخواست دوباره (0 یعنی کد ارسال شد)
+        """
+        from accounts.sms import sms_dispatcher
+        code = generate_code()
+        backend, (ref, retry_after) = self._call('issue', user, phone, code, self.ttl, self.cooldown, self.lockout)
+        if retry_after:
+            return retry_after
+        sms_dispatcher.send_otp(
+            phone, code, on_result=lambda status, attempts, error: backend.record_delivery(ref, status, attempts, error))
+        return 0
+
+    def delivery_status(self, phone):
+        """وضعیت ارسال آخرین کد معتبر شماره (DELIVERY_PENDING / SENT / FAILED) یا None اگر کدی نیست"""
+        _, result = self._call('delivery_status', phone)
+        return result
+
+    def verify(self, phone, code):
+        """یکی از VERIFY_OK / VERIFY_INVALID / VERIFY_MISSING / VERIFY_LOCKED"""
+        _, result = self._call('verify', phone, str(code), self.max_attempts, self.lockout)
+        return result
+
+
+otp_store = OTPStore()
@@ -0,0 +1,18 @@
+from rest_framework.pagination import CursorPagination
+
+
+class IdCursorPagination(CursorPagination):
+    """
+    صفحه‌بندی keyset؛ هزینه هر صفحه مستقل از عمق صفحه است (بدون OFFSET و COUNT).
+    ترتیب پیش‌فرض (-id) است و هر ویو می‌تونه با cursor_ordering کلید دیگه‌ای انتخاب کنه،
+    مثلا ('-send_time', '-id'). فیلد اول باید ثابت و تقریبا یکتا باشه.
+    """
+    ordering = '-id'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'cursor_ordering', None)
+        if ordering is None:
+            return super().get_ordering(request, queryset, view)
+        return (ordering,) if isinstance(ordering, str) else tuple(ordering)
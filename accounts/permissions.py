@@ -1,16 +1,28 @@
 from rest_framework.permissions import BasePermission
 
+from accounts.principal import get_principal
+from accounts.tokens import get_role_claims
+
+
+def has_role(request, claim, attr):
+    """اول از claim های توکن (بدون دیتابیس)، در غیر این صورت از principal کش شده"""
+    claims = get_role_claims(request)
+    if claims is not None:
+        return claims['roles'].get(claim) is not None
+    principal = get_principal(request.user)
+    return principal is not None and getattr(principal, attr)
+
 
 class IsGymManager(BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and hasattr(request.user, 'gym_manager')
+        return request.user.is_authenticated and has_role(request, 'gym_manager', 'is_gym_manager')
 
 
 class IsGymSecretary(BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and hasattr(request.user, 'gym_secretary')
+        return request.user.is_authenticated and has_role(request, 'gym_secretary_gym', 'is_gym_secretary')
 
 
 class IsPlatformAdmin(BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and hasattr(request.user, 'platform_manager')
+        return request.user.is_authenticated and has_role(request, 'platform_manager', 'is_platform_manager')
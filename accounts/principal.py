@@ -0,0 +1,187 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router, transaction
+
+from accounts.cache import LocalTTLCache, HitCounter, invalidation
+from accounts.models import User
+
+ROLE_RELATIONS = ('customer', 'gym_manager', 'gym_secretary', 'platform_manager')
+# فقط این فیلدها کش میشن؛ password، last_login، is_superuser و بقیه ستون‌های احراز هویت هیچ وقت در کش نیستن
+# و روی یوزر ساخته شده از principal به صورت deferred از دیتابیس خونده میشن
+USER_FIELDS = ('id', 'phone', 'full_name', 'email', 'is_active', 'is_staff', 'role_version')
+
+
+class Principal:
+    """
+    خلاصه‌ای فشرده از کاربر احراز هویت شده: فیلدهای یوزر به همراه شناسه نقش‌ها.
+    چک‌های دسترسی فقط از روی همین شناسه‌ها انجام میشن و نیازی به کوئری ندارن.
+    """
+
+    def __init__(self, user_fields, customer_id=None, gym_manager_id=None, gym_secretary_id=None,
+                 gym_secretary_gym_id=None, platform_manager_id=None):
+        self.user_fields = user_fields
+        self.customer_id = customer_id
+        self.gym_manager_id = gym_manager_id
+        self.gym_secretary_id = gym_secretary_id
+        self.gym_secretary_gym_id = gym_secretary_gym_id
+        self.platform_manager_id = platform_manager_id
+
+    @property
+    def user_id(self):
+        return self.user_fields['id']
+
+    @property
+    def is_active(self):
+        return self.user_fields['is_active']
+
+    @property
+    def is_customer(self):
+        return self.customer_id is not None
+
+    @property
+    def is_gym_manager(self):
+        return self.gym_manager_id is not None
+
+    @property
+    def is_gym_secretary(self):
+        return self.gym_secretary_id is not None
+
+    @property
+    def is_platform_manager(self):
+        return self.platform_manager_id is not None
+
+    @classmethod
+    def from_user(cls, user):
+        """ساخت principal از یک یوزر؛ برای جلوگیری از کوئری اضافه، نقش‌ها باید select_related شده باشن."""
+        user_fields = {name: getattr(user, name) for name in USER_FIELDS}
+        customer = getattr(user, 'customer', None)
+        gym_manager = getattr(user, 'gym_manager', None)
+        gym_secretary = getattr(user, 'gym_secretary', None)
+        platform_manager = getattr(user, 'platform_manager', None)
+        return cls(
+            user_fields,
+            customer_id=customer.id if customer else None,
+            gym_manager_id=gym_manager.id if gym_manager else None,
+            gym_secretary_id=gym_secretary.id if gym_secretary else None,
+            gym_secretary_gym_id=gym_secretary.gym_id if gym_secretary else None,
+            platform_manager_id=platform_manager.id if platform_manager else None,
+        )
+
+    def to_dict(self):
+        return {
+            'user': self.user_fields,
+            'customer_id': self.customer_id,
+            'gym_manager_id': self.gym_manager_id,
+            'gym_secretary_id': self.gym_secretary_id,
+            'gym_secretary_gym_id': self.gym_secretary_gym_id,
+            'platform_manager_id': self.platform_manager_id,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        data = dict(data)
+        return cls(data.pop('user'), **data)
+
+    def build_user(self):
+        """
+        ساخت نمونه User بدون کوئری. نقش‌هایی که کاربر ندارد به صورت None کش میشن
+        تا hasattr(user, 'customer') و مشابهش هم کوئری نزنه.
+        این نمونه ممکنه تا چند ثانیه قدیمی باشه و save نمیشه؛ برای تغییر یوزر باید از دیتابیس خونده بشه.
+        """
+        names = [name for name in USER_FIELDS if name in self.user_fields]
+        user = User.from_db(router.db_for_read(User), names, [self.user_fields[name] for name in names])
+        for relation in ROLE_RELATIONS:
+            if getattr(self, f"{relation}_id") is None:
+                User._meta.get_field(relation).set_cached_value(user, None)
+        user.principal = self
+        user.from_principal_cache = True
+        return user
+
+
+class PrincipalStore:
+    """کش دو سطحی (LRU داخل پروسس + Redis) برای principal کاربران بر اساس user_id"""
+    CACHE_PREFIX = "principal"
+    # نسخه 1 همه ستون‌های یوزر رو داشت؛ با نسخه جدید اون مقادیر دیگه خونده نمیشن
+    CACHE_VERSION = 2
+
+    def __init__(self, local_ttl=None, local_maxsize=None, shared_ttl=None):
+        self.local = LocalTTLCache(
+            ttl=local_ttl if local_ttl is not None else getattr(settings, 'PRINCIPAL_CACHE_LOCAL_TTL', 10),
+            maxsize=local_maxsize or getattr(settings, 'PRINCIPAL_CACHE_LOCAL_MAXSIZE', 4096),
+        )
+        self.shared_ttl = shared_ttl if shared_ttl is not None else getattr(settings, 'PRINCIPAL_CACHE_SHARED_TTL', 300)
+        self.counter = HitCounter("local_hits", "shared_hits", "db_lookups")
+        invalidation.register(self.CACHE_PREFIX, self.local)
+
+    def _cache_key(self, user_id):
+        return f"{self.CACHE_PREFIX}:{user_id}"
+
+    def load(self, user_id):
+        """یک کوئری برای یوزر و همه نقش‌ها"""
+        user = User.objects.select_related(*ROLE_RELATIONS).filter(pk=user_id).first()
+        if user is None:
+            return None
+        return Principal.from_user(user)
+
+    def get(self, user_id):
+        # شناسه در توکن به صورت رشته ذخیره میشه؛ کلیدها یکسان‌سازی میشن
+        user_id = str(user_id)
+        invalidation.ensure_listening()
+        principal = self.local.get(user_id)
+        if principal is not LocalTTLCache.MISSING:
+            self.counter.incr("local_hits")
+            return principal
+
+        try:
+            data = cache.get(self._cache_key(user_id), version=self.CACHE_VERSION)
+        except Exception:
+            data = None
+
+        if data is not None:
+            self.counter.incr("shared_hits")
+            principal = Principal.from_dict(data)
+        else:
+            self.counter.incr("db_lookups")
+            principal = self.load(user_id)
+            if principal is None:
+                return None
+            try:
+                cache.set(self._cache_key(user_id), principal.to_dict(), timeout=self.shared_ttl,
+                          version=self.CACHE_VERSION)
+            except Exception:
+                pass
+
+        self.local.set(user_id, principal)
+        return principal
+
+    def invalidate(self, user_id):
+        """مثل APIKeyStore: LRU همین پروسس فورا، Redis و LRU بقیه پروسس‌ها (pub/sub) بعد از commit"""
+        if user_id is None:
+            return
+        user_id = str(user_id)
+        self.local.delete(user_id)
+        transaction.on_commit(lambda: self._invalidate_shared(user_id))
+
+    def _invalidate_shared(self, user_id):
+        try:
+            cache.delete(self._cache_key(user_id), version=self.CACHE_VERSION)
+        except Exception:
+            pass
+        invalidation.publish(self.CACHE_PREFIX, user_id)
+
+    def stats(self):
+        return self.counter.snapshot()
+
+
+principal_store = PrincipalStore()
+
+
+def get_principal(user):
+    """principal کاربر درخواست؛ اگر یوزر از مسیر کش نیامده باشد (مثلا سشن ادمین) از روی خود یوزر ساخته میشه."""
+    if not user or not user.is_authenticated:
+        return None
+    principal = getattr(user, 'principal', None)
+    if principal is None:
+        principal = Principal.from_user(user)
+        user.principal = principal
+    return principal
@@ -0,0 +1,106 @@
+import threading
+import time
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+# شمارنده پنجره فعلی رو زیاد می‌کنه و شمارنده پنجره قبلی رو برمی‌گردونه (یک رفت و برگشت به Redis)
+SLIDING_WINDOW_LUA = """
+local current = redis.call('INCR', KEYS[1])
+if current == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1] * 2)
+end
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+return {current, previous}
+"""
+
+DEFAULT_GROUPS = {
+    'otp': {'match': ['/request-otp/', '/verify-otp/'], 'limit': 60, 'window': 3600},
+    'admin_panel': {'match': ['/admin-panel/'], 'limit': 2000, 'window': 3600},
+    'gym_panel': {'match': ['/gym-panel/'], 'limit': 2000, 'window': 3600},
+    'customer': {'match': ['/customer/'], 'limit': 1000, 'window': 3600},
+    'default': {'match': [], 'limit': 1000, 'window': 3600},
+}
+
+
+class RedisRateLimitBackend:
+    """بک‌اند اصلی: شمارنده‌های اتمیک Redis با یک اسکریپت Lua"""
+
+    def __init__(self):
+        from django_redis import get_redis_connection
+        self.client = get_redis_connection(getattr(settings, 'RATE_LIMIT_CACHE_ALIAS', 'default'))
+        self.script = self.client.register_script(SLIDING_WINDOW_LUA)
+
+    def hit(self, current_key, previous_key, window):
+        current, previous = self.script(keys=[current_key, previous_key], args=[window])
+        return int(current), int(previous)
+
+
+class LocalRateLimitBackend:
+    """بک‌اند داخل حافظه برای تست‌ها و اجرای لوکال بدون Redis"""
+
+    def __init__(self):
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def hit(self, current_key, previous_key, window):
+        now = time.monotonic()
+        with self._lock:
+            count, expires_at = self._counters.get(current_key, (0, 0))
+            if expires_at < now:
+                count, expires_at = 0, now + window * 2
+            count += 1
+            self._counters[current_key] = (count, expires_at)
+
+            previous, previous_expires_at = self._counters.get(previous_key, (0, 0))
+            if previous_expires_at < now:
+                previous = 0
+        return count, previous
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+
+
+class SlidingWindowRateLimiter:
+    """
+    محدودیت نرخ با الگوریتم sliding window counter:
+    تعداد پنجره قبلی به نسبت زمان باقی‌مانده وزن‌دهی و با پنجره فعلی جمع میشه.
+    """
+
+    def __init__(self, backend=None, groups=None):
+        self.backend = backend
+        self.groups = groups or getattr(settings, 'RATE_LIMIT_GROUPS', DEFAULT_GROUPS)
+
+    def get_backend(self):
+        if self.backend is None:
+            backend_path = getattr(settings, 'RATE_LIMIT_BACKEND', 'accounts.ratelimit.RedisRateLimitBackend')
+            self.backend = import_string(backend_path)()
+        return self.backend
+
+    def get_group(self, path):
+        for name, group in self.groups.items():
+            if any(part in path for part in group.get('match', [])):
+                return name, group
+        return 'default', self.groups.get('default', DEFAULT_GROUPS['default'])
+
+    def check(self, path, ident, now=None):
+        """خروجی: (مجاز است؟، تعداد باقی‌مانده، ثانیه تا امکان درخواست بعدی)"""
+        name, group = self.get_group(path)
+        limit, window = group['limit'], group['window']
+        now = time.time() if now is None else now
+
+        window_index = int(now // window)
+        elapsed = now - window_index * window
+        current_key = f"rl:{name}:{ident}:{window_index}"
+        previous_key = f"rl:{name}:{ident}:{window_index - 1}"
+
+        current, previous = self.get_backend().hit(current_key, previous_key, window)
+        weighted = previous * ((window - elapsed) / window) + current
+
+        if weighted > limit:
+            return False, 0, int(window - elapsed) + 1
+        return True, int(limit - weighted), 0
+
+
+rate_limiter = SlidingWindowRateLimiter()
@@ -1,11 +1,22 @@
 from django.contrib.auth import authenticate
-from django.utils import timezone
+from django.db.models import Exists, OuterRef
 from rest_framework import serializers
-from rest_framework_simplejwt.tokens import RefreshToken
-from accounts.models import Customer, User, GymManager
+from accounts.models import Customer, User, GymManager, OTP
+from accounts.tokens import RoleRefreshToken, get_managed_gym_ids
 from gyms.models import Gym, MemberShip, InOut, BlockList, Rate
 
 
+def annotate_active_membership(queryset, gym_ids=None):
+    """
+    فیلد has_active_membership رو با یک زیرکوئری Exists به کوئری مشتری‌ها اضافه می‌کنه
+    (در صورت ارسال gym_ids فقط ممبرشیپ‌های همان باشگاه‌ها حساب میشن).
+    """
+    memberships = MemberShip.objects.active().filter(customer=OuterRef('pk'))
+    if gym_ids is not None:
+        memberships = memberships.filter(gym_id__in=gym_ids)
+    return queryset.annotate(has_active_membership=Exists(memberships))
+
+
 # <=================== User Views ===================>
 class UserRoleStatusSerializer(serializers.Serializer):
     is_authenticated = serializers.BooleanField()
@@ -41,6 +52,9 @@ class RequestOTPSerializer(serializers.Serializer):
 class RequestOTPResponseSerializer(serializers.Serializer):
     message = serializers.CharField(max_length=100, help_text="پیام موفقیت یا خطا")
     error = serializers.CharField(max_length=100, required=False, help_text="پیام خطا (در صورت وجود)")
+    delivery_status = serializers.ChoiceField(
+        choices=OTP.DELIVERY_CHOICES, required=False,
+        help_text="وضعیت ارسال پیامک؛ تا وقتی pending است از otp-status/ دوباره پرسیده میشه")
 
 
 class VerifyOTPSerializer(serializers.Serializer):
@@ -124,7 +138,7 @@ class CustomerRegisterSerializer(serializers.ModelSerializer):
         data['profile_photo'] = instance.profile_photo.url if instance.profile_photo else None
 
         # توکن‌ها
-        refresh = RefreshToken.for_user(instance.user)
+        refresh = RoleRefreshToken.for_user(instance.user)
         data['refresh'] = str(refresh)
         data['access'] = str(refresh.access_token)
 
@@ -157,8 +171,11 @@ class CustomerProfileSerializer(serializers.ModelSerializer):
         # آپدیت full_name در User (اجازه داریم تغییر بدیم)
         user_data = validated_data.get("user", {})
         if "full_name" in user_data:
-            instance.user.full_name = user_data["full_name"]
-            instance.user.save()
+            # instance.user می‌تونه یوزر ساخته شده از کش principal باشه؛ قبل از ذخیره از دیتابیس خونده میشه
+            user = User.objects.get(pk=instance.user_id)
+            user.full_name = user_data["full_name"]
+            user.save(update_fields=['full_name'])
+            instance.user = user
 
         return instance
 
@@ -215,30 +232,18 @@ class GymPanelCustomerListSerializer(serializers.ModelSerializer):
             'gender',
         ]
 
+    @staticmethod
+    def setup_eager_loading(queryset, gym_ids):
+        return annotate_active_membership(queryset.select_related('user'), gym_ids)
+
     def get_is_active(self, obj):
         """بررسی فعال بودن ممبرشیپ مشتری در باشگاه‌های متعلق به منشی یا مدیر"""
-        user = self.context['request'].user
-        today = timezone.now().date()
-
-        # 🎯 استخراج باشگاه‌هایی که این کاربر (مدیر یا منشی) در آنها فعاله
-        related_gyms = Gym.objects.none()
-
-        # اگه مدیر باشگاهه
-        if hasattr(user, 'gym_manager'):
-            related_gyms = Gym.objects.filter(manager=user.gym_manager)
-
-        # اگه منشی باشگاهه
-        elif hasattr(user, 'gym_secretary'):
-            related_gyms = Gym.objects.filter(id=user.gym_secretary.gym.id)
-
-        # بررسی ممبرشیپ‌های معتبر مرتبط با اون باشگاه‌ها
-        active_memberships = obj.memberships.filter(
-            gym__in=related_gyms,
-            validity_date__gte=today,  # تاریخ هنوز تموم نشده
-            session_left__gt=0  # جلسه باقی مونده
-        )
+        if hasattr(obj, 'has_active_membership'):
+            return obj.has_active_membership
 
-        return active_memberships.exists()
+        # 🎯 باشگاه‌هایی که این کاربر (مدیر یا منشی) در آنها فعاله (از claim های توکن)
+        related_gym_ids = get_managed_gym_ids(self.context['request'])
+        return obj.memberships.active().filter(gym_id__in=related_gym_ids).exists()
 
 
 class GymPanelCustomerMemberShipSerializer(serializers.ModelSerializer):
@@ -280,35 +285,18 @@ class GymPanelCustomerDetailSerializer(serializers.ModelSerializer):
 
     def get_is_active(self, obj):
         """بررسی فعال بودن ممبرشیپ مشتری در باشگاه‌های متعلق به منشی یا مدیر"""
-        user = self.context['request'].user
-        today = timezone.now().date()
-
-        # استخراج باشگاه‌های مرتبط با کاربر جاری
-        related_gyms = Gym.objects.none()
-        if hasattr(user, 'gym_manager'):
-            related_gyms = Gym.objects.filter(manager=user.gym_manager)
-        elif hasattr(user, 'gym_secretary'):
-            related_gyms = Gym.objects.filter(id=user.gym_secretary.gym.id)
-
-        # بررسی ممبرشیپ‌های معتبر در همین باشگاه‌ها
-        active_memberships = obj.memberships.filter(
-            gym__in=related_gyms,
-            validity_date__gte=today,
-            session_left__gt=0
-        )
-        return active_memberships.exists()
+        if hasattr(obj, 'has_active_membership'):
+            return obj.has_active_membership
+
+        # باشگاه‌های مرتبط با کاربر جاری
+        related_gym_ids = get_managed_gym_ids(self.context['request'])
+        return obj.memberships.active().filter(gym_id__in=related_gym_ids).exists()
 
     def get_inouts(self, obj):
         """فقط ورود/خروج‌های مربوط به باشگاه‌های مدیر یا منشی"""
-        user = self.context['request'].user
+        related_gym_ids = get_managed_gym_ids(self.context['request'])
 
-        related_gyms = Gym.objects.none()
-        if hasattr(user, 'gym_manager'):
-            related_gyms = Gym.objects.filter(manager=user.gym_manager)
-        elif hasattr(user, 'gym_secretary'):
-            related_gyms = Gym.objects.filter(id=user.gym_secretary.gym.id)
-
-        inouts = obj.inouts.filter(gym__in=related_gyms).order_by('-enter_time')
+        inouts = obj.inouts.filter(gym_id__in=related_gym_ids).select_related('gym').order_by('-enter_time')
         return GymPanelCustomerInOutSerializer(inouts, many=True).data
 
 
@@ -334,14 +322,15 @@ class AdminPanelCustomerListSerializer(serializers.ModelSerializer):
             'gender',
         ]
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return annotate_active_membership(queryset.select_related('user'))
+
     def get_is_active(self, obj):
         """اگر حداقل یکی از ممبرشیپ‌ها هنوز منقضی نشده و جلسه باقی دارد → True"""
-        today = timezone.now().date()
-        active_memberships = obj.memberships.filter(
-            validity_date__gte=today,  # هنوز منقضی نشده
-            session_left__gt=0  # جلسه باقی مانده دارد
-        )
-        return active_memberships.exists()
+        if hasattr(obj, 'has_active_membership'):
+            return obj.has_active_membership
+        return obj.memberships.active().exists()
 
 
 class AdminPanelCustomerMembershipSerializer(serializers.ModelSerializer):
@@ -395,12 +384,9 @@ class AdminPanelCustomerDetailSerializer(serializers.ModelSerializer):
 
     def get_is_active(self, obj):
         """اگر حداقل یکی از ممبرشیپ‌ها هنوز منقضی نشده و جلسه باقی دارد → True"""
-        today = timezone.now().date()
-        active_memberships = obj.memberships.filter(
-            validity_date__gte=today,  # هنوز منقضی نشده
-            session_left__gt=0  # جلسه باقی مانده دارد
-        )
-        return active_memberships.exists()
+        if hasattr(obj, 'has_active_membership'):
+            return obj.has_active_membership
+        return obj.memberships.active().exists()
 
     def destroy(self, instance):
         instance.is_deleted = True
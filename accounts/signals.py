@@ -0,0 +1,83 @@
+from django.db.models import F
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from accounts.api_keys import api_key_store
+from accounts.models import APIKey, User, Customer, GymManager, PlatformManager
+from accounts.principal import principal_store
+from gyms.models import Gym, GymSecretary
+
+
+# <=================== API Key Cache ===================>
+@receiver(pre_save, sender=APIKey)
+def invalidate_replaced_api_key(sender, instance, **kwargs):
+    # اگر متن کلید عوض شده باشه، کلید قبلی هم باید از کش پاک بشه
+    if not instance.pk:
+        return
+    old_key = APIKey.objects.filter(pk=instance.pk).values_list('key', flat=True).first()
+    if old_key and old_key != instance.key:
+        api_key_store.invalidate(old_key)
+
+
+@receiver(post_save, sender=APIKey)
+@receiver(post_delete, sender=APIKey)
+def invalidate_api_key(sender, instance, **kwargs):
+    api_key_store.invalidate(instance.key)
+
+
+# <=================== Principal Cache ===================>
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_principal(sender, instance, **kwargs):
+    principal_store.invalidate(instance.pk)
+
+
+def bump_role_version(user_id):
+    """claim های نقش توکن‌های قبلی کاربر رو بی‌اعتبار می‌کنه (مسیر سریع دسترسی دیگه استفاده نمیشه)"""
+    User.objects.filter(pk=user_id).update(role_version=F('role_version') + 1)
+    principal_store.invalidate(user_id)
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_save, sender=GymManager)
+@receiver(post_save, sender=PlatformManager)
+def invalidate_role_principal(sender, instance, created, **kwargs):
+    if created:
+        bump_role_version(instance.user_id)
+    else:
+        principal_store.invalidate(instance.user_id)
+
+
+@receiver(post_delete, sender=Customer)
+@receiver(post_delete, sender=GymManager)
+@receiver(post_delete, sender=PlatformManager)
+@receiver(post_save, sender=GymSecretary)
+@receiver(post_delete, sender=GymSecretary)
+def role_changed(sender, instance, **kwargs):
+    bump_role_version(instance.user_id)
+
+
+def bump_manager_role_versions(*manager_ids):
+    user_ids = GymManager.objects.filter(pk__in=[pk for pk in manager_ids if pk]).values_list('user_id', flat=True)
+    for user_id in user_ids:
+        bump_role_version(user_id)
+
+
+@receiver(pre_save, sender=Gym)
+def remember_previous_manager(sender, instance, **kwargs):
+    instance._previous_manager_id = None
+    if instance.pk:
+        instance._previous_manager_id = Gym.objects.filter(pk=instance.pk).values_list('manager_id', flat=True).first()
+
+
+@receiver(post_save, sender=Gym)
+def managed_gyms_changed(sender, instance, created, **kwargs):
+    # لیست باشگاه‌های مدیر داخل توکن هست؛ با ساخت باشگاه یا تغییر مدیرش، توکن هر دو مدیر باطل میشه
+    previous = getattr(instance, '_previous_manager_id', None)
+    if created or previous != instance.manager_id:
+        bump_manager_role_versions(previous, instance.manager_id)
+
+
+@receiver(post_delete, sender=Gym)
+def managed_gym_deleted(sender, instance, **kwargs):
+    bump_manager_role_versions(instance.manager_id)
@@ -0,0 +1,181 @@
+"""
+ارسال پیامک OTP در پس‌زمینه.
+درخواست API فقط کد OTP رو ذخیره می‌کنه (accounts.otp) و ارسال به یک worker pool داخل پروسس سپرده میشه؛
+worker ها با session پایدار (keep-alive) به درگاه وصل میشن، در خطاهای موقت با backoff دوباره تلاش
+می‌کنن و وضعیت ارسال در محل ذخیره OTP ثبت میشه.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
+from requests.adapters import HTTPAdapter
+
+from accounts.tracing import start_trace
+
+logger = logging.getLogger(__name__)
+
+DELIVERY_PENDING = 'pending'
+DELIVERY_SENT = 'sent'
+DELIVERY_FAILED = 'failed'
+
+
+class SMSError(Exception):
+    """خطای ارسال؛ retryable یعنی خطای موقت (شبکه یا 5xx) و ارزش تلاش دوباره داره"""
+
+    def __init__(self, message, retryable=False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def otp_message(otp_code):
+    return f"به فیتنو خوش آمدید\nبزرگترین پلتفرم مدیریت باشگاه های ورزشی در ایران\nـــــــ\nکد شما: {otp_code}"
+
+
+class IPPanelGateway:
+    url = "https://edge.ippanel.com/v1/api/send"
+    from_number = "+983000505"  # شماره فرستنده
+
+    def __init__(self):
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        # هر worker یک session پایدار داره؛ اتصال TCP/TLS بین ارسال‌ها دوباره استفاده میشه
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+            session.headers.update({
+                "Authorization": settings.FARAZ_API_KEY or "",
+                "Content-Type": "application/json",
+            })
+            self._local.session = session
+        return session
+
+    def send(self, phone, message):
+        payload = {
+            "sending_type": "webservice",
+            "from_number": self.from_number,
+            "message": message,
+            "params": {
+                "recipients": ['+98' + phone[1:], ]  # فرمت شماره تلفن
+            }
+        }
+        timeout = getattr(settings, 'SMS_GATEWAY_TIMEOUT', 5)
+        try:
+            response = self.session.post(self.url, json=payload, timeout=timeout)
+        except requests.exceptions.RequestException as e:
+            raise SMSError(f"خطا در ارتباط با سرویس پیامک: {e}", retryable=True)
+
+        if response.status_code >= 500:
+            raise SMSError(f"خطای سرویس پیامک (status {response.status_code})", retryable=True)
+        try:
+            meta = response.json().get("meta", {})
+        except ValueError:
+            raise SMSError("خطا در ارسال پیامک: پاسخ API معتبر نیست")
+        if meta.get("status") is not True:
+            raise SMSError(f"خطا در ارسال پیامک: {meta.get('message', 'نامشخص')}")
+
+
+class FakeSMSGateway:
+    """درگاه جعلی برای تست و بنچمارک: پیام‌ها در outbox نگه داشته میشن و تاخیر/خطا قابل تنظیمه"""
+    outbox = deque(maxlen=1000)
+
+    def __init__(self, latency=None, fail_times=0):
+        self.latency = latency if latency is not None else getattr(settings, 'SMS_FAKE_LATENCY', 0)
+        self.fail_times = fail_times
+        self._lock = threading.Lock()
+
+    def send(self, phone, message):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            if self.fail_times > 0:
+                self.fail_times -= 1
+                raise SMSError("fake gateway failure", retryable=True)
+            self.outbox.append((phone, message))
+
+
+class SMSDispatcher:
+    """
+    صف ارسال داخل پروسس با ThreadPoolExecutor.
+    با SMS_DISPATCH_WORKERS = 0 ارسال همان لحظه و در همان thread انجام میشه (برای تست‌ها).
+    """
+
+    def __init__(self, gateway=None, workers=None, max_attempts=None, backoff=None):
+        self.gateway = gateway
+        self.workers = workers if workers is not None else getattr(settings, 'SMS_DISPATCH_WORKERS', 4)
+        self.max_attempts = max_attempts or getattr(settings, 'SMS_DISPATCH_MAX_ATTEMPTS', 3)
+        self.backoff = backoff if backoff is not None else getattr(settings, 'SMS_DISPATCH_BACKOFF', 0.5)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def get_gateway(self):
+        if self.gateway is None:
+            self.gateway = import_string(getattr(settings, 'SMS_GATEWAY', 'accounts.sms.IPPanelGateway'))()
+        return self.gateway
+
+    def get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='sms')
+            return self._executor
+
+    def send_otp(self, phone, code, on_result=None):
+        """
+        بعد از commit ارسال در صف قرار می‌گیره؛ خود درخواست منتظر درگاه نمی‌مونه.
+        on_result(status, attempts, error) وضعیت نهایی ارسال رو در محل ذخیره OTP ثبت می‌کنه.
+        """
+        message = otp_message(code)
+        transaction.on_commit(lambda: self.submit(phone, message, on_result))
+
+    def submit(self, phone, message, on_result=None):
+        if not self.workers:
+            return self.deliver(phone, message, on_result)
+        return self.get_executor().submit(self._run, phone, message, on_result)
+
+    def _run(self, phone, message, on_result):
+        try:
+            return self.deliver(phone, message, on_result)
+        finally:
+            # worker ها thread جدا هستن و کانکشن دیتابیس خودشون رو دارن
+            connection.close()
+
+    def _record(self, on_result, status, attempts, error=None):
+        if on_result is None:
+            return
+        try:
+            on_result(status, attempts, error)
+        except Exception as e:
+            logger.warning("could not record SMS delivery status: %s", e)
+
+    def deliver(self, phone, message, on_result=None):
+        trace = start_trace('send_otp')
+        error = None
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                with trace.span('sms_api'):
+                    self.get_gateway().send(phone, message)
+            except SMSError as e:
+                error = e
+                logger.warning("SMS delivery attempt %s failed: %s", attempt, e)
+                if not e.retryable or attempt == self.max_attempts:
+                    break
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            else:
+                self._record(on_result, DELIVERY_SENT, attempt)
+                trace.finish(sent=True, attempts=attempt)
+                return True
+
+        self._record(on_result, DELIVERY_FAILED, attempt, error)
+        trace.finish(sent=False, attempts=attempt)
+        return False
+
+
+sms_dispatcher = SMSDispatcher()
@@ -0,0 +1,85 @@
+"""
+پایه تست‌ها بدون نیاز به Redis: کش locmem، channel layer داخل حافظه و بک‌اندهای Local شمارنده‌ها.
+"""
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from accounts.benchmark import endpoint_client, endpoint_path, expected_status, iter_routes, query_budget, \
+    seed_benchmark_data, use_local_backends
+from accounts.cache import invalidation
+
+LOCAL_SETTINGS = {
+    'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    'CHANNEL_LAYERS': {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    'STORAGES': {
+        'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    },
+}
+
+
+class LocalBackendsMixin:
+    """بک‌اندهای Local شمارنده‌ها برای کل کلاس تست و کش خالی برای هر تست"""
+
+    @classmethod
+    def setUpClass(cls):
+        use_local_backends()
+        super().setUpClass()
+
+    def setUp(self):
+        # شناسه‌ها بعد از rollback هر کلاس تست دوباره استفاده میشن؛ principal و API Key کش شده نباید بمونن
+        cache.clear()
+        invalidation.clear_all()
+
+    def assert_get_queries(self, ctx, route, num, status=200, query=None):
+        """
+        بعد از یک درخواست گرم‌کننده (کش API Key و principal)، GET مسیر دقیقا num کوئری می‌زنه.
+        ctx خروجی seed_benchmark_data است.
+        """
+        client = endpoint_client(ctx, route)
+        path = endpoint_path(ctx, route)
+        if query:
+            path = f"{path}{'&' if '?' in path else '?'}{query}"
+        client.get(path)
+        with self.assertNumQueries(num):
+            response = client.get(path)
+        self.assertEqual(response.status_code, status)
+        return response
+
+
+@override_settings(**LOCAL_SETTINGS)
+class LocalBackendsTestCase(LocalBackendsMixin, TestCase):
+    """تست‌های معمولی؛ هر تست داخل تراکنش و rollback میشه"""
+
+
+@override_settings(**LOCAL_SETTINGS)
+class LocalBackendsTransactionTestCase(LocalBackendsMixin, TransactionTestCase):
+    """برای تست‌های همزمانی که thread ها باید داده commit شده رو ببینن"""
+
+
+class EndpointBudgetTestsMixin:
+    """
+    هر مسیر GET با پیشوند route_prefix در حالت پایدار (کش API Key و principal گرم) وضعیت مورد انتظار
+    (EXPECTED_STATUS ماژول budgets اپ، پیش‌فرض 200) رو برمی‌گردونه و از بودجه کوئری خودش بیشتر نمیره.
+    """
+    route_prefix = None
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ctx = seed_benchmark_data(gyms=20, customers=30)
+
+    def test_endpoints_stay_within_query_budget(self):
+        routes = sorted(route for route, _ in iter_routes() if route.startswith(self.route_prefix))
+        self.assertTrue(routes)
+        for route in routes:
+            with self.subTest(route=route):
+                path = endpoint_path(self.ctx, route)
+                client = endpoint_client(self.ctx, route)
+                client.get(path)
+                with CaptureQueriesContext(connection) as captured:
+                    response = client.get(path)
+                self.assertEqual(response.status_code, expected_status(route))
+                self.assertLessEqual(len(captured), query_budget(route)[0],
+                                     [query['sql'] for query in captured.captured_queries])
@@ -1,3 +1,203 @@
-from django.test import TestCase
+from django.test import Client, SimpleTestCase, override_settings
 
-# Create your tests here.
+from accounts.api_keys import api_key_store
+from accounts.cache import LocalTTLCache, invalidation
+from accounts.models import APIKey, Customer, GymManager, User
+from accounts.otp import LocalOTPBackend, OTPStore, VERIFY_INVALID, VERIFY_LOCKED, VERIFY_MISSING, VERIFY_OK, \
+    hash_code
+from accounts.principal import principal_store
+from accounts.tokens import RoleRefreshToken
+from accounts.ratelimit import LocalRateLimitBackend, SlidingWindowRateLimiter, rate_limiter
+from accounts.testing import EndpointBudgetTestsMixin, LocalBackendsTestCase
+from gyms.models import Gym
+
+
+class EndpointQueryBudgetTests(EndpointBudgetTestsMixin, LocalBackendsTestCase):
+    route_prefix = 'accounts/'
+
+
+class OTPStatusRateLimitTests(LocalBackendsTestCase):
+    """polling وضعیت ارسال پیامک در گروه default محدودیت نرخه، نه گروه otp"""
+
+    def setUp(self):
+        super().setUp()
+        self.groups = rate_limiter.groups
+        rate_limiter.backend = LocalRateLimitBackend()
+        rate_limiter.groups = {
+            'otp': {'match': ['/request-otp/', '/verify-otp/'], 'limit': 3, 'window': 3600},
+            'default': {'match': [], 'limit': 10 ** 9, 'window': 3600},
+        }
+
+    def tearDown(self):
+        rate_limiter.groups = self.groups
+        super().tearDown()
+
+    def test_polling_status_does_not_use_otp_budget(self):
+        client = Client(HTTP_X_API_KEY=APIKey.objects.create(client_name='test').key)
+        for _ in range(5):
+            response = client.get('/accounts/otp-status/', {'phone': '09120000000'})
+            self.assertEqual(response.status_code, 404)
+
+        allowed, remaining, _ = rate_limiter.check('/accounts/verify-otp/', 'ip_127.0.0.1')
+        self.assertTrue(allowed)
+        self.assertEqual(remaining, 2)
+
+
+class LocalCacheInvalidationTests(LocalBackendsTestCase):
+    """کش دو سطحی API Key و principal بعد از تغییر در دیتابیس مقدار قدیمی برنمی‌گردونه"""
+
+    def test_deactivated_api_key_is_dropped(self):
+        api_key = APIKey.objects.create(client_name='test')
+        self.assertTrue(api_key_store.is_valid(api_key.key))
+
+        api_key.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            api_key.save()
+
+        self.assertFalse(api_key_store.is_valid(api_key.key))
+
+    def test_role_change_drops_cached_principal(self):
+        user = User.objects.create(phone='09120000001', full_name='user')
+        self.assertFalse(principal_store.get(user.id).is_customer)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Customer.objects.create(user=user, gender='male')
+
+        self.assertTrue(principal_store.get(user.id).is_customer)
+
+    def test_invalidation_message_drops_local_entry(self):
+        # پیامی که worker دیگه روی کانال pub/sub می‌فرسته
+        user = User.objects.create(phone='09120000002', full_name='user')
+        principal_store.get(user.id)
+        self.assertIsNot(principal_store.local.get(str(user.id)), LocalTTLCache.MISSING)
+
+        invalidation.publish(principal_store.CACHE_PREFIX, user.id)
+
+        self.assertIs(principal_store.local.get(str(user.id)), LocalTTLCache.MISSING)
+
+
+class SlidingWindowRateLimiterTests(SimpleTestCase):
+    """شمارش پنجره قبلی به نسبت زمان باقی‌مانده؛ مرز پنجره انفجار دو برابری درخواست رو مجاز نمی‌کنه"""
+    WINDOW = 60
+    LIMIT = 10
+
+    def setUp(self):
+        self.limiter = SlidingWindowRateLimiter(
+            backend=LocalRateLimitBackend(),
+            groups={'default': {'match': [], 'limit': self.LIMIT, 'window': self.WINDOW}},
+        )
+        self.start = 1000 * self.WINDOW
+
+    def hit(self, now):
+        return self.limiter.check('/gyms/customer/gyms/', 'user_1', now=now)
+
+    def test_limit_is_inclusive(self):
+        for _ in range(self.LIMIT):
+            allowed, remaining, _ = self.hit(self.start)
+            self.assertTrue(allowed)
+        self.assertEqual(remaining, 0)
+
+        allowed, remaining, retry_after = self.hit(self.start)
+        self.assertFalse(allowed)
+        self.assertEqual(remaining, 0)
+        self.assertEqual(retry_after, self.WINDOW + 1)
+
+    def test_previous_window_counts_at_boundary(self):
+        for _ in range(self.LIMIT):
+            self.hit(self.start + self.WINDOW - 1)
+
+        # اول پنجره بعد: کل پنجره قبلی هنوز حساب میشه
+        allowed, _, _ = self.hit(self.start + self.WINDOW)
+        self.assertFalse(allowed)
+
+    def test_previous_window_weight_decays(self):
+        for _ in range(self.LIMIT):
+            self.hit(self.start)
+
+        # وسط پنجره بعد: 10 * 0.5 + 1 = 6
+        allowed, remaining, _ = self.hit(self.start + self.WINDOW * 1.5)
+        self.assertTrue(allowed)
+        self.assertEqual(remaining, 4)
+
+
+class StaleRoleClaimTests(LocalBackendsTestCase):
+    """بعد از تغییر نقش، claim های توکن قبلی (rv قدیمی) استفاده نمیشن و دسترسی از دیتابیس چک میشه"""
+
+    def setUp(self):
+        super().setUp()
+        self.manager = GymManager.objects.create(user=User.objects.create(phone='09120000003', full_name='manager'))
+        self.gym = Gym.objects.create(title='gym', manager=self.manager, gender='both')
+        user = User.objects.select_related('gym_manager').get(pk=self.manager.user_id)
+        self.client = Client(
+            HTTP_X_API_KEY=APIKey.objects.create(client_name='test').key,
+            HTTP_AUTHORIZATION=f"Bearer {RoleRefreshToken.for_user(user).access_token}",
+        )
+
+    def occupancy_gym_ids(self):
+        response = self.client.get('/gyms/gym-panel/occupancy/')
+        self.assertEqual(response.status_code, 200)
+        return [row['gym_id'] for row in response.json()]
+
+    def test_removed_role_is_rejected(self):
+        self.assertEqual(self.occupancy_gym_ids(), [self.gym.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.manager.delete()
+
+        # توکن هنوز claim مدیر باشگاه رو داره
+        self.assertEqual(self.client.get('/gyms/gym-panel/occupancy/').status_code, 403)
+
+    def test_reassigned_gym_is_not_accessible(self):
+        self.assertEqual(self.occupancy_gym_ids(), [self.gym.id])
+
+        other = GymManager.objects.create(user=User.objects.create(phone='09120000004', full_name='other'))
+        self.gym.manager = other
+        with self.captureOnCommitCallbacks(execute=True):
+            self.gym.save()
+
+        # لیست باشگاه‌های توکن هنوز این باشگاه رو داره
+        self.assertEqual(self.occupancy_gym_ids(), [])
+
+
+class OTPLockoutTests(SimpleTestCase):
+    """قفل شماره بعد از تلاش‌های اشتباه (حتی با کد درست یا کد جدید) و نگهداری HMAC به جای خود کد"""
+    PHONE = '09120000000'
+
+    def setUp(self):
+        self.backend = LocalOTPBackend()
+        self.store = OTPStore(backend=self.backend, max_attempts=3, lockout=900)
+
+    def issue(self, code):
+        self.backend.issue(None, self.PHONE, code, ttl=120, cooldown=0)
+
+    def test_correct_code_is_single_use(self):
+        self.issue('12345')
+        self.assertEqual(self.store.verify(self.PHONE, '12345'), VERIFY_OK)
+        self.assertEqual(self.store.verify(self.PHONE, '12345'), VERIFY_MISSING)
+
+    def test_code_is_stored_as_hmac(self):
+        self.issue('12345')
+        stored = self.backend._codes[self.PHONE]['hash']
+        self.assertNotIn('12345', stored)
+        self.assertEqual(stored, hash_code(self.PHONE, '12345'))
+
+    def test_hmac_mismatch_is_invalid(self):
+        self.issue('12345')
+        self.assertEqual(self.store.verify(self.PHONE, '54321'), VERIFY_INVALID)
+        # با SECRET_KEY دیگه همان کد هم HMAC متفاوتی داره
+        with override_settings(SECRET_KEY='another-secret'):
+            self.assertEqual(self.store.verify(self.PHONE, '12345'), VERIFY_INVALID)
+
+    def test_locked_after_max_attempts(self):
+        self.issue('12345')
+        for _ in range(3):
+            self.assertEqual(self.store.verify(self.PHONE, '00000'), VERIFY_INVALID)
+        self.assertEqual(self.store.verify(self.PHONE, '12345'), VERIFY_LOCKED)
+
+    def test_new_code_does_not_reset_lockout(self):
+        self.issue('12345')
+        for _ in range(3):
+            self.store.verify(self.PHONE, '00000')
+
+        self.issue('67890')
+        self.assertEqual(self.store.verify(self.PHONE, '67890'), VERIFY_LOCKED)
@@ -0,0 +1,83 @@
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.principal import get_principal
+
+
+def build_role_claims(user):
+    """claim های نقش: شناسه نقش‌ها، لیست باشگاه‌های تحت مدیریت و نسخه نقش‌ها"""
+    customer = getattr(user, 'customer', None)
+    gym_manager = getattr(user, 'gym_manager', None)
+    gym_secretary = getattr(user, 'gym_secretary', None)
+    platform_manager = getattr(user, 'platform_manager', None)
+
+    if gym_manager:
+        gyms = list(gym_manager.gyms.values_list('id', flat=True))
+    elif gym_secretary:
+        gyms = [gym_secretary.gym_id]
+    else:
+        gyms = []
+
+    return {
+        'roles': {
+            'customer': customer.id if customer else None,
+            'gym_manager': gym_manager.id if gym_manager else None,
+            'gym_secretary_gym': gym_secretary.gym_id if gym_secretary else None,
+            'platform_manager': platform_manager.id if platform_manager else None,
+        },
+        'gyms': gyms,
+        'rv': user.role_version,
+    }
+
+
+def stamp_role_claims(token, user):
+    for claim, value in build_role_claims(user).items():
+        token[claim] = value
+    return token
+
+
+class RoleRefreshToken(RefreshToken):
+    """رفرش توکنی که claim های نقش رو حمل می‌کنه؛ اکسس توکن ساخته شده ازش هم همین claim ها رو داره"""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        return stamp_role_claims(token, user)
+
+
+def get_role_claims(request):
+    """
+    claim های نقش توکن درخواست، فقط اگر نسخه نقش توکن با نسخه فعلی کاربر یکی باشه.
+    در غیر این صورت None برمی‌گرده و باید از مسیر principal/دیتابیس چک بشه.
+    """
+    token = getattr(request, 'auth', None)
+    principal = get_principal(request.user)
+    if token is None or principal is None or not hasattr(token, 'get'):
+        return None
+    if token.get('rv') is None or token.get('rv') != principal.user_fields.get('role_version'):
+        return None
+    return token
+
+
+def get_managed_gym_ids(request):
+    """شناسه باشگاه‌هایی که کاربر (مدیر یا منشی) به آن‌ها دسترسی دارد؛ برای هر درخواست یک بار محاسبه میشه"""
+    gym_ids = getattr(request, '_managed_gym_ids', None)
+    if gym_ids is None:
+        gym_ids = _load_managed_gym_ids(request)
+        request._managed_gym_ids = gym_ids
+    return gym_ids
+
+
+def _load_managed_gym_ids(request):
+    claims = get_role_claims(request)
+    if claims is not None:
+        return claims['gyms']
+
+    from gyms.models import Gym
+    principal = get_principal(request.user)
+    if principal is None:
+        return []
+    if principal.is_gym_manager:
+        return list(Gym.objects.filter(manager_id=principal.gym_manager_id).values_list('id', flat=True))
+    if principal.is_gym_secretary:
+        return [principal.gym_secretary_gym_id]
+    return []
@@ -0,0 +1,58 @@
+import logging
+import random
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+logger = logging.getLogger('accounts.trace')
+
+
+class AuthTrace:
+    """
+    یک trace نمونه‌برداری شده برای یک درخواست: زمان هر مرحله (مثلا decode توکن و fetch یوزر)
+    جمع میشه و در پایان فقط یک خط لاگ ساختاریافته نوشته میشه.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.timings = {}
+
+    @contextmanager
+    def span(self, step):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[step] = (time.perf_counter() - started) * 1000
+
+    def finish(self, **fields):
+        total = (time.perf_counter() - self.started) * 1000
+        parts = [f"{step}_ms={ms:.2f}" for step, ms in self.timings.items()]
+        parts += [f"{key}={value}" for key, value in fields.items()]
+        logger.info("%s total_ms=%.2f %s", self.name, total, " ".join(parts),
+                    extra={"trace": self.name, "timings": self.timings, **fields})
+
+
+class NullTrace:
+    """وقتی trace خاموش است یا درخواست نمونه‌برداری نشده؛ هیچ I/O انجام نمیده."""
+
+    @contextmanager
+    def span(self, step):
+        yield
+
+    def finish(self, **fields):
+        pass
+
+
+NULL_TRACE = NullTrace()
+
+
+def start_trace(name):
+    """در صورت فعال بودن AUTH_TRACE_ENABLED و قبول شدن در نمونه‌برداری یک AuthTrace برمی‌گردونه."""
+    if not getattr(settings, 'AUTH_TRACE_ENABLED', False):
+        return NULL_TRACE
+    if random.random() >= getattr(settings, 'AUTH_TRACE_SAMPLE_RATE', 1.0):
+        return NULL_TRACE
+    return AuthTrace(name)
@@ -7,6 +7,8 @@ urlpatterns = [
     path('status/', views.UserRoleStatusView.as_view(), name='status'),
     path('login/', views.LoginView.as_view(), name='login'),
     path('request-otp/', views.RequestOTPView.as_view(), name='request-otp'),
+    # خارج از مسیرهای گروه otp محدودیت نرخ؛ polling وضعیت ارسال نباید سهمیه درخواست/تایید OTP رو مصرف کنه
+    path('otp-status/', views.OTPDeliveryStatusView.as_view(), name='otp-status'),
     path('verify-otp/', views.VerifyOTPView.as_view(), name='verify-otp'),
     path('logout/', views.LogoutView.as_view(), name='logout'),
     path('refresh-token/', views.RefreshTokenView.as_view(), name='refresh-token'),
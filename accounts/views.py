@@ -1,10 +1,7 @@
-import secrets
-from datetime import timedelta
 
 from django.shortcuts import render
-from django.utils import timezone
 from django.utils.timezone import now
-from drf_spectacular.utils import extend_schema
+from drf_spectacular.utils import OpenApiParameter, extend_schema
 from rest_framework import generics, status
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.permissions import AllowAny, IsAuthenticated
@@ -12,16 +9,24 @@ from rest_framework.response import Response
 from rest_framework.throttling import AnonRateThrottle
 from rest_framework.views import APIView
 from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from Fitno import settings
+from accounts.api_keys import api_key_store
 from accounts.auth import CustomJWTAuthentication
-from accounts.models import Customer, GymManager, OTP, User, APIKey
+from accounts.models import Customer, GymManager, User
+from accounts.otp import otp_store, VERIFY_OK, VERIFY_MISSING, VERIFY_LOCKED
+from accounts.pagination import IdCursorPagination
 from accounts.permissions import IsGymManager, IsPlatformAdmin
+from accounts.sms import DELIVERY_FAILED, DELIVERY_PENDING, DELIVERY_SENT
+from accounts.principal import get_principal, ROLE_RELATIONS
 from accounts.serializers import CustomerRegisterSerializer, PasswordLoginSerializer, GymManagerSerializer, \
     GymSerializer, UserRoleStatusSerializer, CustomerProfileSerializer, GymPanelCustomerListSerializer, \
     VerifyOTPSerializer, VerifyOTPResponseSerializer, RequestOTPSerializer, RequestOTPResponseSerializer, \
-    AdminPanelCustomerDetailSerializer, GymPanelCustomerDetailSerializer
+    AdminPanelCustomerDetailSerializer, GymPanelCustomerDetailSerializer, AdminPanelCustomerListSerializer, \
+    annotate_active_membership
+from accounts.tokens import RoleRefreshToken, stamp_role_claims, get_managed_gym_ids
 from gyms.models import Gym, MemberShip
 
 
@@ -33,13 +38,14 @@ class UserRoleStatusView(generics.GenericAPIView):
 
     def get(self, request, *args, **kwargs):
         user = request.user
-        if user.is_authenticated:
+        principal = get_principal(user)
+        if principal is not None:
             data = {
                 "is_authenticated": True,
                 "name": user.full_name,
-                "is_customer": hasattr(user, "customer"),
-                "is_gym_manager": hasattr(user, "gym_manager"),
-                "is_platform_manager": hasattr(user, "platform_manager"),
+                "is_customer": principal.is_customer,
+                "is_gym_manager": principal.is_gym_manager,
+                "is_platform_manager": principal.is_platform_manager,
             }
         else:
             data = {
@@ -92,7 +98,7 @@ class LoginView(generics.GenericAPIView):
         customer = user.customer
 
         # ساخت توکن‌ها
-        refresh = RefreshToken.for_user(user)
+        refresh = RoleRefreshToken.for_user(user)
         access_token = str(refresh.access_token)
         refresh_token = str(refresh)
 
@@ -141,9 +147,11 @@ class RequestOTPView(APIView):
             200: RequestOTPResponseSerializer,
             400: RequestOTPResponseSerializer,
             403: RequestOTPResponseSerializer,
-            500: RequestOTPResponseSerializer
+            429: RequestOTPResponseSerializer,
+            500: RequestOTPResponseSerializer,
         },
-        description="ارسال درخواست OTP با شماره موبایل"
+        description="ارسال درخواست OTP با شماره موبایل؛ اگر delivery_status برابر pending باشه "
+                    "وضعیت ارسال از otp-status/ پرسیده میشه"
     )
     def post(self, request):
         phone = request.data.get('phone')
@@ -158,19 +166,60 @@ class RequestOTPView(APIView):
                 {"error": "این شماره وجود ندارد"},
                 status=status.HTTP_404_NOT_FOUND
             )
-        OTP.objects.filter(user=user).delete()
-        otp_code = str(secrets.randbelow(100000)).zfill(5)
-        print(otp_code)
-        expires_at = timezone.now() + timedelta(minutes=2)
-        otp = OTP.objects.create(user=user, code=otp_code, expires_at=expires_at)
-        success, message = otp.send_otp(phone=phone, otp_code=otp_code)
-        if not success:
+        # ارسال پیامک در پس‌زمینه؛ پاسخ بلافاصله بعد از ذخیره کد برمی‌گرده
+        retry_after = otp_store.issue(user, phone)
+        if retry_after:
             return Response(
-                {"error": f"خطا در ارسال OTP: {message}"},
+                {"error": "کد قبلاً ارسال شده است؛ لطفاً کمی بعد دوباره تلاش کنید", "retry_after": retry_after},
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={"Retry-After": str(retry_after)}
+            )
+        # ارسال همزمان (بدون worker) یا ارسالی که تا همین لحظه تموم شده ممکنه ناموفق باشه
+        delivery_status = otp_store.delivery_status(phone) or DELIVERY_PENDING
+        if delivery_status == DELIVERY_FAILED:
+            return Response(
+                {"error": "خطا در ارسال OTP", "delivery_status": delivery_status},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
         return Response(
-            {"message": "لطفاً کد OTP را وارد کنید"},
+            {"message": "لطفاً کد OTP را وارد کنید", "delivery_status": delivery_status},
+            status=status.HTTP_200_OK
+        )
+
+
+class OTPDeliveryStatusView(APIView):
+    throttle_classes = [AnonRateThrottle]
+    permission_classes = [AllowAny]
+
+    @extend_schema(
+        parameters=[OpenApiParameter('phone', str, required=True, description="شماره موبایل")],
+        responses={
+            200: RequestOTPResponseSerializer,
+            400: RequestOTPResponseSerializer,
+            404: RequestOTPResponseSerializer,
+        },
+        description="وضعیت ارسال پیامک آخرین کد OTP معتبر شماره (pending / sent / failed)"
+    )
+    def get(self, request):
+        phone = request.query_params.get('phone')
+        if not phone:
+            return Response(
+                {"error": "شماره موبایل الزامی است"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        delivery_status = otp_store.delivery_status(phone)
+        if delivery_status is None:
+            return Response(
+                {"error": "کد OTP معتبری برای این شماره وجود ندارد"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        messages = {
+            DELIVERY_PENDING: "پیامک در صف ارسال است",
+            DELIVERY_SENT: "پیامک ارسال شد",
+            DELIVERY_FAILED: "خطا در ارسال OTP؛ لطفاً دوباره درخواست دهید",
+        }
+        return Response(
+            {"message": messages[delivery_status], "delivery_status": delivery_status},
             status=status.HTTP_200_OK
         )
 
@@ -185,14 +234,15 @@ class VerifyOTPView(APIView):
             200: VerifyOTPResponseSerializer,
             400: VerifyOTPResponseSerializer,
             403: VerifyOTPResponseSerializer,
-            404: VerifyOTPResponseSerializer
+            404: VerifyOTPResponseSerializer,
+            429: VerifyOTPResponseSerializer
         },
         description="تأیید کد OTP و دریافت توکن‌های دسترسی"
     )
     def post(self, request):
         # (بقیه کد همونیه که فرستادی)
         api_key = request.headers.get('X-API-Key')
-        if not api_key or not APIKey.objects.filter(key=api_key, is_active=True).exists():
+        if not api_key_store.is_valid(api_key):
             return Response(
                 {"error": "Invalid API Key"},
                 status=status.HTTP_403_FORBIDDEN
@@ -211,23 +261,26 @@ class VerifyOTPView(APIView):
                 {"error": "User not found"},
                 status=status.HTTP_404_NOT_FOUND
             )
-        try:
-            otp = OTP.objects.filter(user=user).latest('created_at')
-            if otp.code != code or not otp.is_valid():
-                return Response(
-                    {"error": "Invalid or expired OTP"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            otp.delete()
-            if not user.is_active:
-                user.is_active = True
-                user.save()
-        except OTP.DoesNotExist:
+        result = otp_store.verify(phone, code)
+        if result == VERIFY_LOCKED:
+            return Response(
+                {"error": "Too many invalid attempts; try again later"},
+                status=status.HTTP_429_TOO_MANY_REQUESTS
+            )
+        if result == VERIFY_MISSING:
             return Response(
                 {"error": "No OTP found"},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        refresh = RefreshToken.for_user(user)
+        if result != VERIFY_OK:
+            return Response(
+                {"error": "Invalid or expired OTP"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not user.is_active:
+            user.is_active = True
+            user.save(update_fields=['is_active'])
+        refresh = RoleRefreshToken.for_user(user)
         access_token = str(refresh.access_token)
         refresh_token = str(refresh)
         response = Response(
@@ -263,7 +316,11 @@ class RefreshTokenView(generics.GenericAPIView):
 
         try:
             refresh = RefreshToken(refresh_token)  # refresh_token از کوکی گرفته میشه
-            access_token = str(refresh.access_token)  # فقط اکسس جدید ساخته میشه
+            access = refresh.access_token  # فقط اکسس جدید ساخته میشه
+
+            # claim های نقش دوباره از دیتابیس ساخته میشن تا نقش‌های جدید در توکن بیاد
+            user = User.objects.select_related(*ROLE_RELATIONS).get(pk=refresh[api_settings.USER_ID_CLAIM])
+            access_token = str(stamp_role_claims(access, user))
 
             response = Response({
                 "access": access_token
@@ -300,9 +357,11 @@ class CustomerRegisterView(generics.CreateAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         customer = serializer.save()
+        # ساخت Customer نسخه نقش رو با update() زیاد کرده؛ توکن باید نسخه فعلی رو داشته باشه
+        customer.user.refresh_from_db(fields=['role_version'])
 
         # توکن‌ها
-        refresh = RefreshToken.for_user(customer.user)
+        refresh = RoleRefreshToken.for_user(customer.user)
         access_token = str(refresh.access_token)
         refresh_token = str(refresh)
 
@@ -362,18 +421,13 @@ class GymPanelCustomerListView(generics.ListAPIView):
     serializer_class = GymPanelCustomerListSerializer
     permission_classes = [IsGymManager, IsAuthenticated]
     authentication_classes = [CustomJWTAuthentication]
+    pagination_class = IdCursorPagination
 
     def get_queryset(self):
-        user = self.request.user
-        if hasattr(user, 'gym_secretary'):
-            gym = user.gym_secretary.gym
-            return Customer.objects.filter(memberships__gym=gym).distinct()
-
-        elif hasattr(user, 'gym_manager'):
-            gyms = user.gym_manager.gyms.all()
-            return Customer.objects.filter(memberships__gym__in=gyms).distinct()
-
-        return Customer.objects.none()
+        # باشگاه‌های مدیر یا منشی از claim های توکن خونده میشن
+        gym_ids = get_managed_gym_ids(self.request)
+        queryset = Customer.objects.filter(memberships__gym_id__in=gym_ids).distinct().order_by('-id')
+        return GymPanelCustomerListSerializer.setup_eager_loading(queryset, gym_ids)
 
 
 class GymPanelCustomerDetailView(generics.RetrieveAPIView):
@@ -382,24 +436,22 @@ class GymPanelCustomerDetailView(generics.RetrieveAPIView):
     authentication_classes = [CustomJWTAuthentication]
 
     def get_queryset(self):
-        user = self.request.user
-
-        if hasattr(user, 'gym_secretary'):
-            gym = user.gym_secretary.gym
-            return Customer.objects.filter(memberships__gym=gym).distinct()
-
-        elif hasattr(user, 'gym_manager'):
-            gyms = user.gym_manager.gyms.all()
-            return Customer.objects.filter(memberships__gym__in=gyms).distinct()
-
-        return Customer.objects.none()
+        # باشگاه‌های مدیر یا منشی از claim های توکن خونده میشن
+        gym_ids = get_managed_gym_ids(self.request)
+        queryset = Customer.objects.filter(memberships__gym_id__in=gym_ids).distinct().prefetch_related(
+            'memberships__gym', 'memberships__type'
+        )
+        return annotate_active_membership(queryset, gym_ids)
 
 
 # <=================== Admin Views ===================>
 class AdminPanelCustomerListView(generics.ListAPIView):
-    queryset = Customer.objects.all()
-    serializer_class = GymPanelCustomerListSerializer
+    serializer_class = AdminPanelCustomerListSerializer
     permission_classes = [IsPlatformAdmin]
+    pagination_class = IdCursorPagination
+
+    def get_queryset(self):
+        return AdminPanelCustomerListSerializer.setup_eager_loading(Customer.objects.order_by('-id'))
 
 
 class AdminPanelCustomerDetailView(generics.RetrieveDestroyAPIView):
@@ -407,8 +459,10 @@ class AdminPanelCustomerDetailView(generics.RetrieveDestroyAPIView):
     نمایش جزئیات کامل مشتری شامل اطلاعات کاربری،
     اشتراک‌ها، ورود و خروج‌ها، باشگاه‌های بلاک‌شده و امتیازات
     """
-    queryset = Customer.objects.select_related('user').prefetch_related(
-        'memberships__gym', 'inouts__gym', 'blocked_gyms__gym', 'rates__gym'
-    )
     serializer_class = AdminPanelCustomerDetailSerializer
     permission_classes = [IsPlatformAdmin]
+
+    def get_queryset(self):
+        return annotate_active_membership(Customer.objects.select_related('user').prefetch_related(
+            'memberships__type', 'memberships__gym', 'inouts__gym', 'blocked_gyms__gym', 'rates__gym'
+        ))
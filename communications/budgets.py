@@ -0,0 +1,26 @@
+"""
+بودجه کوئری مسیرهای GET اپ communications؛ در communications.tests بررسی و در گزارش benchmark_endpoints نوشته میشه.
+ساختار جدول‌ها و روش اضافه کردن مسیر جدید مثل accounts.budgets است.
+"""
+from accounts.benchmark import DEFAULT_P95_BUDGET_MS
+from communications.models import Notification
+
+ENDPOINT_BUDGETS = {
+    # صفحه‌بندی limit/offset: COUNT + صفحه
+    'communications/customer/announcements/gym/': (2, DEFAULT_P95_BUDGET_MS),
+    'communications/customer/announcements/platform/': (2, DEFAULT_P95_BUDGET_MS),
+    'communications/customer/notifications/': (1, DEFAULT_P95_BUDGET_MS),
+    # از شمارنده Redis؛ فقط درخواست اول (گرم کردن) شمارش دیتابیسی داره
+    'communications/customer/notifications/unread-count/': (0, DEFAULT_P95_BUDGET_MS),
+    # صفحه تیکت‌های اصلی + کل درخت ریپلای با یک WITH RECURSIVE
+    'communications/customer/tickets/': (2, DEFAULT_P95_BUDGET_MS),
+}
+
+PK_RESOLVERS = {
+    'communications/customer/notifications/<int:pk>':
+        lambda ctx: Notification.objects.filter(user=ctx['customer_user']).values_list('id', flat=True).first(),
+}
+
+ROUTE_QUERIES = {}
+
+EXPECTED_STATUS = {}
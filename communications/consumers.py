@@ -1,20 +1,54 @@
 # your_app/consumers.py
 import json
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 
+from accounts.principal import principal_store
+from communications.notifications import user_group, gym_staff_group
+from gyms.models import Gym
+
+
 class NotificationConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         user = self.scope['user']
         if user.is_anonymous:
             await self.close()
         else:
-            self.group_name = f"user_{user.id}"
-            await self.channel_layer.group_add(self.group_name, self.channel_name)
-            await self.accept()
+            self.group_name = user_group(user.id)
+            # گروه کارکنان باشگاه‌هایی که کاربر مدیر یا منشی آن‌هاست (داشبورد پنل باشگاه)
+            staff_gym_ids = await self.staff_gym_ids(user.id)
+            self.groups_joined = [
+                self.group_name,
+                *[gym_staff_group(gym_id) for gym_id in staff_gym_ids],
+            ]
+            for group in self.groups_joined:
+                await self.channel_layer.group_add(group, self.channel_name)
+            await self.accept(subprotocol=self.scope.get('auth_subprotocol'))
 
     async def disconnect(self, close_code):
-        await self.channel_layer.group_discard(self.group_name, self.channel_name)
+        for group in getattr(self, 'groups_joined', []):
+            await self.channel_layer.group_discard(group, self.channel_name)
+
+    @database_sync_to_async
+    def staff_gym_ids(self, user_id):
+        principal = principal_store.get(user_id)
+        if principal is None:
+            return []
+        if principal.is_gym_manager:
+            return list(Gym.objects.filter(manager_id=principal.gym_manager_id).values_list('id', flat=True))
+        if principal.is_gym_secretary:
+            return [principal.gym_secretary_gym_id]
+        return []
 
     # متد دریافت پیام از گروه
     async def send_notification(self, event):
         await self.send(text_data=json.dumps(event["message"]))
+
+    async def unread_count(self, event):
+        await self.send(text_data=json.dumps({"unread_count": event["count"]}))
+
+    async def occupancy_update(self, event):
+        await self.send(text_data=json.dumps({"occupancy": {"gym_id": event["gym_id"], "count": event["count"]}}))
+
+    async def checkin_queue(self, event):
+        await self.send(text_data=json.dumps({"checkin_queue": {k: v for k, v in event.items() if k != "type"}}))
@@ -0,0 +1,70 @@
+import statistics
+import time
+from urllib.parse import parse_qs, urlparse
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+from rest_framework.pagination import LimitOffsetPagination, Cursor
+from rest_framework.request import Request
+
+from accounts.models import User
+from accounts.pagination import IdCursorPagination
+from communications.models import Notification
+
+
+class Command(BaseCommand):
+    help = (
+        "latency صفحه اول و صفحه عمیق (پیش‌فرض صفحه 10,000) رو برای LimitOffsetPagination و "
+        "IdCursorPagination روی نوتیفیکیشن‌های یک کاربر مقایسه می‌کنه. دیتا در پایان rollback میشه."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page', type=int, default=10000, help="شماره صفحه عمیق")
+        parser.add_argument('--page-size', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        page, page_size = options['page'], options['page_size']
+        rows = page * page_size
+
+        with transaction.atomic():
+            user = User.objects.create(phone='09000000003', full_name='pagination benchmark')
+            for start in range(0, rows, 5000):
+                Notification.objects.bulk_create([
+                    Notification(user=user, action='info', message=f"Notification {n}")
+                    for n in range(start, min(rows, start + 5000))
+                ])
+            queryset = Notification.objects.filter(user=user)
+            # شناسه آخرین ردیف صفحه قبل از صفحه عمیق (فقط برای ساخت cursor، خارج از اندازه‌گیری)
+            deep_position = queryset.order_by('-id').values_list('id', flat=True)[(page - 1) * page_size - 1]
+
+            offset = LimitOffsetPagination()
+            cursor = IdCursorPagination()
+            cursor.page_size = page_size
+            cursor.base_url = '/'
+            deep_url = cursor.encode_cursor(Cursor(offset=0, reverse=False, position=deep_position))
+            deep_cursor = parse_qs(urlparse(deep_url).query)['cursor'][0]
+
+            results = {
+                'offset page 1': self.measure(offset, queryset.order_by('-id'), {'limit': page_size}, options),
+                f'offset page {page}': self.measure(
+                    offset, queryset.order_by('-id'), {'limit': page_size, 'offset': (page - 1) * page_size}, options),
+                'cursor page 1': self.measure(cursor, queryset, {}, options),
+                f'cursor page {page}': self.measure(cursor, queryset, {'cursor': deep_cursor}, options),
+            }
+            transaction.set_rollback(True)
+
+        for name, (p50, p95) in results.items():
+            self.stdout.write(f"{name:>22}: p50={p50:8.2f}ms p95={p95:8.2f}ms")
+
+    def measure(self, paginator, queryset, params, options):
+        factory = RequestFactory(SERVER_NAME='localhost')
+        timings = []
+        for _ in range(options['repeat']):
+            request = Request(factory.get('/', params))
+            started = time.perf_counter()
+            list(paginator.paginate_queryset(queryset, request))
+            timings.append((time.perf_counter() - started) * 1000)
+        p95 = statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+        return statistics.median(timings), p95
@@ -22,6 +22,12 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False)
     meta = models.JSONField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # نوتیفیکیشن‌های کاربر با صفحه‌بندی keyset
+            models.Index(fields=['user', '-id'], name='notification_user_idx'),
+        ]
+
     def __str__(self):
         return f"Notification for {self.user}"
 
@@ -0,0 +1,100 @@
+"""
+سرویس ارسال نوتیفیکیشن: ذخیره دسته‌ای Notification، به‌روزرسانی شمارنده خوانده نشده‌ها
+و push از طریق channel layer بعد از commit.
+مخاطب می‌تونه لیست کاربرها باشه یا همه اعضای فعال یک باشگاه؛ هر کاربر پیام خودش (با شناسه نوتیفیکیشن خودش)
+رو از گروه user_{id} می‌گیره و group_send ها به صورت همزمان و دسته‌ای اجرا میشن (نه یکی یکی پشت سر هم).
+"""
+import asyncio
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+
+from communications.models import Notification
+from communications.unread import unread_counter
+from gyms.models import MemberShip
+
+logger = logging.getLogger(__name__)
+
+
+def user_group(user_id):
+    return f"user_{user_id}"
+
+
+def gym_staff_group(gym_id):
+    """مدیر و منشی‌های باشگاه (داشبورد پنل باشگاه)"""
+    return f"gym_{gym_id}_staff"
+
+
+def gym_member_user_ids(gym_id):
+    """یوزر همه مشتری‌هایی که ممبرشیپ فعال در باشگاه دارن"""
+    return list(
+        MemberShip.objects.active().filter(gym_id=gym_id).values_list('customer__user_id', flat=True).distinct()
+    )
+
+
+def notification_payload(notification):
+    return {
+        "id": notification.id,
+        "action": notification.action,
+        "message": notification.message,
+        "is_read": notification.is_read,
+        "meta": notification.meta,
+    }
+
+
+def _create_notifications(user_ids, action, message, meta):
+    batch_size = getattr(settings, 'NOTIFICATION_BULK_BATCH_SIZE', 1000)
+    return Notification.objects.bulk_create(
+        [Notification(user_id=user_id, action=action, message=message, meta=meta) for user_id in user_ids],
+        batch_size=batch_size,
+    )
+
+
+async def _group_send_many(channel_layer, messages):
+    """group_send ها به صورت همزمان در دسته‌های محدود (نه یکی یکی پشت سر هم)"""
+    concurrency = getattr(settings, 'NOTIFICATION_PUSH_CONCURRENCY', 100)
+    for start in range(0, len(messages), concurrency):
+        chunk = messages[start:start + concurrency]
+        results = await asyncio.gather(
+            *(channel_layer.group_send(group, event) for group, event in chunk), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning("notification push failed: %s", result)
+
+
+def push(messages):
+    """ارسال لیست (group, event) به channel layer؛ خطای channel layer نباید درخواست رو خراب کنه"""
+    channel_layer = get_channel_layer()
+    if channel_layer is None or not messages:
+        return
+    try:
+        async_to_sync(_group_send_many)(channel_layer, messages)
+    except Exception as e:
+        logger.warning("notification push failed: %s", e)
+
+
+def _deliver(user_ids, messages):
+    unread_counter.incr(user_ids)
+    push(messages)
+
+
+def notify_users(user_ids, action, message, meta=None):
+    """برای هر کاربر یک Notification می‌سازه و بعد از commit به گروه user_{id} خودش push می‌کنه"""
+    notifications = _create_notifications(dict.fromkeys(user_ids), action, message, meta)
+    messages = [
+        (user_group(notification.user_id),
+         {"type": "send_notification", "message": notification_payload(notification)})
+        for notification in notifications
+    ]
+    user_ids = [notification.user_id for notification in notifications]
+    transaction.on_commit(lambda: _deliver(user_ids, messages))
+    return notifications
+
+
+def notify_gym_members(gym_id, action, message, meta=None):
+    """برای همه اعضای فعال باشگاه Notification می‌سازه و مثل notify_users به گروه هر عضو push می‌کنه"""
+    return notify_users(gym_member_user_ids(gym_id), action, message, meta)
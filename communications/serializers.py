@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from communications.models import Announcement, Ticket, Notification
+from communications.threads import attach_ticket_threads
 
 
 class AnnouncementSerializer(serializers.ModelSerializer):
@@ -10,31 +11,67 @@ class AnnouncementSerializer(serializers.ModelSerializer):
         model = Announcement
         fields = ["id", "type", "message", "gym_title", "sender_name"]
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('gym', 'sender')
 
-class CustomerPanelRecursiveTicketSerializer(serializers.Serializer):
-    def to_representation(self, instance):
-        serializer = CustomerPanelTicketSerializer(instance, context=self.context)
-        return serializer.data
+
+class CustomerPanelTicketListSerializer(serializers.ListSerializer):
+    """درخت ریپلای همه تیکت‌های صفحه با یک کوئری لود میشه"""
+
+    def to_representation(self, data):
+        tickets = list(data.all() if hasattr(data, 'all') else data)
+        attach_ticket_threads(tickets)
+        return super().to_representation(tickets)
 
 
 class CustomerPanelTicketSerializer(serializers.ModelSerializer):
-    sender_name = serializers.CharField(source="sender.full_name", read_only=True)
-    replies = CustomerPanelRecursiveTicketSerializer(many=True, read_only=True)
+    sender_name = serializers.SerializerMethodField()
+    replies = serializers.SerializerMethodField()
+    replies_truncated = serializers.SerializerMethodField()
 
     class Meta:
         model = Ticket
-        fields = ["id", "sender_name", "message", "send_time", "replies", "replied_to"]
+        fields = ["id", "sender_name", "message", "send_time", "replies", "replies_truncated", "replied_to"]
         extra_kwargs = {
             "replied_to": {"write_only": True, "required": False}
         }
+        list_serializer_class = CustomerPanelTicketListSerializer
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('sender')
+
+    def get_sender_name(self, obj):
+        # ریپلای‌ها نام فرستنده رو از کوئری درخت دارن
+        if hasattr(obj, 'sender_name'):
+            return obj.sender_name
+        return obj.sender.full_name if obj.sender else None
+
+    def get_replies(self, obj):
+        if not hasattr(obj, 'thread_replies'):
+            attach_ticket_threads([obj])
+        return [self.to_representation(reply) for reply in obj.thread_replies]
+
+    def get_replies_truncated(self, obj):
+        # True یعنی بخشی از ریپلای‌ها به خاطر سقف عمق یا تعداد لود نشده
+        if not hasattr(obj, 'replies_truncated'):
+            attach_ticket_threads([obj])
+        return obj.replies_truncated
 
     def create(self, validated_data):
         request = self.context.get("request")
         user = request.user
         ticket = Ticket.objects.create(sender=user, **validated_data)
+        ticket.thread_replies = []
+        ticket.replies_truncated = False
         return ticket
 
 
+class CustomerPanelNotificationMarkReadSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=500)
+
+
 class CustomerPanelNotificationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Notification
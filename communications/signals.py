@@ -0,0 +1,13 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from communications.models import Announcement
+from communications.notifications import notify_gym_members
+
+
+@receiver(post_save, sender=Announcement)
+def notify_gym_announcement(sender, instance, created, **kwargs):
+    """اطلاعیه جدید باشگاه برای همه اعضای فعال آن باشگاه نوتیفیکیشن میشه"""
+    if created and instance.type == 'gym' and instance.gym_id:
+        notify_gym_members(instance.gym_id, 'announcement', instance.message, meta={'announcement_id': instance.id})
+
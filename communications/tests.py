@@ -1,3 +1,86 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from accounts.benchmark import seed_benchmark_data
+from accounts.testing import EndpointBudgetTestsMixin, LocalBackendsTestCase
+from communications.models import Notification
+from communications.notifications import notify_gym_members, user_group
+from communications.unread import UnreadCounter, unread_counter
+from gyms.models import MemberShip
+
+
+class GymMemberNotificationTests(LocalBackendsTestCase):
+    """پیام اعضای باشگاه به گروه هر کاربر و فقط با شناسه نوتیفیکیشن خودش push میشه"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_benchmark_data(gyms=5, customers=20)
+
+    def test_each_member_gets_only_their_own_notification(self):
+        gym_id = MemberShip.objects.active().values_list('gym_id', flat=True).first()
+        with mock.patch('communications.notifications.push') as push, \
+                self.captureOnCommitCallbacks(execute=True):
+            notifications = notify_gym_members(gym_id, 'announcement', 'gym news')
+
+        self.assertGreater(len(notifications), 1)
+        (messages,), _ = push.call_args
+        expected = {user_group(notification.user_id): notification.id for notification in notifications}
+        self.assertEqual(len(messages), len(expected))
+        for group, event in messages:
+            self.assertEqual(event['message']['id'], expected[group])
+            self.assertNotIn('ids', event)
+
+
+class NotFoundOnEmptyListQueryTests(LocalBackendsTestCase):
+    """لیست‌های NotFoundOnEmptyListMixin صفحه رو یک بار ارزیابی می‌کنن و exists() جدا نمی‌زنن"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ctx = seed_benchmark_data(gyms=5, customers=10)
+
+    def test_gym_announcements(self):
+        # COUNT صفحه‌بندی limit/offset + صفحه با gym و sender
+        self.assert_get_queries(self.ctx, 'communications/customer/announcements/gym/', 2)
+
+    def test_platform_announcements(self):
+        self.assert_get_queries(self.ctx, 'communications/customer/announcements/platform/', 2)
+
+    def test_tickets(self):
+        # صفحه تیکت‌های اصلی + کل درخت ریپلای با یک WITH RECURSIVE
+        self.assert_get_queries(self.ctx, 'communications/customer/tickets/', 2)
+
+    def test_notifications(self):
+        self.assert_get_queries(self.ctx, 'communications/customer/notifications/', 1)
+
+    def test_empty_notifications_is_not_found_with_one_query(self):
+        self.ctx['customer_user'].notifications.all().delete()
+        self.assert_get_queries(self.ctx, 'communications/customer/notifications/', 1, status=404)
+
+
+class MarkAllReadTests(LocalBackendsTestCase):
+    """شمارنده بعد از خواندن همه از دیتابیس شمرده میشه و نوتیفیکیشن همزمان رو از دست نمیده"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ctx = seed_benchmark_data(gyms=5, customers=10)
+        cls.user_id = cls.ctx['customer_user'].id
+
+    def test_notification_created_during_mark_all_read_is_counted(self):
+        self.assertGreater(unread_counter.count(self.user_id), 0)
+        invalidate = UnreadCounter.invalidate
+
+        def notify_then_invalidate(counter, user_id):
+            # درخواست دیگه‌ای بعد از UPDATE نوتیفیکیشن جدید commit کرده و شمارنده رو زیاد کرده
+            Notification.objects.create(user_id=user_id, action='info', message='new')
+            counter.incr([user_id])
+            invalidate(counter, user_id)
+
+        with mock.patch.object(UnreadCounter, 'invalidate', autospec=True, side_effect=notify_then_invalidate):
+            updated, unread = unread_counter.mark_all_read(self.user_id)
+
+        self.assertGreater(updated, 0)
+        self.assertEqual(unread, 1)
+        self.assertEqual(unread_counter.count(self.user_id), 1)
+
+
+class EndpointQueryBudgetTests(EndpointBudgetTestsMixin, LocalBackendsTestCase):
+    route_prefix = 'communications/'
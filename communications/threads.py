@@ -0,0 +1,74 @@
+"""
+لود کل درخت ریپلای تیکت‌ها با یک کوئری WITH RECURSIVE.
+درخت در حافظه ساخته میشه و نام فرستنده هم در همان کوئری میاد؛ عمق داخل بازگشت و تعداد نودها با LIMIT
+(به ترتیب عمق و شناسه) محدود است و نودهایی که همه ریپلای‌هاشون لود نشده replies_truncated می‌گیرن.
+"""
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+
+from accounts.models import User
+from communications.models import Ticket
+
+logger = logging.getLogger(__name__)
+
+
+def _thread_sql(root_count):
+    quote = connection.ops.quote_name
+    ticket_table = quote(Ticket._meta.db_table)
+    user_table = quote(User._meta.db_table)
+    placeholders = ", ".join(["%s"] * root_count)
+    # ریشه‌ها هم برمی‌گردن (depth=0) تا تعداد ریپلای‌هاشون معلوم باشه؛
+    # ORDER BY depth, id باعث میشه LIMIT همیشه عمیق‌ترین و جدیدترین نودها رو حذف کنه
+    return f"""
+        WITH RECURSIVE thread (id, sender_id, message, send_time, replied_to_id, depth) AS (
+            SELECT id, sender_id, message, send_time, replied_to_id, 0
+            FROM {ticket_table} WHERE id IN ({placeholders})
+            UNION ALL
+            SELECT t.id, t.sender_id, t.message, t.send_time, t.replied_to_id, thread.depth + 1
+            FROM {ticket_table} t JOIN thread ON t.replied_to_id = thread.id
+            WHERE thread.depth < %s
+        )
+        SELECT thread.id, thread.sender_id, thread.message, thread.send_time, thread.replied_to_id,
+               thread.depth, u.full_name AS sender_name,
+               (SELECT COUNT(*) FROM {ticket_table} c WHERE c.replied_to_id = thread.id) AS reply_count
+        FROM thread LEFT JOIN {user_table} u ON u.id = thread.sender_id
+        ORDER BY thread.depth, thread.id
+        LIMIT %s
+    """
+
+
+def attach_ticket_threads(tickets, max_depth=None, max_nodes=None):
+    """
+    ریپلای‌های همه تیکت‌های داده شده رو با یک کوئری لود می‌کنه و روی هر تیکت thread_replies می‌ذاره
+    (ریپلای‌ها هم به همین شکل thread_replies خودشون رو دارن). اگر به خاطر سقف عمق یا تعداد نود
+    بخشی از ریپلای‌های یک نود لود نشده باشه، replies_truncated اون نود True میشه.
+    """
+    tickets = list(tickets)
+    if not tickets:
+        return tickets
+    max_depth = max_depth or getattr(settings, 'TICKET_THREAD_MAX_DEPTH', 20)
+    max_nodes = max_nodes or getattr(settings, 'TICKET_THREAD_MAX_NODES', 500)
+
+    roots = {ticket.id: ticket for ticket in tickets}
+    rows = list(Ticket.objects.raw(_thread_sql(len(roots)), [*roots, max_depth, max_nodes + len(roots)]))
+    reply_counts = {row.id: row.reply_count for row in rows}
+    replies = [row for row in rows if row.depth > 0]
+
+    children = defaultdict(list)
+    for reply in replies:
+        children[reply.replied_to_id].append(reply)
+    for nodes in children.values():
+        nodes.sort(key=lambda node: (node.send_time, node.id))
+
+    truncated = False
+    for node in [*tickets, *replies]:
+        node.thread_replies = children.get(node.id, [])
+        node.replies_truncated = len(node.thread_replies) < reply_counts.get(node.id, 0)
+        truncated = truncated or node.replies_truncated
+    if truncated:
+        logger.warning("ticket threads truncated (max_depth=%s, max_nodes=%s) for roots %s",
+                       max_depth, max_nodes, list(roots))
+    return tickets
@@ -0,0 +1,254 @@
+"""
+شمارنده تعداد نوتیفیکیشن‌های خوانده نشده هر کاربر در Redis.
+شمارنده فقط در صورت miss از دیتابیس شمرده میشه؛ بعد از آن با هر نوتیفیکیشن جدید زیاد و
+با UPDATE های دسته‌ای خوانده شدن کم میشه. هر تغییر به گروه WebSocket کاربر push میشه.
+"""
+import logging
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from communications.models import Notification
+
+logger = logging.getLogger(__name__)
+
+# مقدار موقت کلید در حین شمارش از دیتابیس؛ هر تغییری که در این فاصله برسه اون رو باطل می‌کنه
+SEED_PREFIX = "seed:"
+
+# فقط شمارنده‌هایی که وجود دارن زیاد میشن؛ کلید در حال شمارش (seed) پاک میشه تا شمارش قدیمی ذخیره نشه
+INCR_IF_EXISTS_LUA = """
+for i, key in ipairs(KEYS) do
+    local current = redis.call('GET', key)
+    if current then
+        if tonumber(current) then
+            redis.call('INCRBY', key, ARGV[1])
+        else
+            redis.call('DEL', key)
+        end
+    end
+end
+return #KEYS
+"""
+
+# کم کردن شمارنده بدون منفی شدن؛ مقدار جدید یا nil اگر شمارنده نبود (کلید در حال شمارش پاک میشه)
+DECR_IF_EXISTS_LUA = """
+local current = redis.call('GET', KEYS[1])
+if not current then
+    return nil
+end
+if not tonumber(current) then
+    redis.call('DEL', KEYS[1])
+    return nil
+end
+local value = math.max(tonumber(current) - tonumber(ARGV[1]), 0)
+redis.call('SET', KEYS[1], value, 'KEEPTTL')
+return value
+"""
+
+# ذخیره شمارش دیتابیس فقط اگر از شروع شمارش تغییری نرسیده باشه (کلید هنوز seed همین درخواسته)
+FINISH_SEED_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    return 1
+end
+return 0
+"""
+
+
+def _to_count(value):
+    """مقدار عددی شمارنده؛ کلید نبود یا در حال شمارش: None"""
+    if value is None:
+        return None
+    if isinstance(value, bytes):
+        value = value.decode()
+    if isinstance(value, str) and value.startswith(SEED_PREFIX):
+        return None
+    return int(value)
+
+
+class RedisUnreadBackend:
+    def __init__(self):
+        from django_redis import get_redis_connection
+        self.client = get_redis_connection(getattr(settings, 'NOTIFICATION_UNREAD_CACHE_ALIAS', 'default'))
+        self.incr_script = self.client.register_script(INCR_IF_EXISTS_LUA)
+        self.decr_script = self.client.register_script(DECR_IF_EXISTS_LUA)
+        self.finish_seed_script = self.client.register_script(FINISH_SEED_LUA)
+
+    def get(self, key):
+        return _to_count(self.client.get(key))
+
+    def begin_seed(self, key, token, ttl):
+        return bool(self.client.set(key, token, ex=ttl, nx=True))
+
+    def finish_seed(self, key, token, value, ttl):
+        return bool(self.finish_seed_script(keys=[key], args=[token, value, ttl]))
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    def incr_many(self, keys, amount):
+        if keys:
+            self.incr_script(keys=keys, args=[amount])
+
+    def decr(self, key, amount):
+        value = self.decr_script(keys=[key], args=[amount])
+        return int(value) if value is not None else None
+
+
+class LocalUnreadBackend:
+    """بک‌اند داخل حافظه برای تست‌ها و اجرای لوکال بدون Redis"""
+
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        value, expires_at = self._values.get(key, (None, 0))
+        return value if expires_at >= time.monotonic() else None
+
+    def get(self, key):
+        with self._lock:
+            return _to_count(self._get(key))
+
+    def begin_seed(self, key, token, ttl):
+        with self._lock:
+            if self._get(key) is not None:
+                return False
+            self._values[key] = (token, time.monotonic() + ttl)
+            return True
+
+    def finish_seed(self, key, token, value, ttl):
+        with self._lock:
+            if self._get(key) != token:
+                return False
+            self._values[key] = (value, time.monotonic() + ttl)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._values.pop(key, None)
+
+    def incr_many(self, keys, amount):
+        with self._lock:
+            for key in keys:
+                current = self._get(key)
+                if current is None:
+                    continue
+                if _to_count(current) is None:
+                    del self._values[key]
+                    continue
+                self._values[key] = (current + amount, self._values[key][1])
+
+    def decr(self, key, amount):
+        with self._lock:
+            current = self._get(key)
+            if current is None:
+                return None
+            if _to_count(current) is None:
+                del self._values[key]
+                return None
+            value = max(current - amount, 0)
+            self._values[key] = (value, self._values[key][1])
+            return value
+
+
+class UnreadCounter:
+    KEY_PREFIX = "notifications:unread"
+
+    def __init__(self, backend=None, ttl=None, seed_ttl=None):
+        self.backend = backend
+        self.ttl = ttl or getattr(settings, 'NOTIFICATION_UNREAD_TTL', 86400)
+        # اگر درخواست شمارنده وسط شمارش از بین بره، کلید seed بعد از این مدت خودش پاک میشه
+        self.seed_ttl = seed_ttl or getattr(settings, 'NOTIFICATION_UNREAD_SEED_TTL', 30)
+
+    def get_backend(self):
+        if self.backend is None:
+            backend_path = getattr(settings, 'NOTIFICATION_UNREAD_BACKEND', 'communications.unread.RedisUnreadBackend')
+            self.backend = import_string(backend_path)()
+        return self.backend
+
+    def key(self, user_id):
+        return f"{self.KEY_PREFIX}:{user_id}"
+
+    def count_from_db(self, user_id):
+        return Notification.objects.filter(user_id=user_id, is_read=False).count()
+
+    def count(self, user_id):
+        """
+        تعداد خوانده نشده؛ فقط در اولین بار (یا بعد از انقضا) از دیتابیس شمرده میشه.
+        قبل از شمارش یک seed در کلید گذاشته میشه و شمارش فقط وقتی ذخیره میشه که seed دست نخورده باشه؛
+        incr/decr که وسط شمارش برسن seed رو پاک می‌کنن، پس شمارش قدیمی هیچ وقت در Redis نمی‌مونه.
+        """
+        key = self.key(user_id)
+        try:
+            value = self.get_backend().get(key)
+            if value is not None:
+                return value
+            token = f"{SEED_PREFIX}{uuid.uuid4().hex}"
+            seeding = self.get_backend().begin_seed(key, token, self.seed_ttl)
+        except Exception as e:
+            logger.warning("unread counter unavailable: %s", e)
+            return self.count_from_db(user_id)
+
+        value = self.count_from_db(user_id)
+        if seeding:
+            try:
+                self.get_backend().finish_seed(key, token, value, self.ttl)
+            except Exception as e:
+                logger.warning("unread counter unavailable: %s", e)
+        return value
+
+    def incr(self, user_ids, amount=1):
+        """بعد از ساخت نوتیفیکیشن‌ها؛ یک رفت و برگشت برای همه کاربران"""
+        keys = [self.key(user_id) for user_id in dict.fromkeys(user_ids)]
+        try:
+            self.get_backend().incr_many(keys, amount)
+        except Exception as e:
+            logger.warning("unread counter unavailable: %s", e)
+
+    def decr(self, user_id, amount):
+        try:
+            value = self.get_backend().decr(self.key(user_id), amount)
+        except Exception as e:
+            logger.warning("unread counter unavailable: %s", e)
+            value = None
+        return value if value is not None else self.count(user_id)
+
+    def invalidate(self, user_id):
+        try:
+            self.get_backend().delete(self.key(user_id))
+        except Exception as e:
+            logger.warning("unread counter unavailable: %s", e)
+
+    def mark_read(self, user_id, ids):
+        """خواندن نوتیفیکیشن‌های مشخص با یک UPDATE؛ خروجی: (تعداد به‌روز شده، تعداد خوانده نشده)"""
+        updated = Notification.objects.filter(user_id=user_id, id__in=ids, is_read=False).update(is_read=True)
+        unread = self.decr(user_id, updated) if updated else self.count(user_id)
+        if updated:
+            push_unread_count(user_id, unread)
+        return updated, unread
+
+    def mark_all_read(self, user_id):
+        """
+        خواندن همه با یک UPDATE و شمارش دوباره از دیتابیس (نه صفر کردن شمارنده): نوتیفیکیشنی که بین UPDATE
+        و نوشتن شمارنده ساخته بشه از دست نمیره و incr همزمان با شمارش، seed رو باطل می‌کنه.
+        """
+        updated = Notification.objects.filter(user_id=user_id, is_read=False).update(is_read=True)
+        self.invalidate(user_id)
+        unread = self.count(user_id)
+        if updated:
+            push_unread_count(user_id, unread)
+        return updated, unread
+
+
+def push_unread_count(user_id, count):
+    from communications.notifications import push, user_group
+    messages = [(user_group(user_id), {"type": "unread_count", "count": count})]
+    transaction.on_commit(lambda: push(messages))
+
+
+unread_counter = UnreadCounter()
@@ -14,4 +14,10 @@ urlpatterns = [
          name='customer-notifications'),
     path('customer/notifications/<int:pk>', views.CustomerPanelNotificationDetail.as_view(),
          name='customer-notifications'),
+    path('customer/notifications/unread-count/', views.CustomerPanelNotificationUnreadCount.as_view(),
+         name='customer-notifications-unread-count'),
+    path('customer/notifications/mark-all-read/', views.CustomerPanelNotificationMarkAllRead.as_view(),
+         name='customer-notifications-mark-all-read'),
+    path('customer/notifications/mark-read/', views.CustomerPanelNotificationMarkRead.as_view(),
+         name='customer-notifications-mark-read'),
 ]
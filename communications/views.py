@@ -1,88 +1,77 @@
-from django.db.models import Q
 from rest_framework import generics
 from rest_framework.exceptions import NotFound
-from django.utils.timezone import now
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 from accounts.auth import CustomJWTAuthentication
+from accounts.mixins import NotFoundOnEmptyListMixin
+from accounts.pagination import IdCursorPagination
+from accounts.principal import get_principal
 from gyms.models import MemberShip
 from communications.models import Announcement, Ticket, Notification
 from communications.serializers import AnnouncementSerializer, CustomerPanelTicketSerializer, \
-    CustomerPanelNotificationSerializer
+    CustomerPanelNotificationSerializer, CustomerPanelNotificationMarkReadSerializer
+from communications.unread import unread_counter
 
 
 # Create your views here.
-class CustomerPanelAnnouncementGym(generics.ListAPIView):
+class CustomerPanelAnnouncementGym(NotFoundOnEmptyListMixin, generics.ListAPIView):
     serializer_class = AnnouncementSerializer
     permission_classes = [IsAuthenticated]
     authentication_classes = [CustomJWTAuthentication]
+    empty_list_message = "هیچ اطلاعیه باشگاهی برای این کاربر یافت نشد."
 
     def get_queryset(self):
-        user = self.request.user
-        customer = getattr(user, "customer", None)
-        if not customer:
+        principal = get_principal(self.request.user)
+        if principal is None or not principal.is_customer:
             raise NotFound("مشتری یافت نشد یا کاربر مشتری نیست.")
 
-        active_memberships = MemberShip.objects.filter(
-            customer=customer,
-            session_left__gt=0,
-        ).filter(
-            Q(validity_date__isnull=True) | Q(validity_date__gte=now().date())
-        )
+        # همون تعریف «فعال» بقیه endpoint ها: تاریخ اعتبار دارد، نگذشته و جلسه باقی مانده
+        active_memberships = MemberShip.objects.active().filter(customer_id=principal.customer_id)
 
         gyms_with_active_memberships = active_memberships.values_list("gym_id", flat=True)
 
-        qs = Announcement.objects.filter(
+        return AnnouncementSerializer.setup_eager_loading(Announcement.objects.filter(
             type="gym",
             gym_id__in=gyms_with_active_memberships
-        ).order_by("-id")
-
-        if not qs.exists():
-            raise NotFound("هیچ اطلاعیه باشگاهی برای این کاربر یافت نشد.")
-
-        return qs
+        ).order_by("-id"))
 
 
-class CustomerPanelAnnouncementPlatform(generics.ListAPIView):
+class CustomerPanelAnnouncementPlatform(NotFoundOnEmptyListMixin, generics.ListAPIView):
     serializer_class = AnnouncementSerializer
     permission_classes = [IsAuthenticated]
     authentication_classes = [CustomJWTAuthentication]
+    empty_list_message = "هیچ اطلاعیه پلتفرمی یافت نشد."
 
     def get_queryset(self):
-        qs = Announcement.objects.filter(
+        return AnnouncementSerializer.setup_eager_loading(Announcement.objects.filter(
             type="platform"
-        ).order_by("-id")
+        ).order_by("-id"))
 
-        if not qs.exists():
-            raise NotFound("هیچ اطلاعیه پلتفرمی یافت نشد.")
 
-        return qs
-
-
-class CustomerPanelTicketListCreate(generics.ListCreateAPIView):
+class CustomerPanelTicketListCreate(NotFoundOnEmptyListMixin, generics.ListCreateAPIView):
     serializer_class = CustomerPanelTicketSerializer
     permission_classes = [IsAuthenticated]
     authentication_classes = [CustomJWTAuthentication]
+    pagination_class = IdCursorPagination
+    cursor_ordering = ('-send_time', '-id')
+    empty_list_message = "هیچ تیکتی برای این کاربر یافت نشد."
 
     def get_queryset(self):
         user = self.request.user
-        qs = Ticket.objects.filter(sender=user, replied_to__isnull=True).order_by("-send_time")
         # فقط تیکت‌های اصلی کاربر (نه ریپلای‌هایی که خودش زده) رو میاره
-        if not qs.exists():
-            raise NotFound("هیچ تیکتی برای این کاربر یافت نشد.")
-        return qs
+        return CustomerPanelTicketSerializer.setup_eager_loading(
+            Ticket.objects.filter(sender=user, replied_to__isnull=True).order_by("-send_time"))
 
 
-class CustomerPanelNotificationList(generics.ListAPIView):
+class CustomerPanelNotificationList(NotFoundOnEmptyListMixin, generics.ListAPIView):
     serializer_class = CustomerPanelNotificationSerializer
     permission_classes = [IsAuthenticated]
     authentication_classes = [CustomJWTAuthentication]
+    pagination_class = IdCursorPagination
+    empty_list_message = "هیچ نوتیفیکیشنی برای این کاربر یافت نشد."
 
     def get_queryset(self):
-        user = self.request.user
-        qs = Notification.objects.filter(user=user).order_by("-id")
-        if not qs.exists():
-            raise NotFound("هیچ نوتیفیکیشنی برای این کاربر یافت نشد.")
-        return qs
+        return Notification.objects.filter(user=self.request.user).order_by("-id")
 
 
 class CustomerPanelNotificationDetail(generics.RetrieveAPIView):
@@ -96,6 +85,41 @@ class CustomerPanelNotificationDetail(generics.RetrieveAPIView):
     def get_object(self):
         obj = super().get_object()
         if not obj.is_read:
+            unread_counter.mark_read(self.request.user.id, [obj.id])
             obj.is_read = True
-            obj.save(update_fields=["is_read"])
         return obj
+
+
+class CustomerPanelNotificationUnreadCount(generics.GenericAPIView):
+    """تعداد نوتیفیکیشن‌های خوانده نشده از شمارنده Redis (بدون کوئری دیتابیس)"""
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [CustomJWTAuthentication]
+
+    def get(self, request, *args, **kwargs):
+        return Response({"unread_count": unread_counter.count(request.user.id)})
+
+
+class CustomerPanelNotificationMarkAllRead(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [CustomJWTAuthentication]
+
+    def post(self, request, *args, **kwargs):
+        updated, unread = unread_counter.mark_all_read(request.user.id)
+        return Response({"updated": updated, "unread_count": unread})
+
+
+class CustomerPanelNotificationMarkRead(generics.GenericAPIView):
+    """
+{
+    "ids": [12, 13, 20]
+}
+    """
+    serializer_class = CustomerPanelNotificationMarkReadSerializer
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [CustomJWTAuthentication]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        updated, unread = unread_counter.mark_read(request.user.id, serializer.validated_data['ids'])
+        return Response({"updated": updated, "unread_count": unread})
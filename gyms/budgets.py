@@ -0,0 +1,56 @@
+"""
+بودجه کوئری مسیرهای GET اپ gyms؛ در gyms.tests بررسی و در گزارش benchmark_endpoints نوشته میشه.
+ساختار جدول‌ها و روش اضافه کردن مسیر جدید مثل accounts.budgets است.
+"""
+from accounts.benchmark import DEFAULT_P95_BUDGET_MS
+from gyms.models import Gym, GymBanner, MemberShip, MemberShipType
+
+ENDPOINT_BUDGETS = {
+    # gyms + images + banners + membership types + my memberships (مستقل از اندازه صفحه)
+    'gyms/customer/gyms/': (6, DEFAULT_P95_BUDGET_MS),
+    'gyms/customer/gyms/<int:pk>/': (7, DEFAULT_P95_BUDGET_MS),
+    # prefilter مستطیلی روی gym_lat_lng_idx + مرتب‌سازی haversine؛ همان prefetch های لیست
+    'gyms/customer/gyms/nearby/': (6, DEFAULT_P95_BUDGET_MS),
+    # جنسیت مشتری (وقتی gender داده نشده) + متن، امکانات، شهر و بازه قیمت در یک کوئری (بدون COUNT)
+    'gyms/customer/gyms/search/': (2, DEFAULT_P95_BUDGET_MS),
+    'gyms/customer/gyms/signed/<int:pk>/': (7, DEFAULT_P95_BUDGET_MS),
+    # لیستی که قبلا exists() جدا می‌زد؛ حالا فقط خود صفحه
+    'gyms/customer/gyms/signed/': (1, DEFAULT_P95_BUDGET_MS),
+    # COUNT صفحه‌بندی limit/offset + باشگاه‌ها با آمار (select_related) + تصاویر
+    'gyms/gym-panel/gyms/': (3, DEFAULT_P95_BUDGET_MS),
+    'gyms/gym-panel/gyms/<int:pk>/': (2, DEFAULT_P95_BUDGET_MS),
+    # از شمارنده Redis؛ فقط درخواست اول (گرم کردن) شمارش دیتابیسی داره
+    'gyms/gym-panel/occupancy/': (0, DEFAULT_P95_BUDGET_MS),
+    # COUNT صفحه‌بندی limit/offset + بنرها با باشگاه (select_related)
+    'gyms/gym-panel/banner/': (2, DEFAULT_P95_BUDGET_MS),
+    # صف پذیرش با مشتری، کمد و ممبرشیپ (select_related) روی inout_gym_open_idx
+    'gyms/gym-panel/check-in/': (1, DEFAULT_P95_BUDGET_MS),
+}
+
+PK_RESOLVERS = {
+    'gyms/customer/gyms/<int:pk>/':
+        lambda ctx: MemberShip.objects.filter(customer__user=ctx['customer_user']).values_list(
+            'gym_id', flat=True).first(),
+    'gyms/customer/gyms/signed/<int:pk>/':
+        lambda ctx: MemberShip.objects.filter(customer__user=ctx['customer_user']).values_list(
+            'gym_id', flat=True).first(),
+    'gyms/customer/memberships/<int:pk>/':
+        lambda ctx: MemberShip.objects.filter(customer__user=ctx['customer_user']).values_list(
+            'id', flat=True).first(),
+    'gyms/gym-panel/gyms/<int:pk>/':
+        lambda ctx: Gym.objects.filter(manager__user=ctx['manager_user']).values_list('id', flat=True).first(),
+    'gyms/gym-panel/membership-types/<int:pk>/':
+        lambda ctx: MemberShipType.objects.filter(gyms__manager__user=ctx['manager_user']).values_list(
+            'id', flat=True).first(),
+    'gyms/gym-panel/banner/<int:pk>/':
+        lambda ctx: GymBanner.objects.filter(gym__manager__user=ctx['manager_user']).values_list(
+            'id', flat=True).first(),
+}
+
+# پارامترهای اجباری query string برای مسیرهایی که بدون آن 400 می‌دن
+ROUTE_QUERIES = {
+    'gyms/customer/gyms/nearby/': 'lat=35.6&lng=51.4&radius=5',
+    'gyms/customer/gyms/search/': 'q=gym&facilities=استخر,سونا&city=تهران&min_price=500000&max_price=3000000',
+}
+
+EXPECTED_STATUS = {}
@@ -0,0 +1,177 @@
+"""
+صف پذیرش باشگاه (میز منشی): درخواست‌های ورود در انتظار تایید، تایید/رد گروهی و خروج گروهی.
+هر عملیات گروهی ردیف‌های InOut رو قفل می‌کنه و با یک UPDATE اعمال میشه؛ کمد خالی با
+select_for_update(skip_locked) رزرو میشه تا دو میز همزمان یک کمد رو به دو نفر ندن.
+UPDATE گروهی سیگنال نمی‌فرسته، پس آمار باشگاه (ورودهای امروز و اعضای فعال) و شمارنده occupancy
+برای هر باشگاه یک بار با تعداد به‌روز میشن و تغییر صف به گروه کارکنان باشگاه (gym_{id}_staff) push میشه تا میز پذیرش polling نکنه.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.utils.timezone import now
+
+from gyms.models import Closet, Gym, InOut, MemberShip
+from gyms.occupancy import inside_inouts, occupancy
+from gyms.serializers import GymPanelCheckInEntrySerializer
+from gyms.stats import record_entries, refresh_active_members
+
+QUEUE_REQUESTED = 'requested'
+QUEUE_CONFIRMED = 'confirmed'
+QUEUE_REJECTED = 'rejected'
+QUEUE_CHECKED_OUT = 'checked_out'
+
+
+def pending_inouts():
+    """درخواست‌های ورودی که هنوز تایید یا رد نشدن (از partial index inout_gym_open_idx)"""
+    return InOut.objects.filter(out_time__isnull=True, enter_time__isnull=True, confirm_in=False)
+
+
+def staffed_gyms(user_id, gym_ids):
+    """
+    از gym_ids فقط باشگاه‌هایی که کاربر همین الان در دیتابیس مدیر یا منشی اون‌هاست.
+    claim باشگاه‌های توکن تا انقضای access token معتبره و بعد از عوض شدن مدیر باشگاه نباید کافی باشه.
+    """
+    return Gym.objects.filter(id__in=gym_ids).filter(
+        Q(manager__user_id=user_id) | Q(gym_secretary__user_id=user_id)
+    ).values('id')
+
+
+def _lock(queryset, user_id, gym_ids, ids):
+    # بررسی دسترسی در همان کوئری قفل و داخل تراکنش انجام میشه
+    return list(
+        queryset.select_for_update(of=('self',))
+        .filter(id__in=ids, gym_id__in=staffed_gyms(user_id, gym_ids))
+        .order_by('id')
+        .values('id', 'gym_id', 'closet_id', 'closet__number', 'subscription_id')
+    )
+
+
+def _by_gym(entries):
+    groups = defaultdict(list)
+    for entry in entries:
+        groups[entry['gym_id']].append(entry)
+    return groups
+
+
+def allocate_closets(gym_id, count):
+    """
+    count کمد در دسترس که به ورود باز دیگه‌ای داده نشدن: [(id, number)].
+    کمدهای قفل شده توسط تراکنش همزمان رد میشن (skip_locked) و تا پایان تراکنش رزرو می‌مونن.
+    """
+    in_use = InOut.objects.filter(gym_id=gym_id, out_time__isnull=True, closet__isnull=False).values('closet_id')
+    return list(
+        Closet.objects.select_for_update(skip_locked=True)
+        .filter(gym_id=gym_id, status='available')
+        .exclude(id__in=in_use)
+        .order_by('id')
+        .values_list('id', 'number')[:count]
+    )
+
+
+def confirm_entries(user_id, gym_ids, ids, assign_closets=True):
+    """
+    تایید گروهی درخواست‌های ورود؛ به درخواست‌های بدون کمد (اگر کمد خالی باشه) کمد داده میشه.
+    خروجی: {'ids': شناسه‌های تایید شده, 'closets': [{'id', 'closet', 'number'}]}
+    """
+    entered_at = now()
+    with transaction.atomic():
+        entries = _lock(pending_inouts(), user_id, gym_ids, ids)
+        if not entries:
+            return {'ids': [], 'closets': []}
+
+        assigned = {}
+        if assign_closets:
+            for gym_id, group in _by_gym(entries).items():
+                without_closet = [entry for entry in group if entry['closet_id'] is None]
+                if without_closet:
+                    free = allocate_closets(gym_id, len(without_closet))
+                    assigned.update({entry['id']: closet for entry, closet in zip(without_closet, free)})
+
+        entry_ids = [entry['id'] for entry in entries]
+        values = {'confirm_in': True, 'enter_time': entered_at, 'updated_at': entered_at}
+        if assigned:
+            values['closet_id'] = Case(
+                *[When(id=entry_id, then=Value(closet_id)) for entry_id, (closet_id, _) in assigned.items()],
+                default=F('closet_id'), output_field=IntegerField(),
+            )
+        InOut.objects.filter(id__in=entry_ids).update(**values)
+
+        closets = defaultdict(list)
+        for entry in entries:
+            closet_id, number = assigned.get(entry['id'], (entry['closet_id'], entry['closet__number']))
+            if closet_id is not None:
+                closets[entry['gym_id']].append({'id': entry['id'], 'closet': closet_id, 'number': number})
+
+        for gym_id, group in _by_gym(entries).items():
+            record_entries(gym_id, len(group))
+            _on_commit(gym_id, QUEUE_CONFIRMED, group, occupancy_delta=len(group), closets=closets[gym_id])
+
+    return {'ids': entry_ids, 'closets': [closet for group in closets.values() for closet in group]}
+
+
+def reject_entries(user_id, gym_ids, ids):
+    """رد گروهی درخواست‌های ورود؛ درخواست بسته میشه (out_time بدون enter_time) و جلسه ممبرشیپ برمی‌گرده"""
+    rejected_at = now()
+    with transaction.atomic():
+        entries = _lock(pending_inouts(), user_id, gym_ids, ids)
+        if not entries:
+            return {'ids': [], 'closets': []}
+
+        entry_ids = [entry['id'] for entry in entries]
+        InOut.objects.filter(id__in=entry_ids).update(out_time=rejected_at, updated_at=rejected_at)
+        # هر ممبرشیپ حداکثر یک درخواست باز داره؛ با جلسه برگشتی active_until دوباره validity_date میشه
+        subscription_ids = [entry['subscription_id'] for entry in entries if entry['subscription_id']]
+        if subscription_ids:
+            MemberShip.objects.filter(id__in=subscription_ids).update(
+                session_left=F('session_left') + 1, active_until=F('validity_date'),
+            )
+
+        for gym_id, group in _by_gym(entries).items():
+            _on_commit(gym_id, QUEUE_REJECTED, group,
+                       refresh_members=any(entry['subscription_id'] for entry in group))
+
+    return {'ids': entry_ids, 'closets': []}
+
+
+def checkout_entries(user_id, gym_ids, ids):
+    """خروج گروهی افراد داخل باشگاه؛ کمدشون با بسته شدن ورود آزاد میشه"""
+    exited_at = now()
+    with transaction.atomic():
+        entries = _lock(inside_inouts(), user_id, gym_ids, ids)
+        if not entries:
+            return {'ids': [], 'closets': []}
+
+        entry_ids = [entry['id'] for entry in entries]
+        InOut.objects.filter(id__in=entry_ids).update(out_time=exited_at, updated_at=exited_at)
+
+        for gym_id, group in _by_gym(entries).items():
+            _on_commit(gym_id, QUEUE_CHECKED_OUT, group, occupancy_delta=-len(group))
+
+    return {'ids': entry_ids, 'closets': []}
+
+
+def _on_commit(gym_id, action, entries, occupancy_delta=0, refresh_members=False, closets=None):
+    ids = [entry['id'] for entry in entries]
+
+    def apply():
+        if occupancy_delta:
+            occupancy.adjust(gym_id, occupancy_delta)
+        if refresh_members:
+            refresh_active_members(gym_id)
+        event = {'ids': ids}
+        if closets is not None:
+            event['closets'] = closets
+        push_queue(gym_id, action, **event)
+
+    transaction.on_commit(apply)
+
+
+def push_queue(gym_id, action, **data):
+    from communications.notifications import gym_staff_group, push
+    push([(gym_staff_group(gym_id), {"type": "checkin_queue", "gym_id": gym_id, "action": action, **data})])
+
+
+def push_requested(inout):
+    """درخواست ورود جدید با همه فیلدهای صف تا میز پذیرش بدون درخواست دوباره اون رو نشون بده"""
+    push_queue(inout.gym_id, QUEUE_REQUESTED, ids=[inout.id], entries=[GymPanelCheckInEntrySerializer(inout).data])
@@ -0,0 +1,61 @@
+"""
+جستجوی باشگاه‌های نزدیک بدون PostGIS.
+مختصات از فیلد متنی location ("lat,lng") در ستون‌های latitude/longitude نگه داشته میشه.
+جستجو اول با یک bounding box روی ایندکس (latitude, longitude) تعداد ردیف‌ها رو کم می‌کنه
+و بعد فاصله دقیق با فرمول haversine فقط برای همین ردیف‌ها حساب و مرتب میشه.
+"""
+import math
+
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+
+
+def parse_location(location):
+    """'35.7,51.4' → (35.7, 51.4)؛ مقدار نامعتبر یا خالی → (None, None)"""
+    if not location:
+        return None, None
+    parts = location.replace('،', ',').split(',')
+    if len(parts) != 2:
+        return None, None
+    try:
+        latitude, longitude = float(parts[0]), float(parts[1])
+    except ValueError:
+        return None, None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None, None
+    return latitude, longitude
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """(min_lat, max_lat, min_lng, max_lng) مستطیلی که دایره به شعاع radius_km داخلش جا میشه"""
+    lat_delta = radius_km / KM_PER_DEGREE
+    cos_lat = math.cos(math.radians(latitude))
+    lng_delta = 180.0 if cos_lat < 1e-6 else min(radius_km / (KM_PER_DEGREE * cos_lat), 180.0)
+    return latitude - lat_delta, latitude + lat_delta, longitude - lng_delta, longitude + lng_delta
+
+
+def haversine_km(latitude, longitude):
+    """عبارت دیتابیسی فاصله (کیلومتر) از نقطه داده شده تا مختصات هر ردیف"""
+    lat = Value(math.radians(latitude), output_field=FloatField())
+    lng = Value(math.radians(longitude), output_field=FloatField())
+    d_lat = (Radians(F('latitude')) - lat) / 2
+    d_lng = (Radians(F('longitude')) - lng) / 2
+    a = Power(Sin(d_lat), 2) + Cos(lat) * Cos(Radians(F('latitude'))) * Power(Sin(d_lng), 2)
+    return 2 * EARTH_RADIUS_KM * ASin(Sqrt(a))
+
+
+def nearby(queryset, latitude, longitude, radius_km):
+    """باشگاه‌های داخل شعاع به ترتیب فاصله؛ فاصله در annotation distance"""
+    min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, radius_km)
+    queryset = queryset.filter(latitude__range=(min_lat, max_lat))
+    if max_lng - min_lng < 360:
+        queryset = queryset.filter(longitude__range=(min_lng, max_lng))
+    return (
+        queryset
+        .annotate(distance=haversine_km(latitude, longitude))
+        .filter(distance__lte=radius_km)
+        .order_by('distance', 'id')
+    )
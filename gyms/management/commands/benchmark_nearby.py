@@ -0,0 +1,85 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from accounts.models import User, GymManager
+from gyms.geo import haversine_km, nearby
+from gyms.models import Gym
+
+# محدوده تقریبی ایران و چند شهر پرجمعیت که بیشتر باشگاه‌ها اطرافشون هستن
+IRAN_BOUNDS = (25.0, 39.8, 44.0, 63.3)
+CITIES = [(35.69, 51.39), (32.65, 51.67), (36.30, 59.60), (29.59, 52.58), (38.08, 46.29), (31.32, 48.67)]
+
+
+class Command(BaseCommand):
+    help = "جستجوی باشگاه‌های نزدیک روی n باشگاه: bounding box + haversine در مقابل haversine روی کل جدول"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--gyms', type=int, default=50000)
+        parser.add_argument('--queries', type=int, default=50)
+        parser.add_argument('--radius', type=float, default=5)
+        parser.add_argument('--limit', type=int, default=20, help="اندازه صفحه")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def seed(self, count, rnd):
+        user = User.objects.create(phone='09000000000', full_name='nearby bench')
+        manager = GymManager.objects.create(user=user)
+        min_lat, max_lat, min_lng, max_lng = IRAN_BOUNDS
+        gyms = []
+        for i in range(count):
+            if rnd.random() < 0.8:
+                city_lat, city_lng = rnd.choice(CITIES)
+                lat, lng = city_lat + rnd.gauss(0, 0.15), city_lng + rnd.gauss(0, 0.15)
+            else:
+                lat, lng = rnd.uniform(min_lat, max_lat), rnd.uniform(min_lng, max_lng)
+            lat, lng = round(lat, 6), round(lng, 6)
+            gyms.append(Gym(
+                title=f"Gym {i}", manager=manager, address='', location=f"{lat},{lng}", latitude=lat, longitude=lng,
+                main_img='gym_img/main_imgs/download_1.png', phone='', headline_phone='', gender='both',
+                commission_type='gym', facilities='', description='', work_hours_per_day='', work_days_per_week='',
+                is_active=True,
+            ))
+        Gym.objects.bulk_create(gyms, batch_size=2000)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE gyms_gym')
+
+    def measure(self, label, build, points, limit):
+        timings = []
+        found = []
+        for lat, lng in points:
+            started = time.perf_counter()
+            rows = list(build(lat, lng).values_list('id', 'distance')[:limit])
+            timings.append((time.perf_counter() - started) * 1000)
+            found.append(rows)
+        p95 = statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+        self.stdout.write(f"{label:<14} p50 {statistics.median(timings):8.2f}ms  p95 {p95:8.2f}ms")
+        return found
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options['seed'])
+        radius = options['radius']
+        with transaction.atomic():
+            started = time.perf_counter()
+            self.seed(options['gyms'], rnd)
+            self.stdout.write(f"seeded {options['gyms']} gyms in {time.perf_counter() - started:.1f}s")
+
+            points = [(lat + rnd.gauss(0, 0.05), lng + rnd.gauss(0, 0.05))
+                      for lat, lng in (rnd.choice(CITIES) for _ in range(options['queries']))]
+            queryset = Gym.objects.filter(is_active=True)
+
+            bbox = self.measure('bbox+haversine', lambda lat, lng: nearby(queryset, lat, lng, radius),
+                                points, options['limit'])
+            full = self.measure(
+                'full scan',
+                lambda lat, lng: queryset.annotate(distance=haversine_km(lat, lng))
+                .filter(distance__lte=radius).order_by('distance', 'id'),
+                points, options['limit'])
+
+            same = sum(a == b for a, b in zip(bbox, full))
+            self.stdout.write(f"identical results: {same}/{len(points)}, "
+                              f"avg hits per page: {statistics.mean(len(rows) for rows in bbox):.1f}")
+            transaction.set_rollback(True)
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from gyms.occupancy import occupancy
+
+
+class Command(BaseCommand):
+    help = (
+        "شمارنده‌های زنده تعداد افراد داخل باشگاه (Redis) رو با InOut های باز یکی می‌کنه و تغییرات رو push می‌کنه. "
+        "با --interval به صورت دوره‌ای اجرا میشه؛ بدون آن یک بار (برای cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int, default=0, help="ثانیه بین دو اجرا؛ 0 یعنی یک بار")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            changed = occupancy.reconcile(batch_size=options['batch_size'])
+            self.stdout.write(
+                f"reconciled in {time.perf_counter() - started:.2f}s, {len(changed)} counter(s) corrected"
+            )
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from gyms.stats import refresh_gym_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "محاسبه دوباره آمار همه باشگاه‌ها (امتیاز، اعضای فعال، داخل باشگاه، ورود امروز) به صورت دسته‌ای. "
+        "برای اعمال انقضای ممبرشیپ‌ها و صفر شدن ورودهای روز، روزانه (مثلا با cron) اجرا بشه."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--gym', type=int, nargs='*', help="فقط این باشگاه‌ها")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        updated = refresh_gym_stats(gym_ids=options['gym'] or None, batch_size=options['batch_size'])
+        self.stdout.write(f"refreshed stats of {updated} gyms in {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,99 @@
+import statistics
+import threading
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, DatabaseError
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from accounts.models import User, Customer, GymManager
+from gyms.models import Gym, MemberShipType, MemberShip
+from gyms.services import request_gym_entry, open_inouts
+
+
+class Command(BaseCommand):
+    help = (
+        "تست استرس درخواست ورود: در هر دور چند thread همزمان برای یک مشتری و یک باشگاه درخواست ورود میدن. "
+        "در هر دور باید دقیقا یک ورود باز ساخته بشه و دقیقا یک جلسه کم بشه. "
+        "دیتای تست commit میشه (thread ها کانکشن جدا دارن) و در پایان پاک میشه."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--rounds', type=int, default=20)
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite':
+            self.stdout.write("warning: sqlite از select_for_update پشتیبانی نمی‌کنه؛ قفل در سطح کل دیتابیس است.")
+
+        threads, rounds = options['threads'], options['rounds']
+        manager_user = User.objects.create(phone='09000000001', full_name='stress manager')
+        customer_user = User.objects.create(phone='09000000002', full_name='stress customer')
+        try:
+            manager = GymManager.objects.create(user=manager_user)
+            customer = Customer.objects.create(user=customer_user, gender='male')
+            gym = Gym.objects.create(title='stress gym', manager=manager, gender='both')
+            membership_type = MemberShipType.objects.create(title='stress', gyms=gym, days=30, price=0)
+            membership = MemberShip.objects.create(
+                customer=customer, gym=gym, type=membership_type, start_date=timezone.now().date(),
+                validity_date=timezone.now().date() + timedelta(days=30), session_left=rounds, days=30,
+            )
+            failures = self.run_rounds(customer, gym, membership, threads, rounds)
+        finally:
+            customer_user.delete()
+            manager_user.delete()
+
+        if failures:
+            raise CommandError(f"{failures} round(s) broke the single-entry invariant")
+        self.stdout.write(self.style.SUCCESS("all rounds created exactly one entry and consumed exactly one session"))
+
+    def run_rounds(self, customer, gym, membership, threads, rounds):
+        failures = 0
+        latencies = []
+        for round_number in range(rounds):
+            barrier = threading.Barrier(threads)
+            outcomes = []
+            lock = threading.Lock()
+
+            def worker():
+                barrier.wait()
+                started = time.perf_counter()
+                try:
+                    request_gym_entry(customer, gym)
+                    outcome = 'created'
+                except ValidationError:
+                    outcome = 'rejected'
+                except DatabaseError:
+                    outcome = 'db_error'
+                finally:
+                    connection.close()
+                with lock:
+                    outcomes.append(outcome)
+                    latencies.append((time.perf_counter() - started) * 1000)
+
+            workers = [threading.Thread(target=worker) for _ in range(threads)]
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+
+            membership.refresh_from_db()
+            created = outcomes.count('created')
+            open_count = open_inouts(customer.id, gym.id).count()
+            expected_sessions = rounds - round_number - 1
+            ok = created == 1 and open_count == 1 and membership.session_left == expected_sessions
+            failures += not ok
+            self.stdout.write(
+                f"{'ok  ' if ok else 'FAIL'} round {round_number + 1}: created={created} "
+                f"rejected={outcomes.count('rejected')} db_errors={outcomes.count('db_error')} "
+                f"open={open_count} session_left={membership.session_left}"
+            )
+            # خروج از باشگاه برای دور بعد
+            open_inouts(customer.id, gym.id).update(out_time=timezone.now())
+
+        if latencies:
+            p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else latencies[0]
+            self.stdout.write(f"p50={statistics.median(latencies):.2f}ms p95={p95:.2f}ms")
+        return failures
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-17 17:15
+
+from django.db import migrations, models
+
+
+def fill_active_until(apps, schema_editor):
+    MemberShip = apps.get_model('gyms', 'MemberShip')
+    MemberShip.objects.filter(session_left__gt=0).update(active_until=models.F('validity_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gyms', '0011_gymsecretary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='membership',
+            name='active_until',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.RunPython(fill_active_until, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-17 17:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gyms', '0012_membership_active_until'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inout',
+            index=models.Index(condition=models.Q(('out_time__isnull', True)), fields=['customer', 'gym'], name='inout_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='membership',
+            index=models.Index(fields=['customer', 'gym', 'active_until'], name='membership_cust_gym_active_idx'),
+        ),
+    ]
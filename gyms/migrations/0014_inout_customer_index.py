@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 17:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0012_user_role_version'),
+        ('gyms', '0013_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inout',
+            index=models.Index(fields=['customer', '-id'], name='inout_customer_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-17 17:31
+
+from django.db import migrations, models
+
+from gyms.geo import parse_location
+
+
+def fill_coordinates(apps, schema_editor):
+    Gym = apps.get_model('gyms', 'Gym')
+    gyms = list(Gym.objects.exclude(location__isnull=True).exclude(location='').only('id', 'location'))
+    for gym in gyms:
+        gym.latitude, gym.longitude = parse_location(gym.location)
+    Gym.objects.bulk_update(gyms, ['latitude', 'longitude'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gyms', '0014_inout_customer_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gym',
+            name='latitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='gym',
+            name='longitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='gym',
+            index=models.Index(fields=['latitude', 'longitude'], name='gym_lat_lng_idx'),
+        ),
+        migrations.RunPython(fill_coordinates, migrations.RunPython.noop),
+    ]
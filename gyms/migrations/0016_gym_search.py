@@ -0,0 +1,135 @@
+# Generated by Django 5.2.6 on 2026-10-17 17:34
+
+import re
+
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+# کپی ثابت از gyms.search در زمان این migration؛ تغییرات بعدی search.py نباید داده این migration رو عوض کنه
+PERSIAN_CHAR_MAP = str.maketrans({
+    'ي': 'ی', 'ى': 'ی', 'ئ': 'ی',  # ی عربی
+    'ك': 'ک',  # ک عربی
+    'ة': 'ه', 'ۀ': 'ه',  # ة و ۀ
+    'أ': 'ا', 'إ': 'ا', 'ٱ': 'ا', 'ؤ': 'و',
+    '‌': ' ', '‎': ' ', '‏': ' ',  # نیم‌فاصله و علامت‌های جهت
+    'ـ': '',  # کشیده
+    **{chr(0x06F0 + i): str(i) for i in range(10)},
+    **{chr(0x0660 + i): str(i) for i in range(10)},
+})
+DIACRITICS_RE = re.compile('[ً-ٰٟ]')
+NON_WORD_RE = re.compile(r'[^\w]+')
+FACILITY_SEPARATORS_RE = re.compile(r'[,،;؛\n]+')
+
+
+def normalize_persian(text):
+    """یکسان‌سازی ی/ک عربی، حذف اعراب و کشیده، نیم‌فاصله → فاصله و ارقام فارسی/عربی → لاتین"""
+    if not text:
+        return ''
+    text = DIACRITICS_RE.sub('', text.translate(PERSIAN_CHAR_MAP)).lower()
+    return ' '.join(NON_WORD_RE.sub(' ', text).split())
+
+
+def parse_facility_tags(facilities):
+    """'استخر، سونا, Parking' → ['استخر', 'سونا', 'parking']"""
+    tags = (normalize_persian(part) for part in FACILITY_SEPARATORS_RE.split(facilities or ''))
+    return list(dict.fromkeys(tag[:100] for tag in tags if tag))
+
+
+def build_search_text(title, address, description):
+    return ' '.join(filter(None, (normalize_persian(title), normalize_persian(address), normalize_persian(description))))
+
+
+# ایندکس‌های GIN فقط روی PostgreSQL ساخته میشن؛ روی بقیه دیتابیس‌ها جستجو روی search_text انجام میشه
+POSTGRES_INDEXES = (
+    ('gym_search_vector_idx', 'CREATE INDEX IF NOT EXISTS gym_search_vector_idx ON gyms_gym USING gin (search_vector)'),
+    ('gym_search_trgm_idx',
+     'CREATE INDEX IF NOT EXISTS gym_search_trgm_idx ON gyms_gym USING gin (search_text gin_trgm_ops)'),
+)
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for _, sql in POSTGRES_INDEXES:
+            schema_editor.execute(sql)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for name, _ in POSTGRES_INDEXES:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+def fill_search_fields(apps, schema_editor):
+    Gym = apps.get_model('gyms', 'Gym')
+    GymFacility = apps.get_model('gyms', 'GymFacility')
+    gyms = list(Gym.objects.only('id', 'title', 'address', 'description', 'facilities', 'city'))
+    for gym in gyms:
+        gym.search_text = build_search_text(gym.title, gym.address, gym.description)
+        gym.city_search = normalize_persian(gym.city)
+    Gym.objects.bulk_update(gyms, ['search_text', 'city_search'], batch_size=1000)
+    GymFacility.objects.bulk_create(
+        [GymFacility(gym_id=gym.id, tag=tag) for gym in gyms for tag in parse_facility_tags(gym.facilities)],
+        batch_size=1000,
+    )
+    if schema_editor.connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchVector
+        Gym.objects.update(search_vector=SearchVector('search_text', config='simple'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gyms', '0015_gym_coordinates'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.CreateModel(
+            name='GymFacility',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tag', models.CharField(max_length=100)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='gym',
+            name='city',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='gym',
+            name='city_search',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='gym',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='gym',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='gym',
+            index=models.Index(fields=['city_search', 'gender'], name='gym_city_search_gender_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='membershiptype',
+            index=models.Index(fields=['gyms', 'price'], name='membership_type_gym_price_idx'),
+        ),
+        migrations.AddField(
+            model_name='gymfacility',
+            name='gym',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='facility_tags', to='gyms.gym'),
+        ),
+        migrations.AddConstraint(
+            model_name='gymfacility',
+            constraint=models.UniqueConstraint(fields=('tag', 'gym'), name='gym_facility_tag_gym_uniq'),
+        ),
+        migrations.RunPython(fill_search_fields, migrations.RunPython.noop),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.6 on 2026-10-17 17:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+
+def fill_gym_stats(apps, schema_editor):
+    Gym = apps.get_model('gyms', 'Gym')
+    GymStats = apps.get_model('gyms', 'GymStats')
+    Rate = apps.get_model('gyms', 'Rate')
+    MemberShip = apps.get_model('gyms', 'MemberShip')
+    InOut = apps.get_model('gyms', 'InOut')
+    today = timezone.localdate()
+
+    def grouped(queryset, **aggregates):
+        return {row.pop('gym_id'): row for row in queryset.values('gym_id').annotate(**aggregates)}
+
+    ratings = grouped(Rate.objects.all(), rating_sum=Sum('rate'), rating_count=Count('id'))
+    members = grouped(MemberShip.objects.filter(active_until__gte=today),
+                      active_members=Count('customer_id', distinct=True))
+    inside = grouped(InOut.objects.filter(enter_time__isnull=False, out_time__isnull=True), in_gym=Count('id'))
+    visits = grouped(InOut.objects.filter(enter_time__date=today), visits_today=Count('id'))
+    GymStats.objects.bulk_create([
+        GymStats(
+            gym_id=gym_id,
+            rating_sum=ratings.get(gym_id, {}).get('rating_sum') or 0,
+            rating_count=ratings.get(gym_id, {}).get('rating_count', 0),
+            active_members=members.get(gym_id, {}).get('active_members', 0),
+            in_gym=inside.get(gym_id, {}).get('in_gym', 0),
+            visits_today=visits.get(gym_id, {}).get('visits_today', 0),
+            visits_date=today,
+        )
+        for gym_id in Gym.objects.values_list('id', flat=True)
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gyms', '0016_gym_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GymStats',
+            fields=[
+                ('gym', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='gyms.gym')),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('rating_count', models.PositiveIntegerField(default=0)),
+                ('active_members', models.PositiveIntegerField(default=0)),
+                ('in_gym', models.PositiveIntegerField(default=0)),
+                ('visits_today', models.PositiveIntegerField(default=0)),
+                ('visits_date', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(fill_gym_stats, migrations.RunPython.noop),
+    ]
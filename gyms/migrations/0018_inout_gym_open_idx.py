@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-17 17:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gyms', '0017_gym_stats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inout',
+            index=models.Index(condition=models.Q(('out_time__isnull', True)), fields=['gym', 'id'], name='inout_gym_open_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-17 17:58
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gyms', '0018_inout_gym_open_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='gymstats',
+            name='in_gym',
+        ),
+    ]
@@ -1,9 +1,16 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.db.models import Q
+from django.utils import timezone
 
 from accounts.models import Customer, GymManager, User
+from gyms.geo import parse_location
+from gyms.search import build_search_text, normalize_persian, sync_facility_tags, update_search_vectors
 from payments.models import Transaction
 
+# فیلدهایی که search_text از روی آن‌ها ساخته میشه
+SEARCH_TEXT_FIELDS = {'title', 'address', 'description'}
+
 
 # Create your models here.
 class Gym(models.Model):
@@ -27,10 +34,70 @@ class Gym(models.Model):
     work_hours_per_day = models.CharField(max_length=500)
     work_days_per_week = models.CharField(max_length=500)
     is_active = models.BooleanField(default=False)
+    # مختصات parse شده از location برای جستجوی نزدیک‌ترین باشگاه‌ها (gyms.geo)
+    latitude = models.FloatField(null=True, blank=True, editable=False)
+    longitude = models.FloatField(null=True, blank=True, editable=False)
+    city = models.CharField(max_length=255, blank=True, null=True)
+    # شکل یکسان‌سازی شده city برای فیلتر شهر در جستجو؛ خود city همان چیزی که وارد شده نمایش داده میشه
+    city_search = models.CharField(max_length=255, default='', blank=True, editable=False)
+    # متن یکسان‌سازی شده عنوان/آدرس/توضیحات و بردار جستجوی آن (gyms.search)؛ ایندکس‌های GIN فقط روی PostgreSQL
+    search_text = models.TextField(default='', blank=True, editable=False)
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # prefilter مستطیلی جستجوی نزدیک؛ longitude هم از خود ایندکس خونده میشه
+            models.Index(fields=['latitude', 'longitude'], name='gym_lat_lng_idx'),
+            models.Index(fields=['city_search', 'gender'], name='gym_city_search_gender_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+
+        def saves(*fields):
+            return update_fields is None or not update_fields.isdisjoint(fields)
+
+        if saves('location'):
+            self.latitude, self.longitude = parse_location(self.location)
+        if saves('city'):
+            self.city_search = normalize_persian(self.city)
+        if saves(*SEARCH_TEXT_FIELDS):
+            self.search_text = build_search_text(self.title, self.address, self.description)
+        if update_fields is not None:
+            if 'location' in update_fields:
+                update_fields |= {'latitude', 'longitude'}
+            if 'city' in update_fields:
+                update_fields.add('city_search')
+            if update_fields & SEARCH_TEXT_FIELDS:
+                update_fields.add('search_text')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+
+        # save(update_fields=[...]) بدون فیلدهای جستجو نه UPDATE بردار جستجو می‌زنه نه تگ‌های امکانات رو sync می‌کنه
+        if saves('search_text'):
+            update_search_vectors(Gym.objects.filter(pk=self.pk))
+        if saves('facilities'):
+            sync_facility_tags(self)
+
+
+class GymFacility(models.Model):
+    """تگ‌های امکانات باشگاه (از فیلد facilities)؛ ایندکس (tag, gym) ایندکس معکوس فیلتر امکاناته"""
+    gym = models.ForeignKey(Gym, on_delete=models.CASCADE, related_name='facility_tags')
+    tag = models.CharField(max_length=100)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tag', 'gym'], name='gym_facility_tag_gym_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.gym_id}: {self.tag}"
+
 
 class GymImage(models.Model):
     gym = models.ForeignKey(Gym, on_delete=models.CASCADE)
@@ -76,10 +143,23 @@ class MemberShipType(models.Model):
     price = models.IntegerField(default=0)
     description = models.TextField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # فیلتر بازه قیمت و کمترین قیمت در جستجوی باشگاه
+            models.Index(fields=['gyms', 'price'], name='membership_type_gym_price_idx'),
+        ]
+
     def __str__(self):
         return self.title + " for: " + self.gyms.title
 
 
+class MemberShipQuerySet(models.QuerySet):
+    def active(self, today=None):
+        """ممبرشیپ‌های معتبر: تاریخ اعتبار نگذشته و جلسه باقی مانده (از ستون active_until)"""
+        today = today or timezone.now().date()
+        return self.filter(active_until__gte=today)
+
+
 class MemberShip(models.Model):
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='memberships')
     gym = models.ForeignKey(Gym, on_delete=models.CASCADE, related_name='memberships')
@@ -92,10 +172,31 @@ class MemberShip(models.Model):
                                        related_name='membership')
     days = models.IntegerField(default=0)
     is_active = models.BooleanField(default=False)
+    # کپی denormalize شده: validity_date اگر جلسه باقی مانده باشه، وگرنه null (در save به‌روز میشه)
+    active_until = models.DateField(null=True, blank=True)
+
+    objects = MemberShipQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # ممبرشیپ فعال مشتری در یک باشگاه (درخواست ورود، is_active پنل‌ها، اطلاعیه‌های باشگاه)
+            models.Index(fields=['customer', 'gym', 'active_until'], name='membership_cust_gym_active_idx'),
+        ]
 
     def __str__(self):
         return f"Membership {self.customer.user.full_name} - {self.gym.title}"
 
+    @staticmethod
+    def compute_active_until(validity_date, session_left):
+        return validity_date if session_left and session_left > 0 else None
+
+    def save(self, *args, **kwargs):
+        self.active_until = self.compute_active_until(self.validity_date, self.session_left)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and ('validity_date' in update_fields or 'session_left' in update_fields):
+            kwargs['update_fields'] = {*update_fields, 'active_until'}
+        super().save(*args, **kwargs)
+
 
 class Closet(models.Model):
     gym = models.ForeignKey(Gym, on_delete=models.CASCADE, related_name='closets')
@@ -119,6 +220,16 @@ class InOut(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # partial index روی ورودهای باز (درخواست در انتظار یا داخل باشگاه)
+            models.Index(fields=['customer', 'gym'], condition=Q(out_time__isnull=True), name='inout_open_idx'),
+            # صف پذیرش و افراد داخل هر باشگاه به ترتیب ثبت
+            models.Index(fields=['gym', 'id'], condition=Q(out_time__isnull=True), name='inout_gym_open_idx'),
+            # تاریخچه ورود و خروج مشتری با صفحه‌بندی keyset
+            models.Index(fields=['customer', '-id'], name='inout_customer_idx'),
+        ]
+
     def __str__(self):
         return f"InOut {self.customer} @ {self.gym}"
 
@@ -140,3 +251,21 @@ class Rate(models.Model):
 
     def __str__(self):
         return f"{self.rate} by {self.customer} for {self.gym}"
+
+
+class GymStats(models.Model):
+    """آمار تجمیعی باشگاه که به صورت افزایشی به‌روز میشه (gyms.stats)"""
+    gym = models.OneToOneField(Gym, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    active_members = models.PositiveIntegerField(default=0)
+    visits_today = models.PositiveIntegerField(default=0)  # فقط برای visits_date معتبره
+    visits_date = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Stats of {self.gym_id}"
+
+    @property
+    def rating_average(self):
+        return round(self.rating_sum / self.rating_count, 2) if self.rating_count else None
@@ -0,0 +1,188 @@
+"""
+تعداد زنده افراد داخل هر باشگاه در Redis.
+شمارنده با تایید ورود زیاد و با خروج کم میشه (بعد از commit) و هر تغییر به گروه کارکنان باشگاه
+(gym_{id}_staff) push میشه تا داشبورد پنل باشگاه بدون polling به‌روز بشه.
+شمارنده نبود یعنی از روی InOut های باز شمرده میشه؛ reconcile به صورت دوره‌ای شمارنده‌ها رو با InOut یکی می‌کنه.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Count
+from django.utils.module_loading import import_string
+
+from gyms.models import Gym, InOut
+
+logger = logging.getLogger(__name__)
+
+# تغییر شمارنده فقط اگر وجود داشته باشه، بدون منفی شدن؛ مقدار جدید یا nil
+ADJUST_IF_EXISTS_LUA = """
+local current = redis.call('GET', KEYS[1])
+if not current then
+    return nil
+end
+local value = math.max(tonumber(current) + tonumber(ARGV[1]), 0)
+redis.call('SET', KEYS[1], value, 'KEEPTTL')
+return value
+"""
+
+
+class RedisOccupancyBackend:
+    def __init__(self):
+        from django_redis import get_redis_connection
+        self.client = get_redis_connection(getattr(settings, 'GYM_OCCUPANCY_CACHE_ALIAS', 'default'))
+        self.adjust_script = self.client.register_script(ADJUST_IF_EXISTS_LUA)
+
+    def get_many(self, keys):
+        return [int(value) if value is not None else None for value in self.client.mget(keys)] if keys else []
+
+    def add(self, key, value, ttl):
+        self.client.set(key, value, ex=ttl, nx=True)
+
+    def set_many(self, mapping, ttl):
+        pipe = self.client.pipeline()
+        for key, value in mapping.items():
+            pipe.set(key, value, ex=ttl)
+        pipe.execute()
+
+    def adjust(self, key, amount):
+        value = self.adjust_script(keys=[key], args=[amount])
+        return int(value) if value is not None else None
+
+
+class LocalOccupancyBackend:
+    """بک‌اند داخل حافظه برای تست‌ها و اجرای لوکال بدون Redis"""
+
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        value, expires_at = self._values.get(key, (None, 0))
+        return value if expires_at >= time.monotonic() else None
+
+    def get_many(self, keys):
+        with self._lock:
+            return [self._get(key) for key in keys]
+
+    def add(self, key, value, ttl):
+        with self._lock:
+            if self._get(key) is None:
+                self._values[key] = (value, time.monotonic() + ttl)
+
+    def set_many(self, mapping, ttl):
+        with self._lock:
+            for key, value in mapping.items():
+                self._values[key] = (value, time.monotonic() + ttl)
+
+    def adjust(self, key, amount):
+        with self._lock:
+            if self._get(key) is None:
+                return None
+            value, expires_at = self._values[key]
+            value = max(value + amount, 0)
+            self._values[key] = (value, expires_at)
+            return value
+
+
+def inside_inouts():
+    """ورودهای تایید شده‌ای که هنوز خارج نشدن (از partial index inout_open_idx)"""
+    return InOut.objects.filter(out_time__isnull=True, enter_time__isnull=False)
+
+
+class OccupancyCounter:
+    KEY_PREFIX = "occupancy:gym"
+
+    def __init__(self, backend=None, ttl=None):
+        self.backend = backend
+        self.ttl = ttl or getattr(settings, 'GYM_OCCUPANCY_TTL', 86400)
+
+    def get_backend(self):
+        if self.backend is None:
+            backend_path = getattr(settings, 'GYM_OCCUPANCY_BACKEND', 'gyms.occupancy.RedisOccupancyBackend')
+            self.backend = import_string(backend_path)()
+        return self.backend
+
+    def key(self, gym_id):
+        return f"{self.KEY_PREFIX}:{gym_id}"
+
+    def count_from_db(self, gym_ids):
+        counts = dict(
+            inside_inouts().filter(gym_id__in=gym_ids).values('gym_id').annotate(count=Count('id'))
+            .values_list('gym_id', 'count')
+        )
+        return {gym_id: counts.get(gym_id, 0) for gym_id in gym_ids}
+
+    def counts(self, gym_ids):
+        """{gym_id: تعداد داخل باشگاه}؛ شمارنده‌های نبود با یک کوئری group by شمرده میشن"""
+        gym_ids = list(dict.fromkeys(gym_ids))
+        try:
+            values = self.get_backend().get_many([self.key(gym_id) for gym_id in gym_ids])
+        except Exception as e:
+            logger.warning("occupancy counter unavailable: %s", e)
+            return self.count_from_db(gym_ids)
+
+        result = {gym_id: value for gym_id, value in zip(gym_ids, values) if value is not None}
+        missing = [gym_id for gym_id in gym_ids if gym_id not in result]
+        if missing:
+            counted = self.count_from_db(missing)
+            try:
+                for gym_id, value in counted.items():
+                    self.get_backend().add(self.key(gym_id), value, self.ttl)
+            except Exception as e:
+                logger.warning("occupancy counter unavailable: %s", e)
+            result.update(counted)
+        return result
+
+    def count(self, gym_id):
+        return self.counts([gym_id])[gym_id]
+
+    def adjust(self, gym_id, amount):
+        """بعد از commit ورود (amount مثبت) یا خروج (منفی) صدا زده میشه و مقدار جدید رو push می‌کنه"""
+        try:
+            value = self.get_backend().adjust(self.key(gym_id), amount)
+        except Exception as e:
+            logger.warning("occupancy counter unavailable: %s", e)
+            value = None
+        if value is None:
+            value = self.count(gym_id)
+        push_occupancy({gym_id: value})
+        return value
+
+    def reconcile(self, gym_ids=None, batch_size=1000):
+        """
+        شمارنده‌ها رو با InOut یکی می‌کنه (مثلا بعد از تغییر مستقیم دیتابیس یا از دست رفتن یک به‌روزرسانی).
+        فقط باشگاه‌هایی که مقدارشون عوض شده push میشن. خروجی: {gym_id: مقدار جدید} برای تغییر کرده‌ها
+        """
+        if gym_ids is None:
+            gym_ids = list(Gym.objects.order_by('id').values_list('id', flat=True))
+
+        changed = {}
+        for start in range(0, len(gym_ids), batch_size):
+            batch = gym_ids[start:start + batch_size]
+            actual = self.count_from_db(batch)
+            try:
+                current = dict(zip(batch, self.get_backend().get_many([self.key(gym_id) for gym_id in batch])))
+                self.get_backend().set_many({self.key(gym_id): value for gym_id, value in actual.items()}, self.ttl)
+            except Exception as e:
+                logger.warning("occupancy counter unavailable: %s", e)
+                return changed
+            # شمارنده‌ای که نبود فقط مقداردهی میشه؛ داشبوردی مقدار قبلی اون رو نگرفته که لازم به push باشه
+            changed.update({
+                gym_id: value for gym_id, value in actual.items()
+                if current.get(gym_id) is not None and current[gym_id] != value
+            })
+        push_occupancy(changed)
+        return changed
+
+
+def push_occupancy(counts):
+    from communications.notifications import gym_staff_group, push
+    push([
+        (gym_staff_group(gym_id), {"type": "occupancy_update", "gym_id": gym_id, "count": count})
+        for gym_id, count in counts.items()
+    ])
+
+
+occupancy = OccupancyCounter()
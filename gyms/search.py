@@ -0,0 +1,121 @@
+"""
+جستجوی باشگاه‌ها.
+متن عنوان، آدرس و توضیحات بعد از یکسان‌سازی حروف فارسی/عربی در ستون search_text ذخیره میشه؛
+روی PostgreSQL بردار tsvector (config simple) و ایندکس trigram همین ستون جستجو رو بدون اسکن انجام میدن.
+امکانات باشگاه به صورت تگ در جدول GymFacility (ایندکس معکوس تگ → باشگاه) نگه داشته میشن.
+همه فیلترها در یک کوئری اعمال میشن.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Count, Exists, F, IntegerField, Min, OuterRef, Q, Subquery, Value
+
+PERSIAN_CHAR_MAP = str.maketrans({
+    'ي': 'ی', 'ى': 'ی', 'ئ': 'ی',  # ی عربی
+    'ك': 'ک',  # ک عربی
+    'ة': 'ه', 'ۀ': 'ه',  # ة و ۀ
+    'أ': 'ا', 'إ': 'ا', 'ٱ': 'ا', 'ؤ': 'و',
+    '‌': ' ', '‎': ' ', '‏': ' ',  # نیم‌فاصله و علامت‌های جهت
+    'ـ': '',  # کشیده
+    **{chr(0x06F0 + i): str(i) for i in range(10)},
+    **{chr(0x0660 + i): str(i) for i in range(10)},
+})
+DIACRITICS_RE = re.compile('[ً-ٰٟ]')
+NON_WORD_RE = re.compile(r'[^\w]+')
+FACILITY_SEPARATORS_RE = re.compile(r'[,،;؛\n]+')
+
+
+def normalize_persian(text):
+    """یکسان‌سازی ی/ک عربی، حذف اعراب و کشیده، نیم‌فاصله → فاصله و ارقام فارسی/عربی → لاتین"""
+    if not text:
+        return ''
+    text = DIACRITICS_RE.sub('', text.translate(PERSIAN_CHAR_MAP)).lower()
+    return ' '.join(NON_WORD_RE.sub(' ', text).split())
+
+
+def parse_facility_tags(facilities):
+    """'استخر، سونا, Parking' → ['استخر', 'سونا', 'parking']"""
+    tags = (normalize_persian(part) for part in FACILITY_SEPARATORS_RE.split(facilities or ''))
+    return list(dict.fromkeys(tag[:100] for tag in tags if tag))
+
+
+def build_search_text(title, address, description):
+    return ' '.join(filter(None, (normalize_persian(title), normalize_persian(address), normalize_persian(description))))
+
+
+def uses_postgres_search():
+    return connection.vendor == 'postgresql'
+
+
+def update_search_vectors(queryset):
+    """بردار tsvector از روی search_text (فقط PostgreSQL)"""
+    if uses_postgres_search():
+        from django.contrib.postgres.search import SearchVector
+        queryset.update(search_vector=SearchVector('search_text', config='simple'))
+
+
+def sync_facility_tags(gym):
+    from gyms.models import GymFacility
+    tags = set(parse_facility_tags(gym.facilities))
+    existing = set(GymFacility.objects.filter(gym=gym).values_list('tag', flat=True))
+    if existing - tags:
+        GymFacility.objects.filter(gym=gym, tag__in=existing - tags).delete()
+    if tags - existing:
+        GymFacility.objects.bulk_create([GymFacility(gym=gym, tag=tag) for tag in tags - existing])
+
+
+def _filter_text(queryset, query):
+    terms = query.split()
+    if not uses_postgres_search():
+        for term in terms:
+            queryset = queryset.filter(search_text__contains=term)
+        return queryset.annotate(rank=Value(0.0))
+
+    from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+    # هر کلمه به صورت پیشوندی (باشگ → باشگاه)؛ trigram برای غلط املایی
+    search_query = SearchQuery(' & '.join(f"{term}:*" for term in terms), config='simple', search_type='raw')
+    return (
+        queryset
+        .filter(Q(search_vector=search_query) | Q(search_text__trigram_word_similar=query))
+        .annotate(rank=SearchRank(F('search_vector'), search_query) + TrigramWordSimilarity(query, 'search_text'))
+    )
+
+
+def search_gyms(queryset, query=None, facilities=None, gender=None, city=None, min_price=None, max_price=None):
+    """
+    باشگاه‌های منطبق با همه فیلترها؛ با متن جستجو به ترتیب امتیاز و بدون آن به ترتیب id.
+    min_price در annotation کمترین قیمت نوع عضویت باشگاهه.
+    """
+    from gyms.models import GymFacility, MemberShipType
+
+    if gender:
+        queryset = queryset.filter(gender__in=['both', gender])
+    if city:
+        queryset = queryset.filter(city_search=normalize_persian(city))
+
+    tags = parse_facility_tags(','.join(facilities or []))
+    if tags:
+        # باشگاه‌هایی که همه تگ‌ها رو دارن: group by روی ایندکس (tag, gym)
+        matching = (
+            GymFacility.objects.filter(tag__in=tags)
+            .values('gym_id').annotate(matched=Count('tag')).filter(matched=len(tags)).values('gym_id')
+        )
+        queryset = queryset.filter(id__in=matching)
+
+    if min_price is not None or max_price is not None:
+        price_range = MemberShipType.objects.filter(gyms=OuterRef('pk'))
+        if min_price is not None:
+            price_range = price_range.filter(price__gte=min_price)
+        if max_price is not None:
+            price_range = price_range.filter(price__lte=max_price)
+        queryset = queryset.filter(Exists(price_range))
+
+    queryset = queryset.annotate(min_price=Subquery(
+        MemberShipType.objects.filter(gyms=OuterRef('pk')).values('gyms').annotate(value=Min('price')).values('value'),
+        output_field=IntegerField(),
+    ))
+
+    query = normalize_persian(query)
+    if query:
+        return _filter_text(queryset, query)
+    return queryset.annotate(rank=Value(0.0))
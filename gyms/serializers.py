@@ -1,6 +1,53 @@
+from django.conf import settings
+from django.db.models import Prefetch
 from django.utils.timezone import now
 from rest_framework import serializers
-from gyms.models import Gym, MemberShip, MemberShipType, InOut, GymImage, GymBanner
+from gyms.models import Gym, MemberShip, MemberShipType, InOut, GymImage, GymBanner, GymStats
+from gyms.occupancy import occupancy
+from gyms.search import parse_facility_tags
+from gyms.stats import current_visits_today
+
+
+class GymStatsSerializer(serializers.ModelSerializer):
+    rating_average = serializers.FloatField(read_only=True, allow_null=True)
+    in_gym = serializers.SerializerMethodField()
+    visits_today = serializers.SerializerMethodField()
+
+    class Meta:
+        model = GymStats
+        fields = ['rating_average', 'rating_count', 'active_members', 'in_gym', 'visits_today']
+
+    def get_in_gym(self, obj):
+        return self.context['in_gym']
+
+    def get_visits_today(self, obj):
+        return current_visits_today(obj)
+
+    @staticmethod
+    def for_gym(gym):
+        """
+        آمار از select_related('stats')؛ باشگاهی که هنوز ردیف آمار نداره → مقادیر صفر.
+        in_gym از شمارنده occupancy (برای لیست‌ها یک بار برای کل صفحه در GymOccupancyListSerializer)
+        """
+        try:
+            stats = gym.stats
+        except GymStats.DoesNotExist:
+            stats = GymStats(gym_id=gym.pk)
+        in_gym = getattr(gym, 'in_gym', None)
+        if in_gym is None:
+            in_gym = occupancy.count(gym.pk)
+        return GymStatsSerializer(stats, context={'in_gym': in_gym}).data
+
+
+class GymOccupancyListSerializer(serializers.ListSerializer):
+    """تعداد افراد داخل همه باشگاه‌های صفحه با یک درخواست به شمارنده occupancy"""
+
+    def to_representation(self, data):
+        gyms = list(data.all() if hasattr(data, 'all') else data)
+        counts = occupancy.counts([gym.pk for gym in gyms])
+        for gym in gyms:
+            gym.in_gym = counts[gym.pk]
+        return super().to_representation(gyms)
 
 
 class GymChoicesSerializer(serializers.Serializer):
@@ -57,6 +104,10 @@ class CustomerPanelMembershipSerializer(serializers.ModelSerializer):
             'status'
         ]
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('gym', 'type')
+
     def get_status(self, obj):
         from django.utils.timezone import now
         today = now().date()
@@ -159,27 +210,104 @@ class CustomerPanelGymSerializer(serializers.ModelSerializer):
     banners = CustomerPanelGymBannerSerializer(source='gymbanner_set', many=True, read_only=True)
     membership_types = CustomerPanelMemberShipTypeForSignedGymSerializer(many=True, read_only=True)
     my_memberships = serializers.SerializerMethodField()
+    stats = serializers.SerializerMethodField()
 
     class Meta:
         model = Gym
         fields = [
-            'id', 'title', 'location', 'address', 'main_img',
+            'id', 'title', 'location', 'city', 'address', 'main_img',
             'phone', 'headline_phone', 'gender',
             'facilities', 'description', 'work_hours_per_day', 'work_days_per_week',
-            'images', 'banners', 'membership_types', 'my_memberships'
+            'images', 'banners', 'membership_types', 'my_memberships', 'stats'
         ]
+        list_serializer_class = GymOccupancyListSerializer
+
+    @staticmethod
+    def setup_eager_loading(queryset, customer=None):
+        """
+        برنامه prefetch برای لیست و جزئیات: تعداد کوئری مستقل از تعداد باشگاه‌های صفحه است.
+        ممبرشیپ‌ها فقط برای مشتری درخواست‌دهنده در my_memberships_prefetched لود میشن.
+        """
+        memberships = MemberShip.objects.none()
+        if customer is not None:
+            memberships = MemberShip.objects.filter(customer=customer).select_related('type')
+        # ستون‌های جستجو فقط برای فیلتر لازمن
+        return queryset.defer('search_text', 'search_vector').select_related('stats').prefetch_related(
+            'gymimage_set',
+            'gymbanner_set',
+            'membership_types',
+            Prefetch('memberships', queryset=memberships, to_attr='my_memberships_prefetched'),
+        )
 
     def get_my_memberships(self, obj):
         """فقط ممبرشیپ‌هایی که مربوط به کاربر درخواست‌دهنده هستن"""
-        request = self.context.get('request')
-        if not request or not request.user.is_authenticated:
-            return []
-        customer = getattr(request.user, 'customer', None)
-        if not customer:
-            return []
-        memberships = obj.memberships.filter(customer=customer)
+        memberships = getattr(obj, 'my_memberships_prefetched', None)
+        if memberships is None:
+            request = self.context.get('request')
+            if not request or not request.user.is_authenticated:
+                return []
+            customer = getattr(request.user, 'customer', None)
+            if not customer:
+                return []
+            memberships = obj.memberships.filter(customer=customer).select_related('type')
         return CustomerPanelMemberShipSerializer(memberships, many=True).data
 
+    def get_stats(self, obj):
+        return GymStatsSerializer.for_gym(obj)
+
+
+class CustomerPanelNearbyGymQuerySerializer(serializers.Serializer):
+    lat = serializers.FloatField(min_value=-90, max_value=90)
+    lng = serializers.FloatField(min_value=-180, max_value=180)
+    radius = serializers.FloatField(min_value=0.1, required=False, help_text="شعاع جستجو به کیلومتر")
+
+    def validate_radius(self, value):
+        max_radius = getattr(settings, 'GYM_NEARBY_MAX_RADIUS_KM', 50)
+        if value > max_radius:
+            raise serializers.ValidationError(f"حداکثر شعاع جستجو {max_radius} کیلومتر است")
+        return value
+
+
+class CustomerPanelNearbyGymSerializer(CustomerPanelGymSerializer):
+    distance = serializers.SerializerMethodField(help_text="فاصله به کیلومتر")
+
+    class Meta(CustomerPanelGymSerializer.Meta):
+        fields = CustomerPanelGymSerializer.Meta.fields + ['latitude', 'longitude', 'distance']
+
+    def get_distance(self, obj):
+        return round(obj.distance, 3)
+
+
+class CustomerPanelGymSearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=100, required=False, allow_blank=True, help_text="متن جستجو")
+    facilities = serializers.CharField(max_length=500, required=False, help_text="تگ‌های امکانات با , جدا شده")
+    gender = serializers.ChoiceField(choices=['male', 'female'], required=False)
+    city = serializers.CharField(max_length=255, required=False)
+    min_price = serializers.IntegerField(min_value=0, required=False)
+    max_price = serializers.IntegerField(min_value=0, required=False)
+
+    def validate(self, attrs):
+        if attrs.get('min_price') is not None and attrs.get('max_price') is not None \
+                and attrs['min_price'] > attrs['max_price']:
+            raise serializers.ValidationError({"min_price": "حداقل قیمت نباید از حداکثر قیمت بیشتر باشد"})
+        return attrs
+
+
+class CustomerPanelGymSearchSerializer(serializers.ModelSerializer):
+    facility_tags = serializers.SerializerMethodField()
+    min_price = serializers.IntegerField(read_only=True, allow_null=True)
+
+    class Meta:
+        model = Gym
+        fields = [
+            'id', 'title', 'city', 'location', 'address', 'main_img', 'gender',
+            'facility_tags', 'min_price'
+        ]
+
+    def get_facility_tags(self, obj):
+        # از خود فیلد facilities؛ بدون کوئری اضافه برای هر باشگاه
+        return parse_facility_tags(obj.facilities)
+
 
 class CustomerPanelInOutSerializer(serializers.ModelSerializer):
     gym = serializers.SlugRelatedField(read_only=True, slug_field='title')
@@ -189,11 +317,62 @@ class CustomerPanelInOutSerializer(serializers.ModelSerializer):
         model = InOut
         fields = ['gym', 'closet', 'enter_time', 'out_time', 'subscription']
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('gym')
+
     def get_subscription(self, obj):
-        return obj.subscription
+        # شناسه ممبرشیپ؛ خود شیء مدل قابل تبدیل به JSON نیست
+        return obj.subscription_id
 
 
 # <=================== Gym Views ===================>
+class GymPanelOccupancySerializer(serializers.Serializer):
+    gym_id = serializers.IntegerField()
+    in_gym = serializers.IntegerField(help_text="تعداد افراد داخل باشگاه در همین لحظه")
+
+
+class GymPanelCheckInEntrySerializer(serializers.ModelSerializer):
+    customer_name = serializers.CharField(source='customer.user.full_name', read_only=True)
+    customer_phone = serializers.CharField(source='customer.user.phone', read_only=True)
+    closet_number = serializers.CharField(source='closet.number', read_only=True, default=None)
+    session_left = serializers.IntegerField(source='subscription.session_left', read_only=True, default=None)
+
+    class Meta:
+        model = InOut
+        fields = ['id', 'gym', 'customer', 'customer_name', 'customer_phone', 'closet', 'closet_number',
+                  'subscription', 'session_left', 'enter_time', 'created_at']
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('customer__user', 'closet', 'subscription')
+
+
+class GymPanelCheckInQuerySerializer(serializers.Serializer):
+    status = serializers.ChoiceField(choices=(('pending', 'در انتظار تایید'), ('inside', 'داخل باشگاه')),
+                                     default='pending')
+    gym = serializers.IntegerField(required=False)
+
+
+class GymPanelCheckInActionSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=500)
+
+
+class GymPanelCheckInConfirmSerializer(GymPanelCheckInActionSerializer):
+    assign_closets = serializers.BooleanField(default=True, help_text="دادن کمد خالی به درخواست‌های بدون کمد")
+
+
+class GymPanelCheckInClosetSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    closet = serializers.IntegerField()
+    number = serializers.CharField()
+
+
+class GymPanelCheckInResultSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), help_text="ردیف‌هایی که واقعا تغییر کردن")
+    closets = GymPanelCheckInClosetSerializer(many=True)
+
+
 class GymPanelGymImageSerializer(serializers.ModelSerializer):
     id = serializers.IntegerField(required=False)
 
@@ -204,16 +383,25 @@ class GymPanelGymImageSerializer(serializers.ModelSerializer):
 
 class GymPanelGymSerializer(serializers.ModelSerializer):
     images = GymPanelGymImageSerializer(source='gymimage_set', many=True, required=False)
+    stats = serializers.SerializerMethodField()
 
     class Meta:
         model = Gym
         fields = [
-            'id', 'title', 'location', 'address', 'main_img', 'phone',
+            'id', 'title', 'location', 'city', 'address', 'main_img', 'phone',
             'headline_phone', 'gender', 'commission_type', 'facilities',
             'description', 'work_hours_per_day', 'work_days_per_week',
-            'is_active', 'images'
+            'is_active', 'images', 'stats'
         ]
         read_only_fields = ['is_active']
+        list_serializer_class = GymOccupancyListSerializer
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('stats').prefetch_related('gymimage_set')
+
+    def get_stats(self, obj):
+        return GymStatsSerializer.for_gym(obj)
 
     def create(self, validated_data):
         """
@@ -275,6 +463,10 @@ class GymPanelMemberShipTypeSerializer(serializers.ModelSerializer):
         model = MemberShipType
         fields = ['id', 'title', 'gym_title', 'gyms', 'days', 'price', 'description']
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('gyms')
+
     def validate_gyms(self, value):
         """
         بررسی کنه gym انتخاب‌شده واقعاً متعلق به مدیر لاگین‌شده هست
@@ -296,6 +488,10 @@ class GymPanelGymBannerSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'banner', 'is_main', 'gym', 'gym_title']
         read_only_fields = ['is_main']
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('gym')
+
     def validate_gym(self, value):
         """
         فقط اجازه بده برای باشگاه‌های متعلق به یوزر فعلی بنر ساخته بشه
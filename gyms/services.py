@@ -0,0 +1,53 @@
+from django.db import transaction
+from django.db.models import Q, F, Case, When
+from django.utils.timezone import now
+from rest_framework.exceptions import ValidationError
+
+from gyms.checkin import push_requested
+from gyms.models import MemberShip, InOut
+from gyms.stats import refresh_active_members
+
+
+def open_inouts(customer_id, gym_id):
+    """ورودهای باز مشتری در باشگاه: درخواست در انتظار تایید یا داخل باشگاه (از partial index inout_open_idx)"""
+    return InOut.objects.filter(customer_id=customer_id, gym_id=gym_id, out_time__isnull=True).filter(
+        Q(confirm_in=False) | Q(enter_time__isnull=False)
+    )
+
+
+def request_gym_entry(customer, gym, closet=None):
+    """
+    ثبت درخواست ورود در یک تراکنش:
+    قفل ممبرشیپ فعال (select_for_update)، بررسی ورود باز، کم کردن یک جلسه و ساخت InOut.
+    قفل روی ممبرشیپ درخواست‌های همزمان یک مشتری در یک باشگاه رو پشت سر هم اجرا می‌کنه،
+    پس دو درخواست همزمان نمی‌تونن دو ورود باز بسازن یا یک جلسه رو دو بار مصرف کنن.
+    """
+    today = now().date()
+    with transaction.atomic():
+        membership = (
+            MemberShip.objects.select_for_update()
+            .active(today)
+            .filter(customer_id=customer.id, gym_id=gym.id)
+            .order_by('active_until', 'id')
+            .first()
+        )
+        if membership is None:
+            raise ValidationError("شما ممبرشیپ فعال برای این باشگاه ندارید.")
+
+        if open_inouts(customer.id, gym.id).exists():
+            raise ValidationError("شما یک درخواست ورود فعال دارید، تا زمان خروج نمی‌توانید درخواست جدید ثبت کنید.")
+
+        # کم کردن جلسه در خود دیتابیس؛ active_until با آخرین جلسه null میشه
+        MemberShip.objects.filter(pk=membership.pk).update(
+            session_left=F('session_left') - 1,
+            active_until=Case(When(session_left__gt=1, then=F('validity_date')), default=None),
+        )
+        membership.session_left -= 1
+        membership.active_until = MemberShip.compute_active_until(membership.validity_date, membership.session_left)
+        if membership.active_until is None:
+            # UPDATE مستقیم سیگنال نمی‌فرسته؛ با آخرین جلسه تعداد اعضای فعال باشگاه عوض میشه
+            transaction.on_commit(lambda: refresh_active_members(gym.id))
+
+        inout = InOut.objects.create(customer=customer, gym=gym, closet=closet, subscription=membership)
+        transaction.on_commit(lambda: push_requested(inout))
+        return inout
@@ -0,0 +1,73 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from gyms.models import Gym, InOut, MemberShip, Rate
+from gyms.occupancy import occupancy
+from gyms.stats import apply_rating, ensure_stats, record_entries, refresh_active_members
+
+
+def is_inside(inout):
+    return inout.enter_time is not None and inout.out_time is None
+
+
+# <=================== Gym Stats & Occupancy ===================>
+@receiver(post_save, sender=Gym)
+def create_gym_stats(sender, instance, created, **kwargs):
+    if created:
+        ensure_stats([instance.pk])
+
+
+@receiver(pre_save, sender=Rate)
+def remember_previous_rate(sender, instance, **kwargs):
+    instance._previous_rate = None
+    if instance.pk:
+        instance._previous_rate = Rate.objects.filter(pk=instance.pk).values_list('rate', flat=True).first()
+
+
+@receiver(post_save, sender=Rate)
+def update_rating_stats(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_rate', None)
+    if created or previous is None:
+        apply_rating(instance.gym_id, instance.rate, 1)
+    elif previous != instance.rate:
+        apply_rating(instance.gym_id, instance.rate - previous, 0)
+
+
+@receiver(post_delete, sender=Rate)
+def remove_rating_stats(sender, instance, **kwargs):
+    apply_rating(instance.gym_id, -instance.rate, -1, create=False)
+
+
+@receiver(pre_save, sender=InOut)
+def remember_previous_presence(sender, instance, **kwargs):
+    # فقط تغییر وضعیت «داخل باشگاه» شمارنده‌ها رو عوض می‌کنه
+    instance._was_inside = False
+    if instance.pk:
+        previous = InOut.objects.filter(pk=instance.pk).values('enter_time', 'out_time').first()
+        instance._was_inside = bool(previous) and previous['enter_time'] is not None and previous['out_time'] is None
+
+
+@receiver(post_save, sender=InOut)
+def update_presence_stats(sender, instance, **kwargs):
+    was_inside, inside = getattr(instance, '_was_inside', False), is_inside(instance)
+    gym_id = instance.gym_id
+    if inside and not was_inside:
+        record_entries(gym_id)
+        transaction.on_commit(lambda: occupancy.adjust(gym_id, 1))
+    elif was_inside and not inside:
+        transaction.on_commit(lambda: occupancy.adjust(gym_id, -1))
+
+
+@receiver(post_delete, sender=InOut)
+def remove_presence_stats(sender, instance, **kwargs):
+    if is_inside(instance):
+        gym_id = instance.gym_id
+        transaction.on_commit(lambda: occupancy.adjust(gym_id, -1))
+
+
+@receiver(post_save, sender=MemberShip)
+@receiver(post_delete, sender=MemberShip)
+def update_member_stats(sender, instance, **kwargs):
+    gym_id = instance.gym_id
+    transaction.on_commit(lambda: refresh_active_members(gym_id))
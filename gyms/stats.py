@@ -0,0 +1,97 @@
+"""
+آمار تجمیعی هر باشگاه در جدول GymStats: مجموع و تعداد امتیازها، تعداد اعضای فعال و تعداد ورودهای امروز.
+تعداد افراد داخل باشگاه اینجا نیست و از شمارنده gyms.occupancy خونده میشه.
+تغییرات امتیاز و ورود با UPDATE های اتمیک (F) و به صورت افزایشی اعمال میشن؛ اعضای فعال بعد از هر تغییر
+ممبرشیپ دوباره شمرده میشن و انقضا با گذشت زمان و اصلاح کل جدول با refresh_gym_stats به صورت دسته‌ای حساب میشه.
+"""
+from datetime import datetime, time
+
+from django.db.models import Case, Count, F, Sum, Value, When
+from django.utils import timezone
+
+from gyms.models import Gym, GymStats, InOut, MemberShip, Rate
+
+STATS_FIELDS = ['rating_sum', 'rating_count', 'active_members', 'visits_today', 'visits_date']
+
+
+def ensure_stats(gym_ids):
+    GymStats.objects.bulk_create([GymStats(gym_id=gym_id) for gym_id in gym_ids], ignore_conflicts=True)
+
+
+def _update(gym_id, create=True, **values):
+    # ردیف آمار باشگاه‌هایی که با bulk_create ساخته شدن در اولین تغییر ساخته میشه؛
+    # در حذف‌ها (create=False) ساخته نمیشه چون ممکنه خود باشگاه در حال حذف cascade باشه
+    updated = GymStats.objects.filter(gym_id=gym_id).update(**values)
+    if not updated and create and Gym.objects.filter(pk=gym_id).exists():
+        ensure_stats([gym_id])
+        GymStats.objects.filter(gym_id=gym_id).update(**values)
+
+
+def apply_rating(gym_id, sum_delta, count_delta, create=True):
+    _update(gym_id, create, rating_sum=F('rating_sum') + sum_delta, rating_count=F('rating_count') + count_delta)
+
+
+def record_entries(gym_id, count=1, today=None):
+    """ورود count نفر؛ شمارنده ورود امروز با اولین ورود روز جدید از صفر شروع میشه"""
+    today = today or timezone.localdate()
+    _update(
+        gym_id,
+        visits_today=Case(When(visits_date=today, then=F('visits_today') + count), default=Value(count)),
+        visits_date=today,
+    )
+
+
+def refresh_active_members(gym_id, today=None):
+    """
+    بعد از ساخت، تغییر یا کم شدن جلسه ممبرشیپ (سیگنال‌ها و UPDATE های مستقیم services/checkin)؛
+    انقضای ممبرشیپ‌ها با گذشت زمان در refresh_gym_stats اعمال میشه
+    """
+    count = MemberShip.objects.active(today).filter(gym_id=gym_id).values('customer_id').distinct().count()
+    _update(gym_id, active_members=count)
+
+
+def current_visits_today(stats, today=None):
+    today = today or timezone.localdate()
+    return stats.visits_today if stats.visits_date == today else 0
+
+
+def _grouped(queryset, **aggregates):
+    return {row.pop('gym_id'): row for row in queryset.values('gym_id').annotate(**aggregates)}
+
+
+def refresh_gym_stats(gym_ids=None, batch_size=1000, today=None):
+    """
+    محاسبه دوباره آمار از روی جداول اصلی با چند کوئری group by برای هر دسته از باشگاه‌ها
+    و نوشتن با یک upsert. خروجی: تعداد باشگاه‌های به‌روز شده.
+    """
+    today = today or timezone.localdate()
+    start_of_day = timezone.make_aware(datetime.combine(today, time.min))
+    if gym_ids is None:
+        gym_ids = list(Gym.objects.order_by('id').values_list('id', flat=True))
+
+    updated = 0
+    for start in range(0, len(gym_ids), batch_size):
+        batch = gym_ids[start:start + batch_size]
+        ratings = _grouped(Rate.objects.filter(gym_id__in=batch),
+                           rating_sum=Sum('rate'), rating_count=Count('id'))
+        members = _grouped(MemberShip.objects.active(today).filter(gym_id__in=batch),
+                           active_members=Count('customer_id', distinct=True))
+        visits = _grouped(
+            InOut.objects.filter(gym_id__in=batch, enter_time__gte=start_of_day),
+            visits_today=Count('id'),
+        )
+        rows = []
+        for gym_id in batch:
+            rating = ratings.get(gym_id, {})
+            visit = visits.get(gym_id, {})
+            rows.append(GymStats(
+                gym_id=gym_id,
+                rating_sum=rating.get('rating_sum') or 0,
+                rating_count=rating.get('rating_count', 0),
+                active_members=members.get(gym_id, {}).get('active_members', 0),
+                visits_today=visit.get('visits_today', 0),
+                visits_date=today,
+            ))
+        GymStats.objects.bulk_create(rows, update_conflicts=True, unique_fields=['gym'], update_fields=STATS_FIELDS)
+        updated += len(rows)
+    return updated
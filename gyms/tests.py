@@ -1,3 +1,249 @@
-from django.test import TestCase
+import threading
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.db import DatabaseError, connection, transaction
+from django.test import skipUnlessDBFeature
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from accounts.benchmark import seed_benchmark_data
+from accounts.models import Customer, GymManager, User
+from accounts.testing import EndpointBudgetTestsMixin, LocalBackendsTestCase, LocalBackendsTransactionTestCase
+from gyms.checkin import confirm_entries
+from gyms.models import Closet, Gym, GymFacility, InOut, MemberShip, MemberShipType
+from gyms.services import open_inouts, request_gym_entry
+
+
+def create_membership(session_left=5, phone_suffix=0):
+    """یک باشگاه با مدیر و یک مشتری با ممبرشیپ فعال در آن"""
+    today = timezone.now().date()
+    manager = GymManager.objects.create(user=User.objects.create(phone=f"0910000{phone_suffix:04}", full_name='manager'))
+    customer = Customer.objects.create(
+        user=User.objects.create(phone=f"0920000{phone_suffix:04}", full_name='customer'), gender='male')
+    gym = Gym.objects.create(title='test gym', manager=manager, gender='both')
+    membership_type = MemberShipType.objects.create(title='monthly', gyms=gym, days=30, price=0)
+    membership = MemberShip.objects.create(
+        customer=customer, gym=gym, type=membership_type, start_date=today,
+        validity_date=today + timedelta(days=30), session_left=session_left, days=30,
+    )
+    return membership
+
+
+class SignedGymListQueryTests(LocalBackendsTestCase):
+    """لیست باشگاه‌های ثبت‌نامی مشتری (NotFoundOnEmptyListMixin) بدون exists() جدا"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ctx = seed_benchmark_data(gyms=5, customers=10)
+
+    def test_signed_gyms(self):
+        response = self.assert_get_queries(self.ctx, 'gyms/customer/gyms/signed/', 1)
+        self.assertTrue(response.json())
+
+    def test_no_signed_gyms_is_not_found_with_one_query(self):
+        MemberShip.objects.filter(customer__user=self.ctx['customer_user']).delete()
+        self.assert_get_queries(self.ctx, 'gyms/customer/gyms/signed/', 1, status=404)
+
+
+class GymListQueryCountTests(LocalBackendsTestCase):
+    """هزینه کوئری لیست باشگاه‌ها به اندازه صفحه بستگی نداره (همه روابط با یک برنامه prefetch)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ctx = seed_benchmark_data(gyms=30, customers=10)
+
+    def assert_constant_queries(self, route, num, param, sizes=(2, 10), query=''):
+        # گرم کردن با بزرگترین صفحه تا شمارنده occupancy همه باشگاه‌های صفحه‌ها پر باشه
+        self.assert_get_queries(self.ctx, route, num, query=f"{query}{param}={max(sizes)}")
+        for size in sizes:
+            with self.subTest(size=size):
+                response = self.assert_get_queries(self.ctx, route, num, query=f"{query}{param}={size}")
+                self.assertEqual(len(response.json()['results']), size)
+
+    def test_customer_gyms(self):
+        self.assert_constant_queries('gyms/customer/gyms/', 6, 'page_size')
+
+    def test_customer_nearby_gyms(self):
+        # شعاع بزرگتر تا بیشتر از یک صفحه باشگاه در محدوده باشه (آخرین مقدار query string حساب میشه)
+        self.assert_constant_queries('gyms/customer/gyms/nearby/', 6, 'page_size', query='radius=50&')
+
+    def test_gym_panel_gyms(self):
+        # limit/offset: یک COUNT اضافه
+        self.assert_constant_queries('gyms/gym-panel/gyms/', 3, 'limit')
+
+
+class GymSaveSearchFieldsTests(LocalBackendsTestCase):
+    """save با update_fields فقط وقتی فیلدهای منبع جستجو ذخیره میشن بردار جستجو و تگ‌های امکانات رو به‌روز می‌کنه"""
+
+    def setUp(self):
+        super().setUp()
+        manager = GymManager.objects.create(user=User.objects.create(phone='09100000000', full_name='manager'))
+        self.gym = Gym.objects.create(title='باشگاه', manager=manager, gender='both', facilities='استخر، سونا')
+
+    def save(self, update_fields):
+        with mock.patch('gyms.models.update_search_vectors') as update_vectors, \
+                mock.patch('gyms.models.sync_facility_tags') as sync_tags:
+            self.gym.save(update_fields=update_fields)
+        return update_vectors.called, sync_tags.called
+
+    def test_unrelated_fields_skip_search_work(self):
+        self.gym.balance = 1000
+        self.assertEqual(self.save(['balance']), (False, False))
+        self.gym.refresh_from_db()
+        self.assertEqual(self.gym.balance, 1000)
+
+    def test_title_updates_search_vector_only(self):
+        self.gym.title = 'باشگاه ورزشی'
+        self.assertEqual(self.save(['title']), (True, False))
+        self.gym.refresh_from_db()
+        self.assertEqual(self.gym.search_text, 'باشگاه ورزشی')
+
+    def test_facilities_are_synced(self):
+        self.gym.facilities = 'استخر، Parking'
+        self.gym.save(update_fields=['facilities'])
+        self.assertEqual(
+            set(GymFacility.objects.filter(gym=self.gym).values_list('tag', flat=True)), {'استخر', 'parking'})
+
+
+class GymEntryRequestTests(LocalBackendsTestCase):
+    """درخواست ورود دوم تا وقتی ورود باز هست رد میشه و جلسه دوباره کم نمیشه"""
+
+    def test_second_request_is_rejected(self):
+        membership = create_membership(session_left=5)
+        request_gym_entry(membership.customer, membership.gym)
+        with self.assertRaises(ValidationError):
+            request_gym_entry(membership.customer, membership.gym)
+
+        membership.refresh_from_db()
+        self.assertEqual(membership.session_left, 4)
+        self.assertEqual(open_inouts(membership.customer_id, membership.gym_id).count(), 1)
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentGymEntryRequestTests(LocalBackendsTransactionTestCase):
+    """
+    درخواست‌های همزمان یک مشتری پشت قفل ممبرشیپ (select_for_update) سریالی میشن:
+    فقط یکی ورود باز می‌سازه و فقط یک جلسه کم میشه. sqlite قفل سطر نداره و این تست رد میشه.
+    """
+
+    def test_concurrent_requests_create_one_entry(self):
+        membership = create_membership(session_left=5)
+        threads = 8
+        barrier = threading.Barrier(threads)
+        outcomes = []
+        lock = threading.Lock()
+
+        def worker():
+            barrier.wait()
+            try:
+                request_gym_entry(membership.customer, membership.gym)
+                outcome = 'created'
+            except ValidationError:
+                outcome = 'rejected'
+            except DatabaseError:
+                outcome = 'db_error'
+            finally:
+                connection.close()
+            with lock:
+                outcomes.append(outcome)
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+        membership.refresh_from_db()
+        self.assertEqual(outcomes.count('created'), 1)
+        self.assertEqual(outcomes.count('rejected'), threads - 1)
+        self.assertEqual(membership.session_left, 4)
+        self.assertEqual(open_inouts(membership.customer_id, membership.gym_id).count(), 1)
+
+
+def create_pending_entries(gym, count):
+    """count درخواست ورود در انتظار تایید از مشتری‌های جدا"""
+    return [
+        InOut.objects.create(
+            gym=gym,
+            customer=Customer.objects.create(
+                user=User.objects.create(phone=f"0930000{n:04}", full_name='customer'), gender='male'),
+        )
+        for n in range(count)
+    ]
+
+
+class CheckInAccessTests(LocalBackendsTestCase):
+    """دسترسی کارکنان داخل قفل صف پذیرش از دیتابیس بررسی میشه، نه از claim توکن"""
+
+    def setUp(self):
+        super().setUp()
+        self.gym = create_membership().gym
+        self.old_manager_user_id = self.gym.manager.user_id
+        self.entry, = create_pending_entries(self.gym, 1)
+
+    def test_manager_who_lost_the_gym_is_rejected(self):
+        new_manager = GymManager.objects.create(user=User.objects.create(phone='09140000000', full_name='new'))
+        Gym.objects.filter(id=self.gym.id).update(manager=new_manager)
+
+        # باشگاه هنوز در claim توکن مدیر قبلی هست
+        result = confirm_entries(self.old_manager_user_id, [self.gym.id], [self.entry.id])
+
+        self.assertEqual(result['ids'], [])
+        self.entry.refresh_from_db()
+        self.assertFalse(self.entry.confirm_in)
+        self.assertEqual(confirm_entries(new_manager.user_id, [self.gym.id], [self.entry.id])['ids'], [self.entry.id])
+
+    def test_current_manager_is_accepted(self):
+        result = confirm_entries(self.old_manager_user_id, [self.gym.id], [self.entry.id])
+        self.assertEqual(result['ids'], [self.entry.id])
+
+
+class CheckInClosetTests(LocalBackendsTestCase):
+    """هر کمد فقط به یک ورود باز داده میشه"""
+
+    def test_confirmed_entries_get_distinct_free_closets(self):
+        gym = create_membership().gym
+        closets = [Closet.objects.create(gym=gym, number=str(n)) for n in range(3)]
+        first, second = create_pending_entries(gym, 2)
+        InOut.objects.filter(id=first.id).update(closet=closets[0])
+
+        result = confirm_entries(gym.manager.user_id, [gym.id], [first.id, second.id])
+
+        assigned = {closet['id']: closet['closet'] for closet in result['closets']}
+        self.assertEqual(assigned, {first.id: closets[0].id, second.id: closets[1].id})
+
+
+@skipUnlessDBFeature('has_select_for_update_skip_locked')
+class ConcurrentClosetAllocationTests(LocalBackendsTransactionTestCase):
+    """کمدی که تراکنش همزمان قفل کرده (skip_locked) رد میشه و دو بار داده نمیشه"""
+
+    def test_locked_closet_is_skipped(self):
+        gym = create_membership().gym
+        locked, free = [Closet.objects.create(gym=gym, number=str(n)) for n in range(2)]
+        entry, = create_pending_entries(gym, 1)
+        holding, release = threading.Event(), threading.Event()
+
+        def hold_lock():
+            try:
+                with transaction.atomic():
+                    Closet.objects.select_for_update().get(id=locked.id)
+                    holding.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        try:
+            self.assertTrue(holding.wait(10))
+            result = confirm_entries(gym.manager.user_id, [gym.id], [entry.id])
+        finally:
+            release.set()
+            holder.join()
+
+        self.assertEqual(result['closets'], [{'id': entry.id, 'closet': free.id, 'number': free.number}])
+
+
+class EndpointQueryBudgetTests(EndpointBudgetTestsMixin, LocalBackendsTestCase):
+    route_prefix = 'gyms/'
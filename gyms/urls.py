@@ -6,6 +6,8 @@ urlpatterns = [
 
     # <=================== Customer Views ===================>
     path('customer/gyms/', views.CustomerPanelGymList.as_view(), name='customer-gym-list'),
+    path('customer/gyms/nearby/', views.CustomerPanelNearbyGymList.as_view(), name='customer-gym-nearby'),
+    path('customer/gyms/search/', views.CustomerPanelGymSearch.as_view(), name='customer-gym-search'),
     path('customer/gyms/<int:pk>/', views.CustomerPanelGymDetail.as_view(), name='customer-gym-detail'),
     path('customer/gyms/signed/', views.CustomerPanelSingedGymList.as_view(), name='customer-gym-list-signed'),
     path('customer/gyms/signed/<int:pk>/', views.CustomerPanelSignedGymDetail.as_view(), name='customer-gym-signed'),
@@ -21,6 +23,11 @@ urlpatterns = [
     # <=================== Gym Views ===================>
     path('gym-panel/gyms/', views.GymPanelGym.as_view(), name='gym-panel-gym'),
     path('gym-panel/gyms/<int:pk>/', views.GymPanelGymDetail.as_view(), name='gym-panel-gym-detail'),
+    path('gym-panel/occupancy/', views.GymPanelOccupancy.as_view(), name='gym-panel-occupancy'),
+    path('gym-panel/check-in/', views.GymPanelCheckInQueue.as_view(), name='gym-panel-check-in'),
+    path('gym-panel/check-in/confirm/', views.GymPanelCheckInConfirm.as_view(), name='gym-panel-check-in-confirm'),
+    path('gym-panel/check-in/reject/', views.GymPanelCheckInReject.as_view(), name='gym-panel-check-in-reject'),
+    path('gym-panel/check-in/checkout/', views.GymPanelCheckOut.as_view(), name='gym-panel-check-out'),
     path('gym-panel/membership-types/', views.GymPanelMemberShipType.as_view(),
          name='membershiptype'),
     path('gym-panel/membership-types/<int:pk>/', views.GymPanelMemberShipTypeDetail.as_view(),
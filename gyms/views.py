@@ -1,16 +1,30 @@
+from django.conf import settings
 from django.db.models import Q, Case, When, Value, IntegerField
 from django.utils.timezone import now
-from rest_framework import generics, status
-from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework import generics
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from accounts.auth import CustomJWTAuthentication
-from accounts.permissions import IsGymManager, IsPlatformAdmin
+from accounts.mixins import NotFoundOnEmptyListMixin
+from accounts.pagination import IdCursorPagination
+from accounts.principal import get_principal
+from accounts.permissions import IsGymManager, IsGymSecretary, IsPlatformAdmin
+from accounts.tokens import get_managed_gym_ids
+from gyms.checkin import checkout_entries, confirm_entries, pending_inouts, reject_entries
+from gyms.geo import nearby
 from gyms.models import Gym, MemberShip, InOut, MemberShipType, GymBanner
+from gyms.occupancy import inside_inouts, occupancy
+from gyms.search import normalize_persian, search_gyms
+from gyms.services import request_gym_entry
 from gyms.serializers import CustomerPanelGymSerializer, CustomerPanelMembershipSerializer, \
     CustomerPanelInOutRequestSerializer, CustomerPanelGymSerializer, CustomerPanelMemberShipCreateSerializer, \
     GymPanelGymSerializer, GymChoicesSerializer, GymPanelMemberShipTypeSerializer, GymPanelGymBannerSerializer, \
-    CustomerPanelSignedGymListSerializer, CustomerPanelInOutSerializer, AdminPanelGymListSerializer
+    CustomerPanelSignedGymListSerializer, CustomerPanelInOutSerializer, AdminPanelGymListSerializer, \
+    CustomerPanelNearbyGymSerializer, CustomerPanelNearbyGymQuerySerializer, CustomerPanelGymSearchSerializer, \
+    CustomerPanelGymSearchQuerySerializer, GymPanelOccupancySerializer, GymPanelCheckInEntrySerializer, \
+    GymPanelCheckInQuerySerializer, GymPanelCheckInActionSerializer, GymPanelCheckInConfirmSerializer, \
+    GymPanelCheckInResultSerializer
 
 
 # Create your views here.
@@ -27,41 +41,99 @@ class CustomerPanelGymList(generics.ListAPIView):
     serializer_class = CustomerPanelGymSerializer
     permission_classes = [IsAuthenticated]
     authentication_classes = [CustomJWTAuthentication]
+    pagination_class = IdCursorPagination
+    cursor_ordering = 'id'
 
     def get_queryset(self):
         customer = getattr(self.request.user, "customer", None)
         if not customer or not customer.gender:
             return Gym.objects.none()  # اگر جنسیت مشتری مشخص نبود
 
-        return Gym.objects.filter(
+        queryset = Gym.objects.filter(
             Q(gender="both") | Q(gender=customer.gender)
+        ).order_by('id')
+        return CustomerPanelGymSerializer.setup_eager_loading(queryset, customer)
+
+
+class CustomerPanelNearbyGymList(generics.ListAPIView):
+    """باشگاه‌های فعال داخل شعاع radius (کیلومتر) از نقطه lat/lng به ترتیب فاصله"""
+    serializer_class = CustomerPanelNearbyGymSerializer
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [CustomJWTAuthentication]
+    pagination_class = IdCursorPagination
+    cursor_ordering = ('distance', 'id')
+
+    def get_queryset(self):
+        customer = getattr(self.request.user, "customer", None)
+        if not customer or not customer.gender:
+            return Gym.objects.none()
+
+        params = CustomerPanelNearbyGymQuerySerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        radius = params.validated_data.get('radius', getattr(settings, 'GYM_NEARBY_DEFAULT_RADIUS_KM', 5))
+        queryset = nearby(
+            Gym.objects.filter(Q(gender="both") | Q(gender=customer.gender), is_active=True),
+            params.validated_data['lat'], params.validated_data['lng'], radius,
+        )
+        return CustomerPanelNearbyGymSerializer.setup_eager_loading(queryset, customer)
+
+
+class CustomerPanelGymSearch(generics.ListAPIView):
+    """
+    جستجوی باشگاه‌های فعال: متن (q)، امکانات (همه تگ‌ها)، جنسیت، شهر و بازه قیمت نوع عضویت.
+    با q به ترتیب امتیاز و بدون آن به ترتیب id؛ کل صفحه با یک کوئری.
+    """
+    serializer_class = CustomerPanelGymSearchSerializer
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [CustomJWTAuthentication]
+    pagination_class = IdCursorPagination
+
+    @property
+    def cursor_ordering(self):
+        return ('-rank', 'id') if normalize_persian(self.request.query_params.get('q')) else 'id'
+
+    def get_queryset(self):
+        params = CustomerPanelGymSearchQuerySerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+
+        customer = getattr(self.request.user, "customer", None)
+        gender = data.get('gender') or getattr(customer, 'gender', None)
+        facilities = data['facilities'].split(',') if data.get('facilities') else None
+        return search_gyms(
+            Gym.objects.filter(is_active=True).defer('search_text', 'search_vector'),
+            query=data.get('q'),
+            facilities=facilities,
+            gender=gender,
+            city=data.get('city'),
+            min_price=data.get('min_price'),
+            max_price=data.get('max_price'),
         )
 
 
 class CustomerPanelGymDetail(generics.RetrieveAPIView):
-    queryset = Gym.objects.filter(is_active=True)
     serializer_class = CustomerPanelGymSerializer
     permission_classes = [IsAuthenticated]
     authentication_classes = [CustomJWTAuthentication]
 
+    def get_queryset(self):
+        customer = getattr(self.request.user, "customer", None)
+        return CustomerPanelGymSerializer.setup_eager_loading(Gym.objects.filter(is_active=True), customer)
+
 
-class CustomerPanelSingedGymList(generics.ListAPIView):
+class CustomerPanelSingedGymList(NotFoundOnEmptyListMixin, generics.ListAPIView):
     serializer_class = CustomerPanelSignedGymListSerializer
     permission_classes = [IsAuthenticated]
     authentication_classes = [CustomJWTAuthentication]
+    # لیست کوچک و محدود به یک مشتری؛ مثل قبل بدون صفحه‌بندی
+    pagination_class = None
+    empty_list_message = "هیچ باشگاهی ثبت نام نشده است"
 
     def get_queryset(self):
-        customer = getattr(self.request.user, "customer", None)
-        if not customer:
+        principal = get_principal(self.request.user)
+        if principal is None or not principal.is_customer:
             return Gym.objects.none()
-        return Gym.objects.filter(memberships__customer=customer, is_active=True).distinct()
-
-    def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        if not queryset.exists():
-            raise NotFound(detail="هیچ باشگاهی ثبت نام نشده است")
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Gym.objects.filter(memberships__customer_id=principal.customer_id, is_active=True).distinct()
 
 
 class CustomerPanelSignedGymDetail(generics.RetrieveAPIView):
@@ -73,7 +145,8 @@ class CustomerPanelSignedGymDetail(generics.RetrieveAPIView):
         customer = getattr(self.request.user, "customer", None)
         if not customer:
             return Gym.objects.none()
-        return Gym.objects.filter(memberships__customer=customer, is_active=True).distinct()
+        queryset = Gym.objects.filter(memberships__customer=customer, is_active=True).distinct()
+        return CustomerPanelGymSerializer.setup_eager_loading(queryset, customer)
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -87,43 +160,15 @@ class CustomerPanelRequestGymEntry(generics.CreateAPIView):
     authentication_classes = [CustomJWTAuthentication]
 
     def perform_create(self, serializer):
-        user = self.request.user
-        customer = getattr(user, "customer", None)
+        customer = getattr(self.request.user, "customer", None)
         if not customer:
             raise ValidationError("فقط مشتریان می‌توانند درخواست ورود بدهند.")
 
-        gym_id = self.request.data.get("gym")
-        if not gym_id:
+        gym = serializer.validated_data.get("gym")
+        if not gym:
             raise ValidationError("باشگاه الزامی است.")
 
-        try:
-            gym = Gym.objects.get(id=gym_id)
-        except Gym.DoesNotExist:
-            raise ValidationError("باشگاه مورد نظر یافت نشد.")
-
-        # بررسی InOut باز
-        if InOut.objects.filter(
-                customer=customer,
-                gym=gym
-        ).filter(
-            Q(confirm_in=False) |
-            Q(enter_time__isnull=False, out_time__isnull=True)
-        ).exists():
-            raise ValidationError("شما یک درخواست ورود فعال دارید، تا زمان خروج نمی‌توانید درخواست جدید ثبت کنید.")
-
-        # بررسی ممبرشیپ فعال
-        membership = MemberShip.objects.filter(
-            customer=customer,
-            gym=gym,
-            session_left__gt=0,
-            validity_date__gte=now().date()
-        ).first()
-
-        if not membership:
-            raise ValidationError("شما ممبرشیپ فعال برای این باشگاه ندارید.")
-
-        # ساخت رکورد
-        serializer.save(customer=customer, gym=gym, subscription=membership)
+        serializer.instance = request_gym_entry(customer, gym, closet=serializer.validated_data.get("closet"))
 
 
 class CustomerPanelMembershipListView(generics.ListAPIView):
@@ -140,14 +185,14 @@ class CustomerPanelMembershipListView(generics.ListAPIView):
 
             # Annotate با status عددی برای مرتب‌سازی
             queryset = queryset.annotate(
-                is_active=Case(
-                    When(session_left__gt=0, validity_date__gte=today, then=Value(1)),
+                active_rank=Case(
+                    When(active_until__gte=today, then=Value(1)),
                     default=Value(0),
                     output_field=IntegerField()
                 )
-            ).order_by('-is_active', 'validity_date')
+            ).order_by('-active_rank', 'validity_date')
 
-            return queryset
+            return CustomerPanelMembershipSerializer.setup_eager_loading(queryset)
 
 
 class CustomerPanelMembershipDetailView(generics.RetrieveAPIView):
@@ -165,14 +210,14 @@ class CustomerPanelMembershipDetailView(generics.RetrieveAPIView):
 
             # Annotate با status عددی برای مرتب‌سازی
             queryset = queryset.annotate(
-                is_active=Case(
-                    When(session_left__gt=0, validity_date__gte=today, then=Value(1)),
+                active_rank=Case(
+                    When(active_until__gte=today, then=Value(1)),
                     default=Value(0),
                     output_field=IntegerField()
                 )
-            ).order_by('-is_active', 'validity_date')
+            ).order_by('-active_rank', 'validity_date')
 
-            return queryset
+            return CustomerPanelMembershipSerializer.setup_eager_loading(queryset)
 
 
 class CustomerMembershipSignUp(generics.CreateAPIView):
@@ -186,12 +231,13 @@ class CustomerPanelInOutList(generics.ListAPIView):
     serializer_class = CustomerPanelInOutSerializer
     permission_classes = [IsAuthenticated]
     authentication_classes = [CustomJWTAuthentication]
+    pagination_class = IdCursorPagination
 
     def get_queryset(self):
         if hasattr(self.request.user, "customer"):
             customer = self.request.user.customer
             qs = InOut.objects.filter(customer=customer, confirm_in=True)
-            return qs
+            return CustomerPanelInOutSerializer.setup_eager_loading(qs)
         return None
 
 
@@ -202,7 +248,80 @@ class GymPanelGym(generics.ListCreateAPIView):
     authentication_classes = [CustomJWTAuthentication]
 
     def get_queryset(self):
-        return Gym.objects.filter(manager__user=self.request.user)
+        return GymPanelGymSerializer.setup_eager_loading(Gym.objects.filter(manager__user=self.request.user))
+
+
+class GymPanelOccupancy(generics.GenericAPIView):
+    """
+    تعداد افراد داخل باشگاه‌های مدیر/منشی از شمارنده Redis (بدون شمارش InOut).
+    به‌روزرسانی‌های بعدی با رویداد occupancy روی WebSocket (ws/notifications/) push میشن.
+    """
+    serializer_class = GymPanelOccupancySerializer
+    permission_classes = [IsAuthenticated, IsGymManager | IsGymSecretary]
+    authentication_classes = [CustomJWTAuthentication]
+    pagination_class = None
+
+    def get(self, request, *args, **kwargs):
+        counts = occupancy.counts(get_managed_gym_ids(request))
+        serializer = self.get_serializer(
+            [{'gym_id': gym_id, 'in_gym': count} for gym_id, count in counts.items()], many=True
+        )
+        return Response(serializer.data)
+
+
+class GymPanelCheckInQueue(generics.ListAPIView):
+    """
+    صف میز پذیرش: درخواست‌های ورود در انتظار تایید (status=pending) یا افراد داخل باشگاه (status=inside)
+    به ترتیب ثبت. تغییرات صف با رویداد checkin_queue روی WebSocket (ws/notifications/) push میشن.
+    """
+    serializer_class = GymPanelCheckInEntrySerializer
+    permission_classes = [IsAuthenticated, IsGymManager | IsGymSecretary]
+    authentication_classes = [CustomJWTAuthentication]
+    pagination_class = IdCursorPagination
+    cursor_ordering = 'id'
+
+    def get_queryset(self):
+        params = GymPanelCheckInQuerySerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        gym_ids = get_managed_gym_ids(self.request)
+        if 'gym' in params.validated_data:
+            gym_ids = [gym_id for gym_id in gym_ids if gym_id == params.validated_data['gym']]
+
+        queryset = pending_inouts() if params.validated_data['status'] == 'pending' else inside_inouts()
+        return GymPanelCheckInEntrySerializer.setup_eager_loading(queryset.filter(gym_id__in=gym_ids))
+
+
+class GymPanelCheckInAction(generics.GenericAPIView):
+    """پایه عملیات گروهی صف پذیرش؛ شناسه‌هایی که در وضعیت مناسب نیستن یا مال باشگاه دیگه‌ای هستن نادیده گرفته میشن"""
+    serializer_class = GymPanelCheckInActionSerializer
+    permission_classes = [IsAuthenticated, IsGymManager | IsGymSecretary]
+    authentication_classes = [CustomJWTAuthentication]
+    perform_action = None
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        result = self.perform_action(request.user.id, get_managed_gym_ids(request), **serializer.validated_data)
+        return Response(GymPanelCheckInResultSerializer(result).data)
+
+
+class GymPanelCheckInConfirm(GymPanelCheckInAction):
+    """
+{
+    "ids": [12, 13, 15],
+    "assign_closets": true
+}
+    """
+    serializer_class = GymPanelCheckInConfirmSerializer
+    perform_action = staticmethod(confirm_entries)
+
+
+class GymPanelCheckInReject(GymPanelCheckInAction):
+    perform_action = staticmethod(reject_entries)
+
+
+class GymPanelCheckOut(GymPanelCheckInAction):
+    perform_action = staticmethod(checkout_entries)
 
 
 class GymPanelGymDetail(generics.RetrieveUpdateAPIView):
@@ -223,7 +342,8 @@ class GymPanelGymDetail(generics.RetrieveUpdateAPIView):
     authentication_classes = [CustomJWTAuthentication]
 
     def get_queryset(self):
-        return Gym.objects.filter(manager__user=self.request.user)
+        # تصاویر prefetch نمیشن چون update همان نمونه رو بعد از تغییر تصاویر برمی‌گردونه
+        return Gym.objects.filter(manager__user=self.request.user).select_related('stats')
 
     def perform_update(self, serializer):
         gym = serializer.save()
@@ -239,7 +359,8 @@ class GymPanelMemberShipType(generics.ListCreateAPIView):
         """
         فقط عضویت‌هایی که مربوط به باشگاه‌های متعلق به مدیر فعلی هستند
         """
-        return MemberShipType.objects.filter(gyms__manager__user=self.request.user)
+        return GymPanelMemberShipTypeSerializer.setup_eager_loading(
+            MemberShipType.objects.filter(gyms__manager__user=self.request.user))
 
 
 class GymPanelMemberShipTypeDetail(generics.RetrieveUpdateDestroyAPIView):
@@ -263,7 +384,8 @@ class GymPanelGymBanner(generics.ListCreateAPIView):
         """
         فقط بنرهای مربوط به باشگاه‌های متعلق به مدیر فعلی
         """
-        return GymBanner.objects.filter(gym__manager__user=self.request.user)
+        return GymPanelGymBannerSerializer.setup_eager_loading(
+            GymBanner.objects.filter(gym__manager__user=self.request.user))
 
 
 class GymPanelGymBannerDetail(generics.RetrieveUpdateDestroyAPIView):
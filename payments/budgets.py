@@ -0,0 +1,25 @@
+"""
+بودجه کوئری مسیرهای GET اپ payments؛ در payments.tests بررسی و در گزارش benchmark_endpoints نوشته میشه.
+ساختار جدول‌ها و روش اضافه کردن مسیر جدید مثل accounts.budgets است.
+"""
+from accounts.benchmark import DEFAULT_P95_BUDGET_MS
+from payments.models import Transaction
+
+# نام طرفین از snapshot خونده میشه
+ENDPOINT_BUDGETS = {
+    'payments/customer/transactions/': (1, DEFAULT_P95_BUDGET_MS),
+    'payments/gym-panel/transactions/deposits/': (1, DEFAULT_P95_BUDGET_MS),
+    'payments/gym-panel/transactions/withdrawals/': (1, DEFAULT_P95_BUDGET_MS),
+    'payments/admin-panel/transactions/in/': (1, DEFAULT_P95_BUDGET_MS),
+    'payments/admin-panel/transactions/out/': (1, DEFAULT_P95_BUDGET_MS),
+    'payments/admin-panel/transactions/commissions/': (1, DEFAULT_P95_BUDGET_MS),
+}
+
+PK_RESOLVERS = {
+    'payments/admin-panel/transactions/<int:pk>/':
+        lambda ctx: Transaction.objects.values_list('id', flat=True).last(),
+}
+
+ROUTE_QUERIES = {}
+
+EXPECTED_STATUS = {}
@@ -0,0 +1,89 @@
+import json
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+
+from accounts.benchmark import seed_benchmark_data
+from accounts.models import User
+from gyms.models import MemberShip, InOut
+from payments.models import Transaction
+from payments.parties import DIRECTION_IN, DIRECTION_COMMISSION
+
+# عبارت‌هایی که در خروجی EXPLAIN نشان‌دهنده استفاده از ایندکس هستن
+INDEX_MARKERS = {
+    'postgresql': ('Index Scan', 'Index Only Scan', 'Bitmap Index Scan'),
+    'sqlite': ('USING INDEX', 'USING COVERING INDEX', 'USING INTEGER PRIMARY KEY'),
+}
+
+
+def hot_queries():
+    """پرتکرارترین کوئری‌ها با پارامترهای واقعی از دیتابیس"""
+    membership = MemberShip.objects.order_by('-id').first()
+    inout = InOut.objects.order_by('-id').first()
+    user_ct = ContentType.objects.get_for_model(User)
+    payer_id = Transaction.objects.filter(payer_content_type=user_ct).values_list('payer_object_id', flat=True).last()
+    receiver_id = Transaction.objects.filter(receiver_content_type=user_ct).values_list(
+        'receiver_object_id', flat=True).last()
+    if membership is None or inout is None:
+        raise CommandError("دیتابیس خالیه؛ با --seed اجرا کنید.")
+
+    return {
+        'active_membership': MemberShip.objects.active().filter(
+            customer_id=membership.customer_id, gym_id=membership.gym_id),
+        'announcement_memberships': MemberShip.objects.active().filter(customer_id=membership.customer_id),
+        'open_inout': InOut.objects.filter(
+            customer_id=inout.customer_id, gym_id=inout.gym_id, out_time__isnull=True
+        ).filter(Q(confirm_in=False) | Q(enter_time__isnull=False)),
+        'payer_transactions': Transaction.objects.filter(
+            payer_content_type=user_ct, payer_object_id=payer_id).order_by('-id')[:10],
+        'receiver_transactions': Transaction.objects.filter(
+            receiver_content_type=user_ct, receiver_object_id=receiver_id).order_by('-id')[:10],
+        'in_transactions': Transaction.objects.filter(direction=DIRECTION_IN).order_by('-id')[:10],
+        'commission_transactions': Transaction.objects.filter(direction=DIRECTION_COMMISSION).order_by('-id')[:10],
+    }
+
+
+class Command(BaseCommand):
+    help = "روی کوئری‌های پرتکرار EXPLAIN اجرا می‌کنه و گزارش میده هر کدوم از ایندکس استفاده می‌کنه یا نه."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', action='store_true', help="قبل از EXPLAIN دیتای بنچمارک ساخته بشه (rollback میشه)")
+        parser.add_argument('--gyms', type=int, default=1000)
+        parser.add_argument('--customers', type=int, default=5000)
+        parser.add_argument('--json', action='store_true', help="خروجی به صورت JSON")
+        parser.add_argument('--verbose-plan', action='store_true', help="نمایش کامل plan")
+
+    def handle(self, *args, **options):
+        markers = INDEX_MARKERS.get(connection.vendor)
+        if markers is None:
+            raise CommandError(f"EXPLAIN برای دیتابیس {connection.vendor} پشتیبانی نمیشه.")
+
+        with transaction.atomic():
+            if options['seed']:
+                seed_benchmark_data(gyms=options['gyms'], customers=options['customers'])
+                if connection.vendor == 'postgresql':
+                    with connection.cursor() as cursor:
+                        cursor.execute('ANALYZE')
+
+            results = []
+            for name, queryset in hot_queries().items():
+                plan = queryset.explain()
+                results.append({
+                    'query': name,
+                    'uses_index': any(marker in plan for marker in markers),
+                    'plan': plan,
+                })
+            transaction.set_rollback(True)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        for result in results:
+            flag = 'index' if result['uses_index'] else 'SCAN '
+            self.stdout.write(f"{flag}  {result['query']}")
+            if options['verbose_plan'] or not result['uses_index']:
+                for line in result['plan'].splitlines():
+                    self.stdout.write(f"       {line}")
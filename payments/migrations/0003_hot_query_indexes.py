@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-17 17:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('payments', '0002_remove_transaction_payer_remove_transaction_receiver_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['payer_content_type', 'payer_object_id', '-id'], name='tx_payer_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['receiver_content_type', 'receiver_object_id', '-id'], name='tx_receiver_idx'),
+        ),
+    ]
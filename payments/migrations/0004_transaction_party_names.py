@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-17 17:19
+
+from django.db import migrations, models
+
+PLATFORM_NAME = "پلتفرم فیتنو"
+
+
+def fill_party_names(apps, schema_editor):
+    Transaction = apps.get_model('payments', 'Transaction')
+    User = apps.get_model('accounts', 'User')
+    for role in ('payer', 'receiver'):
+        user_rows = Transaction.objects.filter(**{
+            f'{role}_content_type__app_label': 'accounts', f'{role}_content_type__model': 'user',
+        })
+        user_rows.update(**{f'{role}_name': models.Subquery(
+            User.objects.filter(id=models.OuterRef(f'{role}_object_id')).values('full_name')[:1]
+        )})
+        Transaction.objects.filter(**{
+            f'{role}_content_type__app_label': 'accounts', f'{role}_content_type__model': 'platformsettings',
+        }).update(**{f'{role}_name': PLATFORM_NAME})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_hot_query_indexes'),
+        ('accounts', '0012_user_role_version'),
+        ('contenttypes', '0002_remove_content_type_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='payer_name',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='receiver_name',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.RunPython(fill_party_names, migrations.RunPython.noop),
+    ]
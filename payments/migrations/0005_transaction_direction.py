@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-17 17:20
+
+from django.db import migrations, models
+
+
+def fill_direction(apps, schema_editor):
+    Transaction = apps.get_model('payments', 'Transaction')
+    Customer = apps.get_model('accounts', 'Customer')
+    GymManager = apps.get_model('accounts', 'GymManager')
+    Transaction.objects.filter(is_commission=True).update(direction='commission')
+    Transaction.objects.filter(
+        is_commission=False, payer_content_type__app_label='accounts', payer_content_type__model='user',
+        payer_object_id__in=Customer.objects.values('user_id'),
+    ).update(direction='in')
+    Transaction.objects.filter(
+        is_commission=False, direction__isnull=True,
+        payer_content_type__app_label='accounts', payer_content_type__model='platformsettings',
+        receiver_content_type__app_label='accounts', receiver_content_type__model='user',
+        receiver_object_id__in=GymManager.objects.values('user_id'),
+    ).update(direction='out')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('payments', '0004_transaction_party_names'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='direction',
+            field=models.CharField(blank=True, choices=[('in', 'ورودی از مشتری'), ('out', 'خروجی به باشگاه'), ('commission', 'کمیسیون')], max_length=20, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['direction', '-id'], name='tx_direction_idx'),
+        ),
+        migrations.RunPython(fill_direction, migrations.RunPython.noop),
+    ]
@@ -3,6 +3,7 @@ from django.contrib.contenttypes.models import ContentType
 from django.db import models
 
 from accounts.models import User
+from payments.parties import party_name, transaction_direction, DIRECTION_CHOICES
 
 
 # Create your models here.
@@ -17,6 +18,10 @@ class Transaction(models.Model):
     receiver_object_id = models.PositiveIntegerField(null=True)
     receiver = GenericForeignKey('receiver_content_type', 'receiver_object_id')
 
+    # snapshot نام طرفین در زمان ثبت تراکنش (لیست‌ها بدون resolve کردن GFK)
+    payer_name = models.CharField(max_length=255, null=True, blank=True)
+    receiver_name = models.CharField(max_length=255, null=True, blank=True)
+
     payment_method = models.CharField(
         max_length=100,
         choices=(('online', 'آنلاین'), ('cash', 'نقدی')),
@@ -25,7 +30,26 @@ class Transaction(models.Model):
     online_transaction = models.CharField(max_length=255, blank=True, null=True)
     price = models.IntegerField(default=0)
     is_commission = models.BooleanField(default=False)
+    # جهت تراکنش (ورودی از مشتری، خروجی به باشگاه، کمیسیون) که در save محاسبه میشه
+    direction = models.CharField(max_length=20, choices=DIRECTION_CHOICES, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['payer_content_type', 'payer_object_id', '-id'], name='tx_payer_idx'),
+            models.Index(fields=['receiver_content_type', 'receiver_object_id', '-id'], name='tx_receiver_idx'),
+            # لیست‌های ادمین (ورودی/خروجی/کمیسیون) به صورت range scan روی (direction, -id)
+            models.Index(fields=['direction', '-id'], name='tx_direction_idx'),
+        ]
+
     def __str__(self):
         return f"Tx {self.id} - {self.price}"
+
+    def save(self, *args, **kwargs):
+        if self.payer_name is None and self.payer_object_id is not None:
+            self.payer_name = party_name(self.payer)
+        if self.receiver_name is None and self.receiver_object_id is not None:
+            self.receiver_name = party_name(self.receiver)
+        if self.direction is None:
+            self.direction = transaction_direction(self)
+        super().save(*args, **kwargs)
@@ -0,0 +1,94 @@
+"""
+نام طرفین تراکنش (پرداخت‌کننده و دریافت‌کننده) بدون resolve کردن GenericForeignKey برای هر ردیف.
+اول از ستون‌های snapshot (payer_name/receiver_name) خونده میشه؛ ردیف‌هایی که snapshot ندارن
+برای کل صفحه با یک کوئری به ازای هر content type resolve میشن.
+جهت تراکنش (direction) هم در زمان ثبت از روی طرفین تعیین میشه.
+"""
+from collections import defaultdict
+
+from django.contrib.contenttypes.models import ContentType
+
+from accounts.models import User, PlatformSettings, Customer, GymManager
+
+PLATFORM_NAME = "پلتفرم فیتنو"
+ROLES = ('payer', 'receiver')
+
+DIRECTION_IN = 'in'
+DIRECTION_OUT = 'out'
+DIRECTION_COMMISSION = 'commission'
+DIRECTION_CHOICES = (
+    (DIRECTION_IN, 'ورودی از مشتری'),
+    (DIRECTION_OUT, 'خروجی به باشگاه'),
+    (DIRECTION_COMMISSION, 'کمیسیون'),
+)
+
+
+def party_name(party):
+    if isinstance(party, User):
+        return party.full_name
+    if isinstance(party, PlatformSettings):
+        return PLATFORM_NAME
+    return None
+
+
+def party_type(transaction, role):
+    """نام مدل طرف تراکنش از کش ContentType (بدون کوئری)"""
+    content_type_id = getattr(transaction, f"{role}_content_type_id")
+    if content_type_id is None:
+        return None
+    return ContentType.objects.get_for_id(content_type_id).model
+
+
+def is_user_party(transaction, role):
+    return party_type(transaction, role) == User._meta.model_name
+
+
+def resolve_parties(transactions):
+    """
+    برای تراکنش‌هایی که snapshot نام ندارن، طرفین رو دسته‌ای لود می‌کنه و نام رو روی خود آبجکت می‌ذاره.
+    تعداد کوئری برابر تعداد content type های متمایز بدون snapshot است (نه تعداد ردیف‌ها).
+    """
+    pending = defaultdict(list)
+    for transaction in transactions:
+        for role in ROLES:
+            object_id = getattr(transaction, f"{role}_object_id")
+            content_type_id = getattr(transaction, f"{role}_content_type_id")
+            if getattr(transaction, f"{role}_name") is None and object_id is not None and content_type_id:
+                pending[content_type_id].append((transaction, role, object_id))
+
+    for content_type_id, rows in pending.items():
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        if model is None:
+            continue
+        queryset = model._base_manager.all()
+        if model is User:
+            queryset = queryset.only('id', 'full_name')
+        parties = queryset.in_bulk({object_id for _, _, object_id in rows})
+        for transaction, role, object_id in rows:
+            setattr(transaction, f"{role}_name", party_name(parties.get(object_id)))
+    return transactions
+
+
+def get_party_name(transaction, role):
+    """نام طرف تراکنش؛ برای تک آبجکت‌های بدون snapshot یک کوئری"""
+    name = getattr(transaction, f"{role}_name")
+    if name is None and getattr(transaction, f"{role}_object_id") is not None:
+        resolve_parties([transaction])
+        name = getattr(transaction, f"{role}_name")
+    return name
+
+
+def transaction_direction(transaction):
+    """
+    جهت تراکنش از دید پلتفرم؛ در زمان ثبت محاسبه و در ستون direction ذخیره میشه.
+    کمیسیون: is_commission / ورودی: پرداخت‌کننده مشتری / خروجی: از پلتفرم به مدیر باشگاه
+    """
+    if transaction.is_commission:
+        return DIRECTION_COMMISSION
+    if is_user_party(transaction, 'payer') and Customer.objects.filter(user_id=transaction.payer_object_id).exists():
+        return DIRECTION_IN
+    if (party_type(transaction, 'payer') == PlatformSettings._meta.model_name
+            and is_user_party(transaction, 'receiver')
+            and GymManager.objects.filter(user_id=transaction.receiver_object_id).exists()):
+        return DIRECTION_OUT
+    return None
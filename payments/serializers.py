@@ -1,6 +1,15 @@
 from rest_framework import serializers
-from accounts.models import User, PlatformSettings
 from payments.models import Transaction
+from payments.parties import resolve_parties, get_party_name, party_type, is_user_party
+
+
+class TransactionListSerializer(serializers.ListSerializer):
+    """قبل از سریالایز کردن صفحه، نام طرفین همه تراکنش‌ها یک جا resolve میشه"""
+
+    def to_representation(self, data):
+        transactions = list(data.all() if hasattr(data, 'all') else data)
+        resolve_parties(transactions)
+        return super().to_representation(transactions)
 
 
 # <=================== Customer Views ===================>
@@ -12,6 +21,7 @@ class CustomerPanelTransactionSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Transaction
+        list_serializer_class = TransactionListSerializer
         fields = [
             'id',
             'payer_id',
@@ -25,28 +35,16 @@ class CustomerPanelTransactionSerializer(serializers.ModelSerializer):
 
     # 🟢 متدهای پویا برای تشخیص مدل و برگرداندن فیلد مناسب
     def get_payer_id(self, obj):
-        if obj.payer:
-            return getattr(obj.payer, 'id', None)
-        return None
+        return obj.payer_object_id
 
     def get_payer_name(self, obj):
-        if isinstance(obj.payer, User):
-            return getattr(obj.payer, 'full_name', str(obj.payer))
-        elif isinstance(obj.payer, PlatformSettings):
-            return "پلتفرم فیتنو"
-        return None
+        return get_party_name(obj, 'payer')
 
     def get_receiver_id(self, obj):
-        if obj.receiver:
-            return getattr(obj.receiver, 'id', None)
-        return None
+        return obj.receiver_object_id
 
     def get_receiver_name(self, obj):
-        if isinstance(obj.receiver, User):
-            return getattr(obj.receiver, 'full_name', str(obj.receiver))
-        elif isinstance(obj.receiver, PlatformSettings):
-            return "پلتفرم فیتنو"
-        return None
+        return get_party_name(obj, 'receiver')
 
 
 # <=================== Gym Views ===================>
@@ -57,6 +55,7 @@ class GymPanelTransactionSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Transaction
+        list_serializer_class = TransactionListSerializer
         fields = [
             'id',
             'price',
@@ -67,21 +66,17 @@ class GymPanelTransactionSerializer(serializers.ModelSerializer):
             'membership'
         ]
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('membership__customer__user', 'membership__gym', 'membership__type')
+
     # 🟢 نام پرداخت‌کننده
     def get_payer_name(self, obj):
-        if isinstance(obj.payer, User):
-            return getattr(obj.payer, 'full_name', str(obj.payer))
-        elif isinstance(obj.payer, PlatformSettings):
-            return "پلتفرم فیتنو"
-        return None
+        return get_party_name(obj, 'payer')
 
     # 🟢 نام دریافت‌کننده
     def get_receiver_name(self, obj):
-        if isinstance(obj.receiver, User):
-            return getattr(obj.receiver, 'full_name', str(obj.receiver))
-        elif isinstance(obj.receiver, PlatformSettings):
-            return "پلتفرم فیتنو"
-        return None
+        return get_party_name(obj, 'receiver')
 
     # 🟢 اطلاعات عضویت (در صورت وجود)
     def get_membership(self, obj):
@@ -104,14 +99,11 @@ class AdminPanelInTransactionListSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Transaction
+        list_serializer_class = TransactionListSerializer
         fields = ['id', 'payer_name', 'price', 'created_at']
 
     def get_payer_name(self, obj):
-        if isinstance(obj.payer, User):
-            return getattr(obj.payer, 'full_name', str(obj.payer))
-        elif isinstance(obj.payer, PlatformSettings):
-            return "پلتفرم فیتنو"
-        return "-"
+        return get_party_name(obj, 'payer') or "-"
 
 
 class AdminPanelOutTransactionListSerializer(serializers.ModelSerializer):
@@ -119,14 +111,11 @@ class AdminPanelOutTransactionListSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Transaction
+        list_serializer_class = TransactionListSerializer
         fields = ['id', 'receiver_name', 'price', 'created_at']
 
     def get_receiver_name(self, obj):
-        if isinstance(obj.receiver, User):
-            return getattr(obj.receiver, 'full_name', str(obj.receiver))
-        elif isinstance(obj.receiver, PlatformSettings):
-            return "پلتفرم فیتنو"
-        return "-"
+        return get_party_name(obj, 'receiver') or "-"
 
 
 class AdminPanelCommissionTransactionListSerializer(serializers.ModelSerializer):
@@ -135,11 +124,16 @@ class AdminPanelCommissionTransactionListSerializer(serializers.ModelSerializer)
 
     class Meta:
         model = Transaction
+        list_serializer_class = TransactionListSerializer
         fields = ['id', 'gym_name', 'payer_name', 'price', 'created_at']
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('membership__gym')
+
     def get_payer_name(self, obj):
-        if isinstance(obj.payer, User):
-            return getattr(obj.payer, 'full_name', str(obj.payer))
+        if is_user_party(obj, 'payer'):
+            return get_party_name(obj, 'payer')
         return "-"
 
     def get_gym_name(self, obj):
@@ -158,6 +152,7 @@ class AdminPanelTransactionSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Transaction
+        list_serializer_class = TransactionListSerializer
         fields = [
             'id',
             'price',
@@ -171,21 +166,13 @@ class AdminPanelTransactionSerializer(serializers.ModelSerializer):
         ]
 
     def get_payer_type(self, obj):
-        return obj.payer_content_type.model if obj.payer_content_type else None
+        return party_type(obj, 'payer')
 
     def get_receiver_type(self, obj):
-        return obj.receiver_content_type.model if obj.receiver_content_type else None
+        return party_type(obj, 'receiver')
 
     def get_payer_name(self, obj):
-        if isinstance(obj.payer, User):
-            return getattr(obj.payer, 'full_name', str(obj.payer))
-        elif isinstance(obj.payer, PlatformSettings):
-            return "پلتفرم فیتنو"
-        return None
+        return get_party_name(obj, 'payer')
 
     def get_receiver_name(self, obj):
-        if isinstance(obj.receiver, User):
-            return getattr(obj.receiver, 'full_name', str(obj.receiver))
-        elif isinstance(obj.receiver, PlatformSettings):
-            return "پلتفرم فیتنو"
-        return None
+        return get_party_name(obj, 'receiver')
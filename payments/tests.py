@@ -1,3 +1,22 @@
-from django.test import TestCase
+from accounts.benchmark import seed_benchmark_data
+from accounts.testing import EndpointBudgetTestsMixin, LocalBackendsTestCase
+from payments.models import Transaction
 
-# Create your tests here.
+
+class CustomerTransactionListQueryTests(LocalBackendsTestCase):
+    """لیست تراکنش‌های مشتری (NotFoundOnEmptyListMixin) صفحه رو یک بار ارزیابی می‌کنه و exists() جدا نمی‌زنه"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ctx = seed_benchmark_data(gyms=5, customers=10)
+
+    def test_customer_transactions(self):
+        self.assert_get_queries(self.ctx, 'payments/customer/transactions/', 1)
+
+    def test_empty_transactions_is_not_found_with_one_query(self):
+        Transaction.objects.filter(payer_object_id=self.ctx['customer_user'].id).delete()
+        self.assert_get_queries(self.ctx, 'payments/customer/transactions/', 1, status=404)
+
+
+class EndpointQueryBudgetTests(EndpointBudgetTestsMixin, LocalBackendsTestCase):
+    route_prefix = 'payments/'
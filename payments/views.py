@@ -1,13 +1,13 @@
 from django.contrib.contenttypes.models import ContentType
-from rest_framework import generics, status
+from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.response import Response
-from django.http import Http404
 
-from accounts.models import User, PlatformSettings
+from accounts.mixins import NotFoundOnEmptyListMixin
+from accounts.pagination import IdCursorPagination
+from accounts.models import User
 from accounts.permissions import IsGymManager
-from gyms.models import Gym, MemberShip
 from payments.models import Transaction
+from payments.parties import DIRECTION_IN, DIRECTION_OUT, DIRECTION_COMMISSION
 from payments.serializers import CustomerPanelTransactionSerializer, GymPanelTransactionSerializer, \
     AdminPanelTransactionSerializer, AdminPanelInTransactionListSerializer, AdminPanelOutTransactionListSerializer, \
     AdminPanelCommissionTransactionListSerializer
@@ -17,20 +17,16 @@ from accounts.auth import CustomJWTAuthentication
 # Create your views here.
 
 # <=================== Customer Views ===================>
-class CustomerPanelTransactionsListView(generics.ListAPIView):
+class CustomerPanelTransactionsListView(NotFoundOnEmptyListMixin, generics.ListAPIView):
     serializer_class = CustomerPanelTransactionSerializer
     permission_classes = [IsAuthenticated]
     authentication_classes = [CustomJWTAuthentication]
+    pagination_class = IdCursorPagination
+    empty_list_message = "تراکنشی برای این کاربر یافت نشد"
 
     def get_queryset(self):
-        return Transaction.objects.filter(payer=self.request.user).order_by('-id')
-
-    def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        if not queryset.exists():
-            raise Http404("تراکنشی برای این کاربر یافت نشد")
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        user_ct = ContentType.objects.get_for_model(User)
+        return Transaction.objects.filter(payer_content_type=user_ct, payer_object_id=self.request.user.id)
 
 
 # <=================== Gym Views ===================>
@@ -38,24 +34,26 @@ class GymPanelDepositTransactions(generics.ListAPIView):
     serializer_class = GymPanelTransactionSerializer
     permission_classes = [IsGymManager, IsAuthenticated]
     authentication_classes = [CustomJWTAuthentication]
+    pagination_class = IdCursorPagination
 
     def get_queryset(self):
-        user = self.request.user
-        gyms = Gym.objects.filter(manager__user=user)
-        memberships = MemberShip.objects.filter(gym__in=gyms)
-        return Transaction.objects.filter(membership__in=memberships).distinct()
+        queryset = Transaction.objects.filter(membership__gym__manager__user=self.request.user).order_by('-id')
+        return GymPanelTransactionSerializer.setup_eager_loading(queryset)
 
 
 class GymPanelWithdrawalTransactions(generics.ListAPIView):
     serializer_class = GymPanelTransactionSerializer
     permission_classes = [IsGymManager, IsAuthenticated]
     authentication_classes = [CustomJWTAuthentication]
+    pagination_class = IdCursorPagination
 
     def get_queryset(self):
-        user = self.request.user
-        gyms = Gym.objects.filter(manager__user=user)
-        managers = [gym.manager.user for gym in gyms]
-        return Transaction.objects.filter(receiver__in=managers).distinct()
+        # دریافت‌کننده تسویه‌ها خود یوزر مدیر باشگاهه
+        user_ct = ContentType.objects.get_for_model(User)
+        queryset = Transaction.objects.filter(
+            receiver_content_type=user_ct, receiver_object_id=self.request.user.id
+        ).order_by('-id')
+        return GymPanelTransactionSerializer.setup_eager_loading(queryset)
 
 
 # <=================== Admin Views ===================>
@@ -63,40 +61,28 @@ class AdminPanelInTransactionList(generics.ListAPIView):
     """
     لیست تراکنش های ورودی پلتفرم
     """
+    queryset = Transaction.objects.filter(direction=DIRECTION_IN).order_by('-id')
     serializer_class = AdminPanelInTransactionListSerializer
-
-    def get_queryset(self):
-        user_ct = ContentType.objects.get_for_model(User)
-        customer_users = User.objects.filter(customer_profile__isnull=False)
-        return Transaction.objects.filter(
-            payer_content_type=user_ct,
-            payer_object_id__in=customer_users.values_list('id', flat=True)
-        ).order_by('-id')
+    pagination_class = IdCursorPagination
 
 
 class AdminPanelOutTransactionList(generics.ListAPIView):
     """
     لیست تراکنش های خروجی پلتفرم
     """
+    queryset = Transaction.objects.filter(direction=DIRECTION_OUT).order_by('-id')
     serializer_class = AdminPanelOutTransactionListSerializer
-
-    def get_queryset(self):
-        platform_ct = ContentType.objects.get_for_model(PlatformSettings)
-        user_ct = ContentType.objects.get_for_model(User)
-        gym_manager_users = User.objects.filter(gym_manager_profile__isnull=False)
-        return Transaction.objects.filter(
-            payer_content_type=platform_ct,
-            receiver_content_type=user_ct,
-            receiver_object_id__in=gym_manager_users.values_list('id', flat=True)
-        ).order_by('-id')
+    pagination_class = IdCursorPagination
 
 
 class AdminPanelCommissionTransactionList(generics.ListAPIView):
     """
     لیست کمیسیون های دریافتی(درآمد های خالص پلتفرم)
     """
-    queryset = Transaction.objects.filter(is_commission=True).order_by('-id')
+    queryset = AdminPanelCommissionTransactionListSerializer.setup_eager_loading(
+        Transaction.objects.filter(direction=DIRECTION_COMMISSION).order_by('-id'))
     serializer_class = AdminPanelCommissionTransactionListSerializer
+    pagination_class = IdCursorPagination
 
 
 class AdminPanelTransactionDetail(generics.RetrieveAPIView):